@@ -1,33 +1,76 @@
 import random
-import joblib
 import os
-import pandas as pd
-import pandas_ta as ta
+import time
 import numpy as np
+from indicators import IndicatorEngine, required_history, unknown_features
+from compiled_model import load_predictor, load_feature_list
 
 class TradingAgent:
     """
     Agente di trading che utilizza un modello LightGBM per le decisioni.
     """
-    def __init__(self, model_name="trading_model.pkl"):
+    def __init__(self, model_name="trading_model.pkl", safe_mode=False, buy_threshold=0.6, sell_threshold=0.4,
+                 model_server=None):
+        self.model_name = model_name
         self.model_path = os.path.join('backend', 'models', model_name)
         self.features_path = os.path.join('backend', 'models', f"{model_name}_features.pkl")
         self.model = None
         self.feature_cols = None
-        
-        # Buffer per i dati storici necessari al calcolo degli indicatori
-        self.history = pd.DataFrame()
-        self.min_history = 60 # Numero minimo di candele per calcolare gli indicatori (es. EMA 50)
-        
-        self.load_model()
-
-    def load_model(self):
+
+        # In safe_mode il fallback restituisce sempre HOLD (backtest deterministico)
+        self.safe_mode = safe_mode
+
+        # Soglie sulla probabilità Up per aprire (BUY) e chiudere (SELL) la posizione
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+
+        # Indicatori aggiornati in streaming (O(1) per candela, stessi valori di prepare_data)
+        self.indicators = IndicatorEngine()
+
+        # Client del model server condiviso (model_server=True per l'indirizzo di default)
+        self.client = None
+        if model_server:
+            self.connect_model_server(None if model_server is True else model_server)
+
+        # Con il model server attivo basta la lista feature: il modello resta nel server
+        self.load_model(include_model=self.client is None)
+
+        # Candele di warm-up richieste dalle feature del modello caricato
+        self.min_history = required_history(self.feature_cols)
+
+        # instrumentation.BotMetrics opzionale: tempi delle fasi indicators e predict in get_decision
+        self.metrics = None
+
+    def connect_model_server(self, address=None):
+        """Si collega al model server; in caso di errore resta l'inference in-process."""
+        from model_server import ModelClient
+
+        try:
+            self.client = ModelClient(address)
+            print(f"Model server collegato: {self.client.address}")
+        except Exception as e:
+            self.client = None
+            print(f"Model server non disponibile ({e}): inference in-process")
+
+    @property
+    def model_ready(self):
+        return self.feature_cols is not None and (self.model is not None or self.client is not None)
+
+    def load_model(self, include_model=True):
         """Carica il modello e la lista delle feature."""
         if os.path.exists(self.model_path) and os.path.exists(self.features_path):
             try:
-                self.model = joblib.load(self.model_path)
-                self.feature_cols = joblib.load(self.features_path)
-                print(f"Modello AI caricato: {self.model_path}")
+                feature_cols = load_feature_list(self.features_path)
+                # Feature che l'IndicatorEngine non calcola: il modello non e' utilizzabile dall'agente
+                unknown = unknown_features(feature_cols)
+                if unknown:
+                    print(f"Errore nel caricamento del modello: feature non supportate dall'agente {unknown} ({self.model_path})")
+                    return
+                if include_model:
+                    # Alberi in array NumPy: niente validazione sklearn ne' DataFrame a ogni candela
+                    self.model = load_predictor(self.model_path)
+                self.feature_cols = feature_cols
+                print(f"Modello AI caricato: {self.model_path}" if include_model else f"Feature caricate: {self.features_path}")
             except Exception as e:
                 print(f"Errore nel caricamento del modello: {e}")
         else:
@@ -37,54 +80,133 @@ class TradingAgent:
         """
         Analizza i dati di mercato e restituisce una decisione basata su LightGBM.
         """
-        # Aggiungi i nuovi dati alla history
-        new_row = pd.DataFrame([market_data])
-        self.history = pd.concat([self.history, new_row], ignore_index=True)
-        
-        # Mantieni solo il necessario
-        if len(self.history) > 200:
-            self.history = self.history.tail(200)
+        metrics = self.metrics
+        start = time.perf_counter() if metrics else 0.0
+
+        # Aggiorna gli indicatori a ogni candela, anche durante il warm-up: le feature
+        # dipendono solo dal loro stato, non serve conservare le candele precedenti
+        self.indicators.update(market_data['close'])
 
         # Se non abbiamo abbastanza dati o il modello non è caricato, usa logica di fallback
-        if self.model is None or len(self.history) < self.min_history:
+        if not self.model_ready or self.indicators.bars < self.min_history:
+            if metrics:
+                metrics.add('indicators', time.perf_counter() - start)
             return self._mock_decision("Inizializzazione o Fallback")
 
         try:
-            # Calcolo feature
-            df = self.history.copy()
-            df.columns = [col.lower() for col in df.columns]
-            
-            # Calcoliamo gli stessi indicatori del training
-            df['rsi'] = ta.rsi(df['close'], length=14)
-            df['ema_20'] = ta.ema(df['close'], length=20)
-            df['ema_50'] = ta.ema(df['close'], length=50)
-            macd = ta.macd(df['close'])
-            df = pd.concat([df, macd], axis=1)
-            
-            # Prendi l'ultima riga (stato attuale)
-            current_features = df[self.feature_cols].tail(1)
-            
-            if current_features.isnull().values.any():
+            # Prendi le feature correnti nello stesso ordine usato in training
+            values = self.indicators.vector(self.feature_cols)
+            if metrics:
+                now = time.perf_counter()
+                metrics.add('indicators', now - start)
+                start = now
+
+            if any(value is None or value != value for value in values):
                  return self._mock_decision("Indicatori non pronti")
 
             # Predizione
-            prob = self.model.predict_proba(current_features)[0][1] # Probabilità classe 1 (Up)
-            
-            confidence = float(prob)
-            
-            if prob > 0.6: # Soglia acquisto
-                return 'BUY', {"reason": f"LightGBM confidence: {confidence:.2f}", "confidence": confidence}
-            elif prob < 0.4: # Soglia vendita
-                return 'SELL', {"reason": f"LightGBM confidence: {1-confidence:.2f}", "confidence": 1-confidence}
-            else:
-                return 'HOLD', {"reason": f"LightGBM neutral: {confidence:.2f}", "confidence": confidence}
+            prob = self._predict_one(values)
+            if metrics:
+                metrics.add('predict', time.perf_counter() - start)
+            return self._decision_from_prob(prob)
 
         except Exception as e:
             print(f"Errore durante l'inference: {e}")
             return self._mock_decision(f"Errore: {str(e)}")
 
+    def _predict_one(self, values):
+        """Probabilità classe 1 (Up) per una riga: model server se collegato, altrimenti in-process."""
+        if self.client is not None:
+            try:
+                return self.client.predict(self.model_name, values)
+            except Exception as e:
+                print(f"Model server non disponibile ({e}): passaggio all'inference in-process")
+                self.client = None
+                self.load_model()
+
+        return self.model.predict_one(values)
+
+    def get_decisions(self, feature_rows):
+        """
+        Decisioni per piu' simboli sulla stessa candela con una sola chiamata al modello.
+        feature_rows: vettori ordinati come feature_cols, None per i simboli ancora in warm-up
+        (che ricevono la decisione di fallback come in get_decision).
+        """
+        decisions = [None] * len(feature_rows)
+        ready = []
+        for i, values in enumerate(feature_rows):
+            if not self.model_ready:
+                decisions[i] = self._mock_decision("Inizializzazione o Fallback")
+            elif values is None or any(value is None or value != value for value in values):
+                decisions[i] = self._mock_decision("Indicatori non pronti")
+            else:
+                ready.append(i)
+
+        if ready:
+            try:
+                if self.model is None:
+                    # Il batch gira in-process: il modello condiviso e' gia' in questo processo
+                    self.load_model()
+                probs = self.model.predict_proba([feature_rows[i] for i in ready])[:, 1]
+                for i, prob in zip(ready, probs):
+                    decisions[i] = self._decision_from_prob(prob)
+            except Exception as e:
+                print(f"Errore durante l'inference batch: {e}")
+                for i in ready:
+                    decisions[i] = self._mock_decision(f"Errore: {str(e)}")
+        return decisions
+
+    def get_batch_probabilities(self, df, features=None):
+        """
+        Calcola la probabilità della classe Up per un intero dataset OHLCV con un solo passaggio
+        vettoriale: feature dal feature store (o calcolate in memoria se `features` non e' fornito)
+        e un'unica chiamata a predict_proba.
+        Restituisce un array allineato alle righe di df, con NaN sulle candele di warm-up.
+        """
+        import feature_store
+
+        if self.model is None and self.client is not None:
+            # Il batch gira in-process: una sola chiamata non giustifica il round-trip verso il server
+            self.load_model()
+        if self.model is None:
+            raise RuntimeError("Modello AI non caricato: impossibile calcolare le decisioni batch")
+
+        if features is None:
+            features = feature_store.features_from_dataframe(df)
+        probs = np.full(len(features), np.nan)
+
+        valid = features.valid_mask(self.feature_cols)
+        valid[:self.min_history - 1] = False
+        if valid.any():
+            probs[valid] = self.model.predict_proba(features.matrix(self.feature_cols)[valid])[:, 1]
+        return probs
+
+    def get_batch_decisions(self, df, features=None):
+        """
+        Decisioni (decisione, info) per ogni riga di df a partire da get_batch_probabilities.
+        Le candele di warm-up restituiscono HOLD, come get_decision in safe_mode.
+        """
+        warmup = ('HOLD', {"reason": "AI Batch (Indicatori non pronti)"})
+        return [
+            warmup if np.isnan(prob) else self._decision_from_prob(prob)
+            for prob in self.get_batch_probabilities(df, features)
+        ]
+
+    def _decision_from_prob(self, prob):
+        """Converte la probabilità della classe Up in decisione usando le soglie dell'agente."""
+        confidence = float(prob)
+
+        if prob > self.buy_threshold: # Soglia acquisto
+            return 'BUY', {"reason": f"LightGBM confidence: {confidence:.2f}", "confidence": confidence}
+        elif prob < self.sell_threshold: # Soglia vendita
+            return 'SELL', {"reason": f"LightGBM confidence: {1-confidence:.2f}", "confidence": 1-confidence}
+        else:
+            return 'HOLD', {"reason": f"LightGBM neutral: {confidence:.2f}", "confidence": confidence}
+
     def _mock_decision(self, reason):
-        """Logica di fallback casuale."""
+        """Logica di fallback casuale (HOLD fisso in safe_mode)."""
+        if self.safe_mode:
+            return 'HOLD', {"reason": f"AI Safe ({reason})"}
         actions = ['HOLD', 'BUY', 'SELL']
         weights = [0.9, 0.05, 0.05]
         decision = random.choices(actions, weights=weights, k=1)[0]
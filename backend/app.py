@@ -1,16 +1,135 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response
 import webbrowser
+import threading
+import multiprocessing
+import atexit
 import time
 import json
-import subprocess
+import uuid
 import sys
 import os
 
+from status_channel import StatusCache, diff_statuses
+from instrumentation import render_prometheus
+
 app = Flask(__name__)
 
-# Dizionario per tenere traccia dei processi Backtrader attivi
-# Struttura: { 'bot_id': subprocess.Popen_object }
-active_bots = {}
+# Bot avviati come subprocess (pool disabilitato): il supervisor ne gestisce il ciclo di vita
+# in un thread dedicato, le richieste registrano/fermano i job e ritornano subito
+bot_supervisor = None
+
+# Pool di worker "caldi" che eseguono run_engine senza avviare un interprete per bot.
+# BOT_POOL_WORKERS=0 ripristina il vecchio comportamento (un subprocess per bot).
+BOT_POOL_WORKERS = int(os.environ.get('BOT_POOL_WORKERS', os.cpu_count() or 1))
+BOT_POOL_MAX_QUEUE = int(os.environ.get('BOT_POOL_MAX_QUEUE', 100))
+bot_pool = None
+bot_pool_lock = threading.Lock()
+
+# Grid search (sweep.py) in subprocess, con un supervisor separato: non compaiono tra i bot di /status.
+# Non usano il pool perche' sweep distribuisce i backtest su un proprio pool di processi,
+# che i worker del BotPool (processi daemon) non possono creare.
+sweep_supervisor = None
+
+# Valori ammessi per mode ed engine (stesse scelte della CLI di trading_engine): sul pool
+# run_engine riceve i parametri senza argparse, un valore sconosciuto va rifiutato qui
+BOT_MODES = ('backtest', 'fast-backtest', 'live')
+BOT_ENGINES = ('cerebro', 'vector')
+
+# Portfolio in esecuzione in un solo processo: { 'portfolio_id': ['bot_id', ...] }
+portfolio_members = {}
+portfolio_lock = threading.Lock()
+
+def get_bot_pool():
+    """Crea il pool al primo utilizzo (None se disabilitato)."""
+    global bot_pool
+    with bot_pool_lock:
+        if bot_pool is None and BOT_POOL_WORKERS > 0:
+            from bot_pool import BotPool
+            bot_pool = BotPool(max_workers=BOT_POOL_WORKERS, max_queue=BOT_POOL_MAX_QUEUE)
+            atexit.register(bot_pool.shutdown)
+        return bot_pool
+
+def get_bot_supervisor():
+    """Crea il supervisor dei subprocess al primo utilizzo."""
+    global bot_supervisor
+    with bot_pool_lock:
+        if bot_supervisor is None:
+            from bot_supervisor import BotSupervisor
+            bot_supervisor = BotSupervisor(
+                ready_check=startup_state,
+                on_change=lambda: status_cache.poke(),
+                start_timeout=BOT_START_TIMEOUT
+            )
+            atexit.register(bot_supervisor.shutdown)
+        return bot_supervisor
+
+def get_sweep_supervisor():
+    """Crea il supervisor delle grid search al primo utilizzo (nessun handshake: running appena avviate)."""
+    global sweep_supervisor
+    with bot_pool_lock:
+        if sweep_supervisor is None:
+            from bot_supervisor import BotSupervisor
+            sweep_supervisor = BotSupervisor()
+            atexit.register(sweep_supervisor.shutdown)
+        return sweep_supervisor
+
+def status_file_path(bot_id):
+    sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
+    return os.path.join(sessions_dir, f'status_{bot_id}.json')
+
+def remove_status_file(bot_id):
+    """Cancella il file di stato del bot, con qualche tentativo se e' ancora in uso."""
+    status_file = status_file_path(bot_id)
+    if os.path.exists(status_file):
+        for i in range(3): # Tenta 3 volte
+            try:
+                os.remove(status_file)
+                break
+            except OSError:
+                time.sleep(0.5)
+            except Exception:
+                pass
+
+# Secondi dopo i quali un bot in subprocess senza file di stato viene comunque considerato avviato
+BOT_START_TIMEOUT = float(os.environ.get('BOT_START_TIMEOUT', 30))
+
+def startup_state(bot_id):
+    """
+    Handshake di avvio (controllato dal supervisor): il primo file di stato del nuovo processo
+    viene scritto quando dati e modello sono caricati, o con l'errore di caricamento.
+    Restituisce None se non ancora scritto, altrimenti ('ready' | 'failed', dettaglio).
+    """
+    try:
+        with open(status_file_path(bot_id), 'r') as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None # File non ancora scritto (o in sostituzione)
+    if str(status.get('status', '')).startswith('Errore'):
+        return 'failed', status.get('error') or status.get('status')
+    return 'ready', status.get('status')
+
+def portfolio_startup_state(member_ids):
+    """
+    Handshake di un portfolio: il processo non scrive un file proprio ma uno per ogni bot membro
+    (Inizializzazione o errore di caricamento). Pronto quando li ha scritti tutti,
+    fallito al primo errore riportato.
+    """
+    def check(portfolio_id):
+        states = [startup_state(member_id) for member_id in member_ids]
+        for state in states:
+            if state is not None and state[0] == 'failed':
+                return state
+        if all(state is not None for state in states):
+            return 'ready', None
+        return None
+    return check
+
+def remove_bot_files(bot_id):
+    """Rimuove il file di stato del bot o, per un portfolio, quelli di tutti i bot membri."""
+    with portfolio_lock:
+        members = portfolio_members.pop(bot_id, [bot_id])
+    for member_id in members:
+        remove_status_file(member_id)
 
 def cleanup_sessions():
     sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
@@ -24,7 +143,9 @@ def cleanup_sessions():
     else:
         os.makedirs(sessions_dir, exist_ok=True)
 
-cleanup_sessions()
+# I worker del pool (spawn) possono reimportare questo modulo: la pulizia va fatta solo nel server
+if multiprocessing.current_process().name == 'MainProcess':
+    cleanup_sessions()
 
 @app.route('/')
 def home():
@@ -53,12 +174,39 @@ def start_bot():
     symbol = data.get('symbol', 'EURUSD')
     data_file = data.get('data_file', 'dati_esempio.csv') # Default file
     mode = data.get('mode', 'backtest')
+    engine = data.get('engine', 'cerebro')
+    timeframe = data.get('timeframe') # Ricampionamento del dataset (es. '1h'); default: timeframe del file
+    model_server = data.get('model_server')
+    safe_mode = bool(data.get('safe_mode')) # Fallback HOLD: backtest per candela deterministico (e riusabile dalla cache)
+    force = bool(data.get('force')) # Riesegue il backtest anche se il risultato e' in cache
+    if mode not in BOT_MODES:
+        return jsonify({'message': f'Modalita\' non valida: {mode} (ammesse: {", ".join(BOT_MODES)}).'}), 400
+    if engine not in BOT_ENGINES:
+        return jsonify({'message': f'Motore non valido: {engine} (ammessi: {", ".join(BOT_ENGINES)}).'}), 400
 
-    if bot_id in active_bots:
-        if active_bots[bot_id].poll() is None:
-            return jsonify({'message': f'Il bot {bot_id} è già in esecuzione.'}), 409
-        else:
-            del active_bots[bot_id]
+    pool = get_bot_pool()
+    if pool is not None:
+        # Avvio non bloccante: il job viene eseguito da un worker libero o resta in coda
+        from bot_pool import PoolFullError
+        try:
+            job = pool.submit(
+                bot_id, symbol=symbol, data_file=data_file, mode=mode,
+                engine=engine, model_server=model_server or None, safe_mode=safe_mode, force=force,
+                timeframe=timeframe
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 409
+        except PoolFullError as e:
+            return jsonify({'message': f'Impossibile avviare il bot {bot_id}: {str(e)}'}), 429
+        status_cache.poke()
+        return jsonify({
+            'message': f'Bot {bot_id} {"avviato" if job["state"] == "running" else "in coda"} su {symbol} ({mode}).',
+            'job_state': job['state']
+        }), 202
+
+    supervisor = get_bot_supervisor()
+    if supervisor.is_active(bot_id):
+        return jsonify({'message': f'Il bot {bot_id} è già in esecuzione.'}), 409
 
     try:
         # Costruzione comando con il nuovo parametro --data_file
@@ -70,32 +218,40 @@ def start_bot():
             '--bot_id', bot_id, 
             '--symbol', symbol,
             '--data_file', data_file,
-            '--mode', mode
+            '--mode', mode,
+            '--engine', engine
         ]
+        if timeframe:
+            cmd.extend(['--timeframe', timeframe])
+        if safe_mode:
+            cmd.append('--safe_mode')
+        if force:
+            cmd.append('--force')
+        # Inference delegata al model server condiviso (True = indirizzo di default)
+        if model_server:
+            cmd.append('--model_server')
+            if isinstance(model_server, str):
+                cmd.append(model_server)
         
-        # Avvia il processo senza bloccare lo stdout/stderr per vederli in console
-        process = subprocess.Popen(
-            cmd,
+        # Il file di stato di un run precedente falserebbe l'handshake di avvio
+        remove_status_file(bot_id)
+
+        # Avvia il processo senza bloccare lo stdout/stderr per vederli in console.
+        # L'handshake (starting -> running/failed) prosegue nel supervisor: lo stato si legge da /status
+        job = supervisor.launch(
+            bot_id, cmd,
             cwd='.', 
             # Rimuoviamo PIPE per vedere i log direttamente nella console durante lo sviluppo
             stdout=None,
             stderr=None
         )
-        
-        # Un piccolo delay per vedere se crasha subito
-        time.sleep(1)
-        
-        if process.poll() is not None:
-            stdout, stderr = process.communicate()
-            return jsonify({
-                'message': f'Il bot {bot_id} è partito ma si è interrotto immediatamente.',
-                'output': stdout.strip(),
-                'error': stderr.strip()
-            }), 500
-
-        # Registra il bot attivo
-        active_bots[bot_id] = process
-        return jsonify({'message': f'Bot {bot_id} avviato con successo su {symbol} ({mode}).'}), 200
+        status_cache.poke()
+        return jsonify({
+            'message': f'Bot {bot_id} in avvio su {symbol} ({mode}).',
+            'job_state': job['state']
+        }), 202
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 409
     except Exception as e:
         return jsonify({'message': f'Errore interno durante l\'avvio del bot {bot_id}: {str(e)}'}), 500
 
@@ -107,89 +263,298 @@ def stop_bot():
         return jsonify({'message': 'Parametro bot_id mancante.'}), 400
 
     bot_id = data['bot_id']
-    
-    if bot_id not in active_bots:
-        return jsonify({'message': f'Il bot {bot_id} non è attivo.'}), 404
 
-    process = active_bots[bot_id]
+    pool = get_bot_pool()
+    if pool is not None:
+        # Arresto non bloccante: il worker viene terminato e il file di stato rimosso in background
+        previous_state = pool.stop(bot_id, on_stopped=lambda: remove_bot_files(bot_id))
+        if previous_state is None:
+            return jsonify({'message': f'Il bot {bot_id} non è attivo.'}), 404
+        status_cache.poke()
+        return jsonify({'message': f'Arresto del bot {bot_id} in corso.', 'job_state': 'stopping'}), 202
     
     try:
-        # Verifica se è già terminato
-        if process.poll() is None:
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait()
-        
-        # Rimuove dal dizionario in modo sicuro
-        if bot_id in active_bots:
-            del active_bots[bot_id]
-        
-        # Gestione cancellazione file con percorso assoluto sicuro
-        sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
-        status_file = os.path.join(sessions_dir, f'status_{bot_id}.json')
-        if os.path.exists(status_file):
-            for i in range(3): # Tenta 3 volte
-                try:
-                    os.remove(status_file)
-                    break
-                except OSError:
-                    time.sleep(0.5)
-                except Exception:
-                    pass 
-
-        return jsonify({'message': f'Bot {bot_id} fermato con successo.'}), 200
+        # Arresto non bloccante: terminate/kill e rimozione dei file di stato nel supervisor
+        previous_state = get_bot_supervisor().stop(bot_id, on_stopped=lambda: remove_bot_files(bot_id))
+        if previous_state is None:
+            return jsonify({'message': f'Il bot {bot_id} non è attivo.'}), 404
+        status_cache.poke()
+        return jsonify({'message': f'Arresto del bot {bot_id} in corso.', 'job_state': 'stopping'}), 202
     except Exception as e:
         return jsonify({'message': f'Errore durante l\'arresto del bot {bot_id}: {str(e)}'}), 500
 
-# Endpoint per ottenere lo stato di tutti i bot
-@app.route('/status', methods=['GET'])
-def get_status():
+# Endpoint per avviare piu' bot in un solo processo (un Cerebro, un modello condiviso)
+@app.route('/start_portfolio', methods=['POST'])
+def start_portfolio():
+    data = request.get_json()
+    if not data or 'portfolio_id' not in data or not data.get('bots'):
+        return jsonify({'message': 'Parametri portfolio_id e bots obbligatori.'}), 400
+
+    portfolio_id = data['portfolio_id']
+    mode = data.get('mode', 'backtest')
+    if mode not in BOT_MODES:
+        return jsonify({'message': f'Modalita\' non valida: {mode} (ammesse: {", ".join(BOT_MODES)}).'}), 400
+    bots = []
+    for bot in data['bots']:
+        if 'bot_id' not in bot or 'data_file' not in bot:
+            return jsonify({'message': 'Ogni bot richiede bot_id e data_file.'}), 400
+        bots.append({
+            'bot_id': bot['bot_id'],
+            'symbol': bot.get('symbol', bot['data_file'].split('.')[0]),
+            'data_file': bot['data_file'],
+            'timeframe': bot.get('timeframe')
+        })
+
+    pool = get_bot_pool()
+    if pool is not None:
+        from bot_pool import PoolFullError
+        try:
+            job = pool.submit(portfolio_id, symbol=None, data_file=None, mode=mode, bots=bots)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 409
+        except PoolFullError as e:
+            return jsonify({'message': f'Impossibile avviare il portfolio {portfolio_id}: {str(e)}'}), 429
+        with portfolio_lock:
+            portfolio_members[portfolio_id] = [bot['bot_id'] for bot in bots]
+        status_cache.poke()
+        return jsonify({
+            'message': f'Portfolio {portfolio_id} ({len(bots)} bot) {"avviato" if job["state"] == "running" else "in coda"} ({mode}).',
+            'job_state': job['state']
+        }), 202
+
+    supervisor = get_bot_supervisor()
+    if supervisor.is_active(portfolio_id):
+        return jsonify({'message': f'Il portfolio {portfolio_id} è già in esecuzione.'}), 409
+
+    try:
+        engine_path = os.path.join(os.path.dirname(__file__), 'trading_engine.py')
+        cmd = [
+            sys.executable, engine_path,
+            '--bot_id', portfolio_id,
+            '--mode', mode,
+            '--portfolio'
+        ] + [
+            f"{bot['bot_id']}:{bot['data_file']}" + (f":{bot['timeframe']}" if bot['timeframe'] else '')
+            for bot in bots
+        ]
+        # Handshake sui file dei bot membri (il processo non scrive un file del portfolio);
+        # quelli di un run precedente lo falserebbero
+        member_ids = [bot['bot_id'] for bot in bots]
+        for member_id in member_ids:
+            remove_status_file(member_id)
+        job = supervisor.launch(
+            portfolio_id, cmd, ready_check=portfolio_startup_state(member_ids),
+            cwd='.', stdout=None, stderr=None
+        )
+        with portfolio_lock:
+            portfolio_members[portfolio_id] = [bot['bot_id'] for bot in bots]
+        status_cache.poke()
+        return jsonify({
+            'message': f'Portfolio {portfolio_id} ({len(bots)} bot) in avvio ({mode}).',
+            'job_state': job['state']
+        }), 202
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 409
+    except Exception as e:
+        return jsonify({'message': f'Errore interno durante l\'avvio del portfolio {portfolio_id}: {str(e)}'}), 500
+
+def sweep_results_path(sweep_id):
+    sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
+    return os.path.join(sessions_dir, f'sweep_{sweep_id}.json')
+
+# Endpoint per avviare una grid search parallela su soglie, dataset e modelli.
+# La ricerca gira in un subprocess (sweep.py --output): la richiesta ritorna subito con l'id,
+# risultati e stato si leggono da /sweep/<sweep_id>
+@app.route('/sweep', methods=['POST'])
+def start_sweep():
+    data = request.get_json(silent=True) or {}
+    sweep_id = uuid.uuid4().hex[:12]
+    try:
+        sweep_path = os.path.join(os.path.dirname(__file__), 'sweep.py')
+        cmd = [
+            sys.executable, sweep_path,
+            '--capital', str(float(data.get('initial_capital', 10000.0))),
+            '--output', sweep_results_path(sweep_id)
+        ]
+        for key, flag in (('buy_thresholds', '--buy'), ('sell_thresholds', '--sell')):
+            if data.get(key):
+                cmd.append(flag)
+                cmd.extend(str(float(value)) for value in data[key])
+        for key, flag in (('datasets', '--datasets'), ('models', '--models')):
+            if data.get(key):
+                cmd.append(flag)
+                cmd.extend(str(value) for value in data[key])
+        if data.get('workers'):
+            cmd.extend(['--workers', str(int(data['workers']))])
+    except (TypeError, ValueError) as e:
+        return jsonify({'message': f'Parametri della grid search non validi: {str(e)}'}), 400
+
+    try:
+        job = get_sweep_supervisor().launch(sweep_id, cmd, cwd='.', stdout=None, stderr=None)
+    except Exception as e:
+        return jsonify({'message': f'Errore durante l\'avvio della grid search: {str(e)}'}), 500
+    return jsonify({
+        'message': f'Grid search {sweep_id} avviata.',
+        'sweep_id': sweep_id,
+        'job_state': job['state']
+    }), 202
+
+# Stato di una grid search e, a ricerca terminata, i risultati ordinati per PnL (?top=N per i primi N)
+@app.route('/sweep/<sweep_id>', methods=['GET'])
+def get_sweep(sweep_id):
+    job = get_sweep_supervisor().job(sweep_id)
+    results_path = sweep_results_path(sweep_id)
+    if job is None and not os.path.exists(results_path):
+        return jsonify({'message': f'Grid search {sweep_id} non trovata.'}), 404
+
+    sweep_data = {'sweep_id': sweep_id, 'job_state': job['state'] if job else 'finished'}
+    if job and job['error']:
+        sweep_data['job_error'] = job['error']
+    if sweep_data['job_state'] == 'finished':
+        try:
+            with open(results_path, 'r') as f:
+                sweep_data.update(json.load(f))
+        except (OSError, ValueError) as e:
+            return jsonify({'message': f'Errore nella lettura dei risultati di {sweep_id}: {str(e)}'}), 500
+        top = request.args.get('top', type=int)
+        if top:
+            sweep_data['results'] = sweep_data['results'][:top]
+    return jsonify(sweep_data), 200
+
+def collect_statuses():
+    """Stato di tutti i bot (job del pool o del supervisor) unito al contenuto dei file di stato."""
     all_statuses = {}
-    
-    # Crea una copia delle chiavi per iterare
-    current_bot_ids = list(active_bots.keys())
-    
-    if not current_bot_ids:
-        return jsonify({}), 200
 
-    for bot_id in current_bot_ids:
-        # Usa .get() per evitare KeyError se il bot viene rimosso concurrentemente
-        process = active_bots.get(bot_id)
-        
-        # Se il bot non esiste più nel dizionario, saltalo
-        if not process:
-            continue
-            
+    pool = get_bot_pool()
+    if pool is not None:
+        jobs, active_states = pool.jobs(), ('queued', 'running')
+    else:
+        jobs, active_states = get_bot_supervisor().jobs(), ('starting', 'running')
+
+    for bot_id, job in jobs.items():
+        running = job['state'] in active_states
         bot_data = {
-            'bot_running': process.poll() is None,
-            'pid': process.pid if process.poll() is None else None
+            'bot_running': running,
+            'pid': job['pid'] if running else None,
+            'job_state': job['state']
         }
+        if job['error']:
+            bot_data['job_error'] = job['error']
+        add_bot_status(all_statuses, bot_id, bot_data)
+    return all_statuses
 
-        # Tenta di leggere il file di stato specifico
-        sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
-        status_file = os.path.join(sessions_dir, f'status_{bot_id}.json')
-        if os.path.exists(status_file):
-            try:
-                with open(status_file, 'r') as f:
-                    file_data = json.load(f)
-                    bot_data.update(file_data)
-            except Exception:
-                bot_data['file_status'] = 'Errore lettura file stato'
-        else:
-            bot_data['file_status'] = 'File stato non ancora creato'
-            
-        all_statuses[bot_id] = bot_data
+def add_bot_status(all_statuses, bot_id, bot_data):
+    """Stato di un job: un bot singolo, oppure ogni bot membro di un portfolio con la propria chiave."""
+    with portfolio_lock:
+        members = portfolio_members.get(bot_id)
+    if members is None:
+        all_statuses[bot_id] = read_status_file(bot_id, bot_data)
+        return
+    for member_id in members:
+        all_statuses[member_id] = read_status_file(member_id, dict(bot_data, portfolio=bot_id))
+
+# Contenuto dei file di stato gia' letti: { 'bot_id': ((inode, mtime_ns, size), dati) }
+# Il JSON viene riletto solo quando il file cambia (basta un os.stat per accorgersene)
+status_file_cache = {}
+
+def read_status_file(bot_id, bot_data):
+    """Unisce a bot_data il contenuto del file di stato del bot, se presente."""
+    status_file = status_file_path(bot_id)
+    try:
+        stat = os.stat(status_file)
+    except OSError:
+        status_file_cache.pop(bot_id, None)
+        bot_data['file_status'] = 'File stato non ancora creato'
+        return bot_data
+
+    # La scrittura atomica (os.replace) cambia anche l'inode
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached = status_file_cache.get(bot_id)
+    if cached is None or cached[0] != signature:
+        try:
+            with open(status_file, 'r') as f:
+                cached = (signature, json.load(f))
+            status_file_cache[bot_id] = cached
+        except Exception:
+            bot_data['file_status'] = 'Errore lettura file stato'
+            return bot_data
+    bot_data.update(cached[1])
+    return bot_data
 
+# Cache in memoria dello stato dei bot: un solo thread legge i file, gli endpoint leggono la cache
+STATUS_REFRESH_INTERVAL = float(os.environ.get('STATUS_REFRESH_INTERVAL', 0.5))
+status_cache = StatusCache(collect_statuses, interval=STATUS_REFRESH_INTERVAL)
+
+# Endpoint per ottenere lo stato di tutti i bot
+@app.route('/status', methods=['GET'])
+def get_status():
+    _, all_statuses = status_cache.start().snapshot()
     return jsonify(all_statuses), 200
 
+# Metriche dei bot in formato testo Prometheus (tempi per fase, candele/s, latenza live)
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    _, all_statuses = status_cache.start().snapshot()
+    return Response(render_prometheus(all_statuses), mimetype='text/plain; version=0.0.4')
+
+# Storico di una run (default: l'ultima) per i grafici della dashboard: equity ridotta a ~points
+# punti nella finestra [start, end] (timestamp ISO) e trade della stessa finestra
+@app.route('/history/<bot_id>', methods=['GET'])
+def get_history(bot_id):
+    # Import locale: sqlite3 serve solo a questo endpoint
+    from history_store import history_path, read_history, DEFAULT_POINTS
+
+    sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
+    try:
+        history = read_history(
+            history_path(sessions_dir, bot_id),
+            run_id=request.args.get('run', type=int),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            points=request.args.get('points', DEFAULT_POINTS, type=int),
+            trades_limit=request.args.get('trades', type=int)
+        )
+    except Exception as e:
+        return jsonify({'message': f'Errore nella lettura dello storico di {bot_id}: {str(e)}'}), 500
+    if history is None:
+        return jsonify({'message': f'Nessuno storico per il bot {bot_id}.'}), 404
+    return jsonify(dict(history, bot_id=bot_id)), 200
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+# Endpoint Server-Sent Events: snapshot completo alla connessione, poi solo i bot cambiati
+@app.route('/status/stream', methods=['GET'])
+def status_stream():
+    cache = status_cache.start()
+
+    def stream():
+        version, last_sent = cache.snapshot()
+        yield "retry: 3000\n\n"
+        yield sse_event('snapshot', last_sent)
+        while True:
+            new_version, current = cache.wait_for_change(version, timeout=15)
+            if new_version == version:
+                # Heartbeat: tiene viva la connessione e fa emergere i client disconnessi
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            changed, removed = diff_statuses(last_sent, current)
+            last_sent = current
+            if changed or removed:
+                yield sse_event('delta', {'changed': changed, 'removed': removed})
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == '__main__':
-    time.sleep(1)
-    # Apri il browser solo se non stiamo ricaricando (debug mode quirks)
+    # Apri il browser solo se non stiamo ricaricando (debug mode quirks), mentre il server parte
     if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
-        webbrowser.open("http://127.0.0.1:5000")
+        threading.Timer(1.0, webbrowser.open, args=("http://127.0.0.1:5000",)).start()
+    # Avvia subito i worker, cosi' anche il primo bot trova gli import gia' pronti
+    get_bot_pool()
     app.run(debug=True, use_reloader=False)
 
 
@@ -0,0 +1,282 @@
+import os
+import json
+import uuid
+import argparse
+
+import numpy as np
+
+# Colonne del CSV: Date -> .ts.npy, le altre -> .ohlcv.npy (una riga per colonna, contigua in memoria)
+CSV_COLUMNS = ('Date', 'Open', 'High', 'Low', 'Close', 'Volume')
+
+STORE_VERSION = 3 # 2: intervallo delle candele nei metadati, 3: settimane ricampionate dal lunedi'
+
+# Unita' accettate nei timeframe ('5m', '1h', '1d', '1w'), in secondi
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+DAY = 86400
+WEEK = TIMEFRAME_UNITS['w']
+# L'epoch (1970-01-01) e' un giovedi': le settimane vengono spostate per iniziare il lunedi'
+WEEK_OFFSET = 3 * DAY
+
+
+class BarSet:
+    """
+    Serie di candele in formato colonnare: timestamp int64 (epoch in secondi)
+    e prezzi/volumi float64. Gli array sono memory-mapped quando letti dalla cache.
+    """
+    __slots__ = ('timestamps', 'open', 'high', 'low', 'close', 'volume', 'intraday', 'source', 'interval', 'label')
+
+    def __init__(self, timestamps, ohlcv, intraday, source=None, interval=None, label=None):
+        self.timestamps = timestamps
+        self.open, self.high, self.low, self.close, self.volume = ohlcv
+        self.intraday = intraday
+        self.source = source
+        self.interval = interval # Secondi tra due candele (dedotto dai timestamp), None con meno di 2 candele
+        self.label = label # Timeframe ricampionato ('1h', ...) o None per la serie originale del CSV
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def to_dataframe(self):
+        """DataFrame con le stesse colonne del CSV (Date come datetime)."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'Date': self.timestamps.astype('datetime64[s]'),
+            'Open': self.open,
+            'High': self.high,
+            'Low': self.low,
+            'Close': self.close,
+            'Volume': self.volume,
+        })
+
+
+def cache_paths(csv_path, cache_dir=None, label=None):
+    """Percorsi di timestamp, prezzi e metadati in cache per un CSV (o per un suo ricampionamento)."""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.cache')
+    base = os.path.join(cache_dir, os.path.splitext(os.path.basename(csv_path))[0])
+    if label:
+        base = f"{base}.{label}"
+    return f"{base}.ts.npy", f"{base}.ohlcv.npy", f"{base}.meta.json"
+
+
+def parse_timeframe(timeframe):
+    """'15m', '1h', '1d', ... (o secondi) -> secondi."""
+    if isinstance(timeframe, (int, np.integer)):
+        return int(timeframe)
+    text = str(timeframe).strip().lower()
+    if text[-1:] in TIMEFRAME_UNITS and text[:-1].isdigit() and int(text[:-1]) > 0:
+        return int(text[:-1]) * TIMEFRAME_UNITS[text[-1]]
+    raise ValueError(f"Timeframe non valido: {timeframe} (es. 5m, 1h, 4h, 1d)")
+
+
+def timeframe_label(seconds):
+    """Secondi -> etichetta compatta con l'unita' piu' grande che li divide ('3600' -> '1h')."""
+    for unit in ('w', 'd', 'h', 'm', 's'):
+        size = TIMEFRAME_UNITS[unit]
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+
+
+def infer_interval(timestamps):
+    """
+    Intervallo delle candele: la distanza piu' frequente tra timestamp consecutivi.
+    La moda (non il minimo o la media) ignora weekend, festivi e buchi nei dati.
+    """
+    deltas = np.diff(np.asarray(timestamps, dtype=np.int64))
+    deltas = deltas[deltas > 0]
+    if len(deltas) == 0:
+        return None
+    values, counts = np.unique(deltas, return_counts=True)
+    return int(values[np.argmax(counts)])
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'source_mtime_ns': stat.st_mtime_ns, 'source_size': stat.st_size}
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _tmp_path(path, suffix=''):
+    """File temporaneo unico per processo e chiamata: scritture concorrenti non si sovrascrivono."""
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp{suffix}"
+
+
+def _replace(tmp_path, path):
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _atomic_save(path, array):
+    tmp_path = _tmp_path(path, '.npy')
+    np.save(tmp_path, array)
+    _replace(tmp_path, path)
+
+
+def is_fresh(csv_path, cache_dir=None):
+    """True se la cache esiste ed e' allineata a mtime e dimensione del CSV sorgente."""
+    ts_path, ohlcv_path, meta_path = cache_paths(csv_path, cache_dir)
+    meta = _read_meta(meta_path)
+    if meta is None or meta.get('version') != STORE_VERSION:
+        return False
+    if not (os.path.exists(ts_path) and os.path.exists(ohlcv_path)):
+        return False
+    signature = _source_signature(csv_path)
+    return all(meta.get(key) == value for key, value in signature.items())
+
+
+def convert_csv(csv_path, cache_dir=None):
+    """
+    Converte il CSV in formato colonnare binario: una sola lettura con pandas,
+    date parse vettoriale, poi scrittura atomica degli array e infine dei metadati.
+    """
+    import pandas as pd
+
+    ts_path, ohlcv_path, meta_path = cache_paths(csv_path, cache_dir)
+    os.makedirs(os.path.dirname(ts_path), exist_ok=True)
+    signature = _source_signature(csv_path)
+
+    # round_trip: stesso parsing float di Python/Backtrader (il parser veloce di default puo' differire di 1 ulp)
+    df = pd.read_csv(csv_path, usecols=list(CSV_COLUMNS), float_precision='round_trip')
+    timestamps = pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[s]').astype(np.int64)
+    interval = infer_interval(timestamps)
+    if interval is None:
+        intraday = bool(len(df)) and ' ' in str(df['Date'].iloc[0])
+    else:
+        intraday = interval < DAY
+    ohlcv = np.ascontiguousarray(df[list(CSV_COLUMNS[1:])].to_numpy(dtype=np.float64).T)
+
+    _atomic_save(ts_path, timestamps)
+    _atomic_save(ohlcv_path, ohlcv)
+
+    # I metadati vengono scritti per ultimi: fanno da marcatore di cache valida
+    meta = dict(signature, version=STORE_VERSION, rows=int(len(timestamps)), intraday=intraday, interval=interval)
+    _write_meta(meta_path, meta)
+    return meta
+
+
+def _write_meta(meta_path, meta):
+    tmp_meta = _tmp_path(meta_path)
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=4)
+    _replace(tmp_meta, meta_path)
+
+
+def resample(bars, seconds):
+    """
+    Aggrega un BarSet in candele di `seconds` secondi (multiplo dell'intervallo originale)
+    con operazioni vettoriali: open della prima candela del blocco, high massimo, low minimo,
+    close dell'ultima, volume sommato. I blocchi sono allineati all'epoch (inizio ora/giorno UTC,
+    le settimane al lunedi') ed etichettati con l'inizio del blocco; i blocchi senza candele vengono saltati.
+    """
+    interval = bars.interval
+    if interval is None or seconds == interval:
+        return bars
+    if seconds < interval or seconds % interval:
+        raise ValueError(
+            f"Impossibile ricampionare candele da {timeframe_label(interval)} a {timeframe_label(seconds)}: "
+            f"il timeframe deve essere un multiplo di quello dei dati"
+        )
+
+    timestamps = np.asarray(bars.timestamps, dtype=np.int64)
+    offset = WEEK_OFFSET if seconds % WEEK == 0 else 0
+    buckets = (timestamps + offset) // seconds
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(timestamps)) - 1
+    ohlcv = np.empty((5, len(starts)), dtype=np.float64)
+    ohlcv[0] = np.asarray(bars.open)[starts]
+    ohlcv[1] = np.maximum.reduceat(np.asarray(bars.high), starts)
+    ohlcv[2] = np.minimum.reduceat(np.asarray(bars.low), starts)
+    ohlcv[3] = np.asarray(bars.close)[ends]
+    ohlcv[4] = np.add.reduceat(np.asarray(bars.volume), starts)
+    return BarSet(
+        buckets[starts] * seconds - offset, ohlcv, seconds < DAY,
+        source=bars.source, interval=seconds, label=timeframe_label(seconds)
+    )
+
+
+def load_bars(csv_path, cache_dir=None, mmap=True, timeframe=None):
+    """
+    Restituisce il BarSet di un CSV, convertendolo solo se la cache manca
+    o e' piu' vecchia del sorgente. Con mmap=True la lettura e' immediata
+    indipendentemente dalla dimensione del file.
+    timeframe ('1h', '1d', ...): candele ricampionate dalla serie del CSV; ogni ricampionamento
+    viene salvato accanto alla cache originale e ricalcolato solo se il CSV cambia.
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"File non trovato: {csv_path}")
+
+    ts_path, ohlcv_path, meta_path = cache_paths(csv_path, cache_dir)
+    meta = _read_meta(meta_path) if is_fresh(csv_path, cache_dir) else None
+    if meta is None:
+        # Cache assente, vecchia o metadati illeggibili: si ricostruisce e si usano i metadati appena scritti
+        meta = convert_csv(csv_path, cache_dir)
+    mmap_mode = 'r' if mmap else None
+    timestamps = np.load(ts_path, mmap_mode=mmap_mode)
+    ohlcv = np.load(ohlcv_path, mmap_mode=mmap_mode)
+    bars = BarSet(timestamps, ohlcv, meta['intraday'], source=csv_path, interval=meta['interval'])
+    if timeframe is None or bars.interval is None or parse_timeframe(timeframe) == bars.interval:
+        return bars
+    return _load_resampled(csv_path, cache_dir, bars, meta, parse_timeframe(timeframe), mmap_mode)
+
+
+def _load_resampled(csv_path, cache_dir, bars, meta, seconds, mmap_mode):
+    """Ricampionamento in cache, valido finche' coincide con la cache della serie originale."""
+    label = timeframe_label(seconds)
+    ts_path, ohlcv_path, meta_path = cache_paths(csv_path, cache_dir, label)
+    base_signature = {key: meta[key] for key in ('source_mtime_ns', 'source_size', 'rows')}
+    cached = _read_meta(meta_path)
+    fresh = (
+        cached is not None
+        and cached.get('version') == STORE_VERSION
+        and all(cached.get(key) == value for key, value in base_signature.items())
+        and os.path.exists(ts_path) and os.path.exists(ohlcv_path)
+    )
+    if fresh:
+        return BarSet(
+            np.load(ts_path, mmap_mode=mmap_mode), np.load(ohlcv_path, mmap_mode=mmap_mode),
+            cached['intraday'], source=csv_path, interval=seconds, label=label
+        )
+
+    resampled = resample(bars, seconds)
+    _atomic_save(ts_path, np.asarray(resampled.timestamps))
+    _atomic_save(ohlcv_path, np.vstack([resampled.open, resampled.high, resampled.low, resampled.close, resampled.volume]))
+    _write_meta(meta_path, dict(
+        base_signature, version=STORE_VERSION, intraday=resampled.intraday, interval=seconds,
+        resampled_rows=len(resampled)
+    ))
+    return resampled
+
+
+def load_dataframe(csv_path, cache_dir=None):
+    """Scorciatoia per chi lavora con pandas (training, batch inference)."""
+    return load_bars(csv_path, cache_dir).to_dataframe()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Converte i CSV di backend/data nella cache colonnare binaria')
+    parser.add_argument('--data_dir', type=str, default='backend/data', help='Cartella dei CSV')
+    parser.add_argument('--force', action='store_true', help='Riconverte anche i file gia in cache')
+
+    args = parser.parse_args()
+    for name in sorted(os.listdir(args.data_dir)):
+        if not name.endswith('.csv'):
+            continue
+        path = os.path.join(args.data_dir, name)
+        if args.force or not is_fresh(path):
+            meta = convert_csv(path)
+            print(f"{name}: convertito ({meta['rows']} righe)")
+        else:
+            print(f"{name}: cache aggiornata")
@@ -0,0 +1,200 @@
+import os
+import queue
+import threading
+import collections
+import multiprocessing
+
+
+class PoolFullError(Exception):
+    """Sollevata quando la coda dei job in attesa ha raggiunto il limite."""
+
+
+def _worker_main(inbox, events):
+    """
+    Processo worker: importa subito lo stack pesante (backtrader, pandas, lightgbm)
+    e poi esegue run_engine per ogni job ricevuto, finche' non riceve None.
+    """
+    import lightgbm # noqa: F401 - import a caldo, usato dall'unpickle del modello
+    from trading_engine import run_engine, run_error
+
+    pid = os.getpid()
+    events.put(('ready', pid, None, None))
+    while True:
+        job = inbox.get()
+        if job is None:
+            break
+        bot_id = job['bot_id']
+        try:
+            # run_engine gestisce i propri errori (dati, modello, run): li scrive nel file di stato
+            # e restituisce None, quindi l'esito del job si ricava da li'
+            if run_engine(**job) is None:
+                error = run_error(bot_id, job.get('bots')) or "Run terminata con errore (vedi file di stato)"
+                events.put(('failed', pid, bot_id, error))
+            else:
+                events.put(('finished', pid, bot_id, None))
+        except BaseException as e:
+            events.put(('failed', pid, bot_id, str(e)))
+
+
+class _Worker:
+    __slots__ = ('process', 'inbox', 'bot_id', 'ready')
+
+    def __init__(self, ctx, events):
+        self.inbox = ctx.Queue()
+        self.process = ctx.Process(target=_worker_main, args=(self.inbox, events), daemon=True)
+        self.bot_id = None
+        self.ready = False
+        self.process.start()
+
+
+class BotPool:
+    """
+    Pool di processi worker pre-avviati e gia' "caldi" che eseguono run_engine su richiesta.
+    - concorrenza limitata a max_workers, i job in eccesso restano in coda (max max_queue)
+    - submit/stop non bloccano: lo stato del job si legge con job()/jobs()
+    Stati job: queued, running, finished, failed.
+    """
+
+    def __init__(self, max_workers=None, max_queue=100):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._ctx = multiprocessing.get_context('spawn')
+        self._events = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._jobs = {} # bot_id -> dict stato
+        self._workers = {} # pid -> _Worker
+        self._closed = False
+
+        for _ in range(self.max_workers):
+            self._spawn_worker()
+        threading.Thread(target=self._event_loop, daemon=True).start()
+
+    def _spawn_worker(self):
+        worker = _Worker(self._ctx, self._events)
+        self._workers[worker.process.pid] = worker
+        return worker
+
+    def submit(self, bot_id, **params):
+        """Accoda un job run_engine. Solleva ValueError se il bot e' gia' attivo, PoolFullError se la coda e' piena."""
+        with self._lock:
+            current = self._jobs.get(bot_id)
+            if current and current['state'] in ('queued', 'running'):
+                raise ValueError(f"Il bot {bot_id} è già in esecuzione.")
+            if len(self._pending) >= self.max_queue:
+                raise PoolFullError(f"Coda piena ({self.max_queue} job in attesa).")
+
+            job = dict(params, bot_id=bot_id)
+            self._jobs[bot_id] = {'state': 'queued', 'pid': None, 'error': None, 'params': job}
+            self._pending.append(bot_id)
+            self._dispatch()
+            return dict(self._jobs[bot_id])
+
+    def stop(self, bot_id, on_stopped=None):
+        """
+        Ferma un job senza attendere: se in coda viene rimosso, se in esecuzione il worker
+        viene terminato e sostituito in background. on_stopped viene chiamata in background
+        quando il processo del job non e' piu' attivo. Restituisce lo stato precedente o None.
+        """
+        with self._lock:
+            job = self._jobs.pop(bot_id, None)
+            if job is None:
+                return None
+            worker = None
+            if job['state'] == 'queued':
+                self._pending.remove(bot_id)
+            elif job['state'] == 'running':
+                worker = self._workers.pop(job['pid'], None)
+
+        threading.Thread(target=self._finish_stop, args=(worker, on_stopped), daemon=True).start()
+        return job['state']
+
+    def job(self, bot_id):
+        with self._lock:
+            job = self._jobs.get(bot_id)
+            return dict(job) if job else None
+
+    def jobs(self):
+        with self._lock:
+            return {bot_id: dict(job) for bot_id, job in self._jobs.items()}
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.process.terminate()
+
+    def _finish_stop(self, worker, on_stopped):
+        """Termina e rimpiazza il worker (se presente), poi notifica il chiamante."""
+        if worker is not None:
+            worker.process.terminate()
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            with self._lock:
+                if not self._closed:
+                    self._spawn_worker()
+        if on_stopped is not None:
+            on_stopped()
+
+    def _dispatch(self):
+        """Assegna i job in coda ai worker liberi (chiamare con il lock acquisito)."""
+        for worker in self._workers.values():
+            if not self._pending:
+                break
+            if worker.ready and worker.bot_id is None:
+                bot_id = self._pending.popleft()
+                job = self._jobs[bot_id]
+                job.update(state='running', pid=worker.process.pid)
+                worker.bot_id = bot_id
+                worker.inbox.put(job['params'])
+
+    def _reap_dead_workers(self):
+        """
+        Segna come falliti i job di worker morti inaspettatamente e li rimpiazza (con il lock).
+        Un worker morto prima di essere pronto (es. import fallito) non viene rimpiazzato,
+        per evitare un ciclo infinito di riavvii.
+        """
+        for pid, worker in list(self._workers.items()):
+            if worker.process.is_alive():
+                continue
+            del self._workers[pid]
+            error = f"Worker terminato (exit code {worker.process.exitcode})"
+            job = self._jobs.get(worker.bot_id) if worker.bot_id else None
+            if job is not None and job['pid'] == pid:
+                job.update(state='failed', error=error)
+            if not worker.ready:
+                print(f"[bot_pool] Avvio worker fallito: {error}")
+            elif not self._closed:
+                self._spawn_worker()
+
+        if not self._workers:
+            # Nessun worker disponibile: i job in coda non potrebbero mai partire
+            while self._pending:
+                self._jobs[self._pending.popleft()].update(state='failed', error="Nessun worker disponibile")
+
+    def _event_loop(self):
+        while True:
+            try:
+                kind, pid, bot_id, error = self._events.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    self._reap_dead_workers()
+                    self._dispatch()
+                continue
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                worker = self._workers.get(pid)
+                if kind == 'ready' and worker is not None:
+                    worker.ready = True
+                elif kind in ('finished', 'failed'):
+                    if worker is not None:
+                        worker.bot_id = None
+                    job = self._jobs.get(bot_id)
+                    if job is not None and job['pid'] == pid:
+                        job.update(state=kind, error=error)
+                self._dispatch()
@@ -0,0 +1,173 @@
+import time
+import threading
+import subprocess
+
+
+class BotSupervisor:
+    """
+    Registro thread-safe dei bot avviati come subprocess (BOT_POOL_WORKERS=0).
+    Le richieste HTTP registrano o fermano un job e ritornano subito; un thread di monitor
+    gestisce il ciclo di vita: handshake di avvio, raccolta dei processi terminati e
+    arresto graduale (terminate, kill dopo stop_timeout secondi).
+    Stati job: starting, running, stopping, finished, failed (stessa interfaccia di BotPool.jobs()).
+    """
+
+    def __init__(self, ready_check=None, on_change=None, start_timeout=30.0, stop_timeout=5.0, interval=0.1):
+        self.ready_check = ready_check # ready_check(bot_id) -> None | ('ready'|'failed', dettaglio)
+        self.on_change = on_change
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._jobs = {} # bot_id -> dict stato
+        self._processes = {} # bot_id -> subprocess.Popen
+        self._closed = False
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._monitor_loop, name='bot-supervisor', daemon=True).start()
+
+    def launch(self, bot_id, cmd, ready_check=None, **popen_kwargs):
+        """
+        Avvia il processo del bot senza attendere l'handshake. Solleva ValueError se il bot
+        e' gia' attivo (o in arresto). Restituisce una copia dello stato del job.
+        ready_check: handshake specifico del job (es. un portfolio con piu' file di stato),
+        altrimenti quello del supervisor.
+        """
+        with self._lock:
+            current = self._jobs.get(bot_id)
+            if current and current['state'] in ('starting', 'running', 'stopping'):
+                state = 'in arresto' if current['state'] == 'stopping' else 'in esecuzione'
+                raise ValueError(f"Il bot {bot_id} è già {state}.")
+            # Prenota il bot_id prima di Popen, che avviene fuori dal lock
+            self._jobs[bot_id] = {
+                'state': 'starting', 'pid': None, 'error': None, 'started': time.monotonic(),
+                'ready_check': ready_check or self.ready_check,
+            }
+
+        try:
+            process = subprocess.Popen(cmd, **popen_kwargs)
+        except Exception as e:
+            with self._lock:
+                self._jobs[bot_id].update(state='failed', error=str(e))
+            raise
+
+        with self._lock:
+            self._processes[bot_id] = process
+            self._jobs[bot_id]['pid'] = process.pid
+            job = dict(self._jobs[bot_id])
+        self._wakeup.set()
+        return job
+
+    def stop(self, bot_id, on_stopped=None):
+        """
+        Chiede l'arresto senza attendere: il processo riceve terminate() e il monitor lo raccoglie
+        (kill dopo stop_timeout). on_stopped viene chiamata in background a processo terminato.
+        Restituisce lo stato precedente del job o None se il bot non e' registrato.
+        """
+        with self._lock:
+            job = self._jobs.get(bot_id)
+            if job is None:
+                return None
+            previous = job['state']
+            process = self._processes.get(bot_id)
+            if previous == 'stopping':
+                return previous
+            job.update(state='stopping', stop_deadline=time.monotonic() + self.stop_timeout, on_stopped=on_stopped)
+            if process is not None and process.poll() is None:
+                process.terminate()
+        self._wakeup.set()
+        return previous
+
+    def is_active(self, bot_id):
+        with self._lock:
+            job = self._jobs.get(bot_id)
+            return job is not None and job['state'] in ('starting', 'running', 'stopping')
+
+    def job(self, bot_id):
+        with self._lock:
+            job = self._jobs.get(bot_id)
+            return self._public(job) if job else None
+
+    def jobs(self):
+        with self._lock:
+            return {bot_id: self._public(job) for bot_id, job in self._jobs.items()}
+
+    def shutdown(self):
+        """Termina tutti i processi ancora attivi (chiamata all'uscita del server)."""
+        with self._lock:
+            self._closed = True
+            processes = list(self._processes.values())
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        self._wakeup.set()
+
+    @staticmethod
+    def _public(job):
+        return {key: job[key] for key in ('state', 'pid', 'error')}
+
+    def _monitor_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                if self._check_jobs():
+                    if self.on_change is not None:
+                        self.on_change()
+            except Exception as e:
+                print(f"[supervisor] Errore nel monitor: {str(e)}")
+
+    def _check_jobs(self):
+        """Un passaggio del monitor su tutti i job; True se almeno uno ha cambiato stato."""
+        changed = False
+        callbacks = []
+        with self._lock:
+            items = [(bot_id, job, self._processes.get(bot_id)) for bot_id, job in self._jobs.items()]
+
+        for bot_id, job, process in items:
+            state = job['state']
+            if process is None:
+                continue
+            if state in ('finished', 'failed'):
+                process.poll() # Raccoglie il processo (niente zombie) senza cambiare lo stato
+                continue
+            returncode = process.poll()
+
+            if state == 'stopping':
+                if returncode is None and time.monotonic() > job['stop_deadline']:
+                    process.kill()
+                    continue
+                if returncode is None:
+                    continue
+                with self._lock:
+                    if self._jobs.get(bot_id) is job:
+                        del self._jobs[bot_id]
+                        self._processes.pop(bot_id, None)
+                if job.get('on_stopped') is not None:
+                    callbacks.append(job['on_stopped'])
+                changed = True
+                continue
+
+            new_state, error = state, None
+            if state == 'starting':
+                ready_check = job['ready_check']
+                result = ready_check(bot_id) if ready_check else ('ready', None)
+                if result is not None:
+                    new_state, error = ('running', None) if result[0] == 'ready' else ('failed', result[1])
+                elif returncode is None and time.monotonic() - job['started'] > self.start_timeout:
+                    new_state = 'running' # Nessun handshake entro il timeout: il processo e' comunque vivo
+            if returncode is not None and new_state in ('starting', 'running'):
+                new_state = 'finished' if returncode == 0 else 'failed'
+                error = None if returncode == 0 else f"Processo terminato (exit code {returncode})"
+            if new_state == 'failed' and returncode is None:
+                process.terminate() # Errore riportato dal bot (es. dati): il processo sta per uscire
+
+            if new_state != state:
+                with self._lock:
+                    if self._jobs.get(bot_id) is job and job['state'] == state:
+                        job.update(state=new_state, error=error)
+                        changed = True
+
+        # Callback (es. rimozione file di stato con retry) fuori dal lock e fuori dal monitor
+        for callback in callbacks:
+            threading.Thread(target=callback, daemon=True).start()
+        return changed
@@ -0,0 +1,333 @@
+import os
+import math
+import json
+import hashlib
+import argparse
+
+import numpy as np
+
+# Codifica di missing_type di LightGBM
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_CODES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# Stessa soglia di LightGBM (kZeroThreshold) per considerare un valore "zero"
+ZERO_THRESHOLD = 1e-35
+
+COMPILED_VERSION = 1
+
+# Sotto questa soglia di righe la funzione generata riga per riga batte la visita vettoriale
+SMALL_BATCH = 512
+
+_ARRAYS = ('roots', 'split_feature', 'threshold', 'left', 'right', 'default_left', 'missing_type', 'leaf_value')
+
+
+def compiled_path(model_path):
+    """File .npz dell'esportazione compilata di un modello (accanto al .pkl)."""
+    return f"{model_path}_compiled.npz"
+
+
+def file_hash(path):
+    """SHA-1 del file sorgente: lega l'esportazione al contenuto del .pkl (non alla data di modifica)."""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class CompiledModel:
+    """
+    Classificatore binario LightGBM convertito in array piatti NumPy:
+    tutti i nodi di tutti gli alberi stanno negli stessi array (feature, soglia,
+    figli sinistro/destro, direzione di default per i mancanti), le foglie in leaf_value.
+    Un figlio >= 0 e' un nodo interno, un figlio < 0 e' la foglia ~figlio.
+    Espone predict_proba come il modello sklearn, piu' predict_one per la singola candela.
+    """
+
+    def __init__(self, arrays, feature_names, sigmoid=1.0, source_hash=None):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.feature_names = list(feature_names)
+        self.sigmoid = sigmoid
+        self.source_hash = source_hash
+
+        # Copie in liste Python: per una riga sola l'indicizzazione di liste e' molto piu' veloce di NumPy
+        self._roots = self.roots.tolist()
+        self._feature = self.split_feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._left = self.left.tolist()
+        self._right = self.right.tolist()
+        self._leaf = self.leaf_value.tolist()
+        self._zero_missing = bool((self.missing_type == MISSING_ZERO).any())
+        self._score_one = self._generate_scorer()
+
+    @property
+    def num_trees(self):
+        return len(self.roots)
+
+    def _generate_scorer(self):
+        """
+        Genera una funzione Python con gli alberi srotolati in if/else annidati (soglie e foglie
+        come costanti): per la singola riga e' il modo piu' veloce di percorrerli in CPython.
+        Se la generazione fallisce (alberi troppo profondi) si usa la visita sugli array.
+        """
+        args = ', '.join(f"x{i}" for i in range(len(self.feature_names)))
+        lines = [f"def score({args}):", "    s = 0.0"]
+
+        def emit(node, indent):
+            pad = ' ' * indent
+            if node < 0:
+                lines.append(f"{pad}s += {self._leaf[~node]!r}")
+                return
+            lines.append(f"{pad}if x{self._feature[node]} <= {self._threshold[node]!r}:")
+            emit(self._left[node], indent + 4)
+            lines.append(f"{pad}else:")
+            emit(self._right[node], indent + 4)
+
+        for root in self._roots:
+            emit(root, 4)
+        lines.append("    return s")
+
+        namespace = {}
+        try:
+            exec(compile('\n'.join(lines), '<compiled_model>', 'exec'), namespace)
+        except (RecursionError, SyntaxError, MemoryError):
+            return None
+        return namespace['score']
+
+    def _walk_one(self, x):
+        feature, threshold, left, right, leaf = self._feature, self._threshold, self._left, self._right, self._leaf
+        score = 0.0
+        for node in self._roots:
+            while node >= 0:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            score += leaf[~node]
+        return score
+
+    def predict_one(self, row):
+        """Probabilità della classe 1 per una riga (sequenza di feature nell'ordine di feature_names)."""
+        x = [float(value) for value in row]
+        if any(value != value or (self._zero_missing and abs(value) <= ZERO_THRESHOLD) for value in x):
+            # Valori mancanti (o zeri con missing_type Zero): serve la logica completa di default_left
+            return float(self.predict_proba(np.array([x]))[0, 1])
+
+        score = self._score_one(*x) if self._score_one is not None else self._walk_one(x)
+        return 1.0 / (1.0 + math.exp(-self.sigmoid * score))
+
+    def raw_score(self, X):
+        """
+        Somma delle foglie per ogni riga di X (n x feature). Ogni albero viene visitato una volta
+        sola partizionando gli indici delle righe nodo per nodo: il costo in chiamate NumPy
+        dipende dal numero di nodi, non dal numero di righe.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n = X.shape[0]
+        columns = [np.ascontiguousarray(X[:, i]) for i in range(X.shape[1])]
+        # Logica dei mancanti solo se servono (NaN presenti o split con missing_type Zero)
+        exact = self._zero_missing or bool(np.isnan(X).any())
+        if n <= SMALL_BATCH and not exact and self._score_one is not None:
+            # Pochi simboli per candela (portfolio, model server): costo fisso trascurabile riga per riga
+            return np.array([self._score_one(*row) for row in X.tolist()], dtype=np.float64)
+
+        score = np.zeros(n)
+        leaves = np.empty(n)
+        for root in self._roots:
+            stack = [(root, None)] # None = tutte le righe
+            while stack:
+                node, rows = stack.pop()
+                if node < 0:
+                    if rows is None:
+                        leaves[:] = self._leaf[~node]
+                    else:
+                        leaves[rows] = self._leaf[~node]
+                    continue
+                column = columns[self._feature[node]]
+                values = column if rows is None else column[rows]
+                go_left = self._go_left(values, node) if exact else values <= self._threshold[node]
+                left_rows = np.flatnonzero(go_left) if rows is None else rows[go_left]
+                right_rows = np.flatnonzero(~go_left) if rows is None else rows[~go_left]
+                if left_rows.size:
+                    stack.append((self._left[node], left_rows))
+                if right_rows.size:
+                    stack.append((self._right[node], right_rows))
+            # Somma albero per albero, nello stesso ordine di LightGBM
+            score += leaves
+        return score
+
+    def _go_left(self, values, node):
+        """Decisione numerica di LightGBM (NumericalDecision) sul nodo `node`."""
+        missing = self.missing_type[node]
+        nan = np.isnan(values)
+        if missing != MISSING_NAN:
+            values = np.where(nan, 0.0, values)
+        if missing == MISSING_ZERO:
+            use_default = np.abs(values) <= ZERO_THRESHOLD
+        elif missing == MISSING_NAN:
+            use_default = nan
+        else:
+            return values <= self._threshold[node]
+        return np.where(use_default, self.default_left[node], values <= self._threshold[node])
+
+    def predict_proba(self, X):
+        """Come LGBMClassifier.predict_proba: array (n, 2) con le probabilità delle classi 0 e 1."""
+        prob = 1.0 / (1.0 + np.exp(-self.sigmoid * self.raw_score(X)))
+        return np.column_stack([1.0 - prob, prob])
+
+    def save(self, path):
+        meta = {
+            'version': COMPILED_VERSION,
+            'feature_names': self.feature_names,
+            'sigmoid': self.sigmoid,
+            'source_hash': self.source_hash,
+        }
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), **{name: getattr(self, name) for name in _ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != COMPILED_VERSION:
+                raise ValueError(f"Versione esportazione non supportata: {meta.get('version')}")
+            arrays = {name: data[name] for name in _ARRAYS}
+        return cls(arrays, meta['feature_names'], meta['sigmoid'], meta.get('source_hash'))
+
+
+def compile_model(model, source_hash=None):
+    """
+    Converte un LGBMClassifier (o un Booster) binario in CompiledModel
+    leggendo la struttura degli alberi da dump_model().
+    """
+    booster = getattr(model, 'booster_', model)
+    dump = booster.dump_model()
+
+    objective = dump.get('objective', '')
+    if not objective.startswith('binary') or dump.get('num_tree_per_iteration', 1) != 1:
+        raise ValueError(f"Obiettivo non supportato: {objective}")
+    if dump.get('average_output'):
+        raise ValueError("Modelli con average_output (random forest) non supportati")
+    sigmoid = 1.0
+    for token in objective.split():
+        if token.startswith('sigmoid:'):
+            sigmoid = float(token.split(':', 1)[1])
+
+    split_feature, threshold, left, right, default_left, missing_type, leaf_value = [], [], [], [], [], [], []
+
+    def add(node):
+        """Aggiunge il sottoalbero e restituisce il suo indice (>= 0 nodo, < 0 foglia)."""
+        if 'split_index' not in node:
+            leaf_value.append(node['leaf_value'])
+            return ~(len(leaf_value) - 1)
+        if node.get('decision_type', '<=') != '<=':
+            raise ValueError("Split categorici non supportati")
+        index = len(split_feature)
+        split_feature.append(node['split_feature'])
+        threshold.append(node['threshold'])
+        default_left.append(node['default_left'])
+        missing_type.append(_MISSING_CODES[node['missing_type']])
+        left.append(0)
+        right.append(0)
+        left[index] = add(node['left_child'])
+        right[index] = add(node['right_child'])
+        return index
+
+    roots = [add(tree['tree_structure']) for tree in dump['tree_info']]
+    arrays = {
+        'roots': np.array(roots, dtype=np.int64),
+        'split_feature': np.array(split_feature, dtype=np.int64),
+        'threshold': np.array(threshold, dtype=np.float64),
+        'left': np.array(left, dtype=np.int64),
+        'right': np.array(right, dtype=np.int64),
+        'default_left': np.array(default_left, dtype=bool),
+        'missing_type': np.array(missing_type, dtype=np.int8),
+        'leaf_value': np.array(leaf_value, dtype=np.float64),
+    }
+    return CompiledModel(arrays, dump['feature_names'], sigmoid, source_hash)
+
+
+def export_model(model_path, model=None):
+    """Compila il modello .pkl indicato e salva l'esportazione accanto ad esso."""
+    if model is None:
+        import joblib
+        model = joblib.load(model_path)
+    compiled = compile_model(model, source_hash=file_hash(model_path))
+    compiled.save(compiled_path(model_path))
+    return compiled
+
+
+def load_feature_list(path):
+    """
+    Lista feature salvata con joblib.dump accanto al modello: per una lista semplice il file
+    e' un pickle standard, quindi joblib (che importa anche asyncio) serve solo se compresso.
+    """
+    import pickle
+
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except pickle.UnpicklingError:
+        import joblib
+        return joblib.load(path)
+
+
+def load_predictor(model_path):
+    """
+    Predittore per un modello .pkl: l'esportazione compilata se aggiornata
+    (nessun import di lightgbm/joblib), altrimenti compilazione in memoria dal .pkl.
+    """
+    path = compiled_path(model_path)
+    if os.path.exists(path):
+        try:
+            compiled = CompiledModel.load(path)
+            if compiled.source_hash == file_hash(model_path):
+                return compiled
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Esportazione compilata non valida ({e}): ricompilazione dal modello")
+
+    import joblib
+    return compile_model(joblib.load(model_path), source_hash=file_hash(model_path))
+
+
+def check_parity(model_path, data_path, tolerance=1e-12):
+    """
+    Confronta le probabilità del modello compilato con LGBMClassifier.predict_proba
+    su tutte le candele valide del dataset e su righe con valori mancanti.
+    Restituisce (ok, scarto massimo batch, scarto massimo per singola riga).
+    """
+    import joblib
+    import pandas as pd
+    import feature_store
+
+    model = joblib.load(model_path)
+    compiled = compile_model(model)
+    features = feature_store.load_features(data_path)
+    X = features.matrix(compiled.feature_names)
+    X = X[features.valid_mask(compiled.feature_names)]
+
+    # Righe con valori mancanti: verificano default_left/missing_type
+    rng = np.random.default_rng(42)
+    missing = X[rng.choice(len(X), size=min(200, len(X)), replace=False)].copy()
+    missing[rng.random(missing.shape) < 0.3] = np.nan
+    X = np.vstack([X, missing])
+
+    expected = model.predict_proba(pd.DataFrame(X, columns=compiled.feature_names))[:, 1]
+    batch_diff = float(np.abs(compiled.predict_proba(X)[:, 1] - expected).max())
+    row_diff = float(max(abs(compiled.predict_one(row) - prob) for row, prob in zip(X, expected)))
+    return max(batch_diff, row_diff) <= tolerance, batch_diff, row_diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Esporta un modello LightGBM in forma compilata (array NumPy)')
+    parser.add_argument('--model', type=str, default='trading_model.pkl', help='Nome del modello in backend/models')
+    parser.add_argument('--check', type=str, default=None, help='CSV su cui verificare la parita con LightGBM')
+    parser.add_argument('--tolerance', type=float, default=1e-12, help='Scarto massimo ammesso')
+
+    args = parser.parse_args()
+    model_path = os.path.join('backend', 'models', args.model)
+    compiled = export_model(model_path)
+    print(f"Esportato: {compiled_path(model_path)} ({compiled.num_trees} alberi, "
+          f"{len(compiled.threshold)} nodi, {len(compiled.leaf_value)} foglie)")
+
+    if args.check:
+        ok, batch_diff, row_diff = check_parity(model_path, args.check, args.tolerance)
+        print(f"Scarto max batch: {batch_diff:.3e}")
+        print(f"Scarto max riga:  {row_diff:.3e}")
+        print("Parita OK" if ok else "Parita NON rispettata")
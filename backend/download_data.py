@@ -1,8 +1,184 @@
-import yfinance as yf
 import pandas as pd
 import os
+import time
+import random
+import shutil
 import argparse
-import sys
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+DATA_DIR = 'backend/data'
+
+REQUIRED_COLS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+DAILY_INTERVALS = ['1d', '5d', '1wk', '1mo', '3mo']
+
+
+def yfinance_download(ticker, start, end, interval):
+    """Downloader di default: Yahoo Finance (import locale, i test offline usano uno stub)."""
+    import yfinance as yf
+
+    return yf.download(ticker, start=start, end=end, interval=interval, progress=False, threads=False)
+
+
+def normalize(data, interval):
+    """
+    Porta l'output di yf.download al formato CSV del progetto:
+    colonne Date, Open, High, Low, Close, Volume e date senza fuso orario.
+    """
+    # Reset dell'indice per avere la data come colonna
+    data = data.reset_index()
+
+    # Gestione MultiIndex (comune nelle versioni recenti di yfinance)
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = [col[0] for col in data.columns]
+
+    # Nota: Per i dati intraday la colonna si chiama 'Datetime' o 'Date'
+    if 'Datetime' in data.columns:
+        data = data.rename(columns={'Datetime': 'Date'})
+
+    data = data[REQUIRED_COLS].copy()
+
+    # Rimuovi informazioni sul fuso orario dalla colonna Date se presenti
+    dates = pd.to_datetime(data['Date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    data['Date'] = dates
+
+    # Formattazione per il CSV
+    fmt = '%Y-%m-%d' if interval in DAILY_INTERVALS else '%Y-%m-%d %H:%M:%S'
+    data['Date'] = data['Date'].dt.strftime(fmt)
+    return data
+
+
+def output_path(ticker, data_dir=DATA_DIR):
+    clean_ticker = ticker.replace('=', '_').replace('-', '_')
+    return os.path.join(data_dir, f"{clean_ticker}.csv")
+
+
+def last_timestamp(path):
+    """Data dell'ultima candela del CSV, leggendo solo la coda del file (None se vuoto)."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    if len(lines) < 2 and size <= 4096:
+        return None # Solo intestazione
+    return pd.Timestamp(lines[-1].split(b',', 1)[0].decode())
+
+
+def write_atomic(path, new_rows, append):
+    """
+    Scrive (o accoda a) un CSV su un file temporaneo e lo sostituisce con os.replace:
+    chi legge (bar_store, bot in esecuzione) vede sempre il file vecchio o quello completo.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if append:
+            shutil.copyfile(path, tmp_path)
+            with open(tmp_path, 'rb+') as f:
+                # Garantisce il ritorno a capo prima delle nuove righe
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            new_rows.to_csv(tmp_path, mode='a', header=False, index=False)
+        else:
+            new_rows.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def expects_data(start, end):
+    """
+    True se l'intervallo [start, end) contiene almeno un giorno feriale, quindi una risposta
+    vuota non e' plausibile (i mercati meno attivi, come il Forex, chiudono solo nel weekend).
+    """
+    return bool(np.busday_count(pd.Timestamp(start).date(), pd.Timestamp(end).date()) > 0)
+
+
+def fetch_with_retry(downloader, ticker, start, end, interval, retries=3, backoff=1.0, retry_empty=False):
+    """
+    Chiama il downloader ritentando gli errori con backoff esponenziale e jitter.
+    Con retry_empty anche una risposta vuota viene ritentata: yfinance segnala rate limit ed
+    errori di rete restituendo un DataFrame vuoto invece di sollevare.
+    Restituisce (dati, tentativi); l'ultimo errore viene rilanciato, l'ultima risposta vuota restituita.
+    """
+    for attempt in range(1, retries + 2):
+        try:
+            data = downloader(ticker, start, end, interval)
+            if not (retry_empty and (data is None or data.empty)) or attempt > retries:
+                return data, attempt
+        except Exception:
+            if attempt > retries:
+                raise
+        time.sleep(backoff * 2 ** (attempt - 1) * (1 + random.random() * 0.1))
+
+
+def update_ticker(ticker, start, end, interval='1d', data_dir=DATA_DIR, downloader=None,
+                  retries=3, backoff=1.0, full=False):
+    """
+    Aggiornamento incrementale di un ticker: se il CSV esiste vengono richieste solo
+    le candele successive all'ultima su disco e accodate in modo atomico, altrimenti
+    (o con full=True) viene scaricato tutto l'intervallo start -> end.
+    Restituisce un riepilogo (status: created, appended, up-to-date, empty, error).
+    """
+    downloader = downloader or yfinance_download
+    path = output_path(ticker, data_dir)
+    result = {'ticker': ticker, 'path': path, 'rows_added': 0, 'attempts': 0}
+    started = time.perf_counter()
+    try:
+        last = None if full or not os.path.exists(path) else last_timestamp(path)
+        fetch_start = start
+        if last is not None:
+            # Daily: dal giorno successivo; intraday: dal giorno dell'ultima candela, poi filtro sul timestamp
+            fetch_start = (last + pd.Timedelta(days=1) if interval in DAILY_INTERVALS else last).strftime('%Y-%m-%d')
+            if pd.Timestamp(fetch_start) >= pd.Timestamp(end):
+                result['status'] = 'up-to-date'
+                return result
+
+        data, result['attempts'] = fetch_with_retry(
+            downloader, ticker, fetch_start, end, interval, retries, backoff, retry_empty=expects_data(fetch_start, end)
+        )
+        if data is None or data.empty:
+            result['status'] = 'up-to-date' if last is not None else 'empty'
+            return result
+
+        data = normalize(data, interval)
+        if last is not None:
+            data = data[pd.to_datetime(data['Date']) > last]
+            if data.empty:
+                result['status'] = 'up-to-date'
+                return result
+
+        os.makedirs(data_dir, exist_ok=True)
+        write_atomic(path, data, append=last is not None)
+        result['rows_added'] = len(data)
+        result['status'] = 'appended' if last is not None else 'created'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    finally:
+        result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def download_many(tickers, start, end, interval='1d', data_dir=DATA_DIR, downloader=None,
+                  workers=8, retries=3, backoff=1.0, full=False):
+    """
+    Aggiornamento in blocco: un thread pool limita le richieste contemporanee a `workers`
+    (il lavoro e' quasi tutto attesa di rete). Restituisce i riepiloghi nell'ordine dei ticker.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(update_ticker, ticker, start, end, interval, data_dir, downloader, retries, backoff, full)
+            for ticker in tickers
+        ]
+        return [future.result() for future in futures]
+
 
 def download_ticker(ticker, start, end, interval="1d"):
     """
@@ -12,65 +188,52 @@ def download_ticker(ticker, start, end, interval="1d"):
     print(f"Ticker:   {ticker}")
     print(f"Periodo:  {start} -> {end}")
     print(f"Interval: {interval}")
-    
-    try:
-        data = yf.download(ticker, start=start, end=end, interval=interval)
-        
-        if data.empty:
-            print("\n!!! ERRORE: Nessun dato scaricato !!!")
-            print("Possibili cause:")
-            print("1. Il ticker potrebbe essere errato (es. usa 'EURUSD=X' per il Forex).")
-            print("2. L'intervallo temporale richiesto non è disponibile per questo ticker.")
-            print("3. Per intervalli intraday (15m, 1h), Yahoo Finance fornisce solo dati recenti (max 60 giorni).")
-            return
-
-        # Debug: Mostra le prime righe e le colonne
-        print(f"\nDati scaricati con successo! Righe totali: {len(data)}")
-
-        # Reset dell'indice per avere la data come colonna
-        data = data.reset_index()
-        
-        # Gestione MultiIndex (comune nelle versioni recenti di yfinance)
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = [col[0] if col[1] == '' else col[0] for col in data.columns]
-
-        # Assicuriamoci che le colonne siano Date, Open, High, Low, Close, Volume
-        # Nota: Per i dati intraday la colonna si chiama 'Datetime' o 'Date'
-        if 'Datetime' in data.columns:
-            data = data.rename(columns={'Datetime': 'Date'})
-        
-        required_cols = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-        data = data[required_cols]
-        
-        # Rimuovi informazioni sul fuso orario dalla colonna Date se presenti
-        data['Date'] = pd.to_datetime(data['Date']).dt.tz_localize(None)
-        
-        # Formattazione per il CSV
-        if interval in ['1d', '1wk', '1mo']:
-            data['Date'] = data['Date'].dt.strftime('%Y-%m-%d')
-        else:
-            data['Date'] = data['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Creazione cartella se non esiste
-        os.makedirs('backend/data', exist_ok=True)
-        
-        clean_ticker = ticker.replace('=', '_').replace('-', '_')
-        output_path = f"backend/data/{clean_ticker}.csv"
-        
-        data.to_csv(output_path, index=False)
-        
-        print(f"File salvato in: {os.path.abspath(output_path)}")
-        print(f"--- Download Completato ---")
 
-    except Exception as e:
-        print(f"\n!!! ERRORE INASPETTATO: {str(e)} !!!")
+    result = update_ticker(ticker, start, end, interval, full=True)
+
+    if result['status'] == 'empty':
+        print("\n!!! ERRORE: Nessun dato scaricato !!!")
+        print("Possibili cause:")
+        print("1. Il ticker potrebbe essere errato (es. usa 'EURUSD=X' per il Forex).")
+        print("2. L'intervallo temporale richiesto non è disponibile per questo ticker.")
+        print("3. Per intervalli intraday (15m, 1h), Yahoo Finance fornisce solo dati recenti (max 60 giorni).")
+        return
+    if result['status'] == 'error':
+        print(f"\n!!! ERRORE INASPETTATO: {result['error']} !!!")
+        return
+
+    print(f"\nDati scaricati con successo! Righe totali: {result['rows_added']}")
+    print(f"File salvato in: {os.path.abspath(result['path'])}")
+    print(f"--- Download Completato ---")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Download data from Yahoo Finance')
     parser.add_argument('--ticker', type=str, default='EURUSD=X', help='Ticker (es. BTC-USD, EURUSD=X)')
+    parser.add_argument('--tickers', type=str, nargs='+', default=None, help='Modalita bulk: lista di ticker (aggiornamento incrementale)')
+    parser.add_argument('--tickers_file', type=str, default=None, help='Modalita bulk: file con un ticker per riga')
     parser.add_argument('--start', type=str, required=True, help='Data inizio (YYYY-MM-DD)')
     parser.add_argument('--end', type=str, required=True, help='Data fine (YYYY-MM-DD)')
     parser.add_argument('--interval', type=str, default='1d', help='Interval (1d, 1h, 15m, 5m)')
-    
+    parser.add_argument('--workers', type=int, default=8, help='Download contemporanei (bulk)')
+    parser.add_argument('--retries', type=int, default=3, help='Tentativi aggiuntivi per ticker (bulk)')
+    parser.add_argument('--full', action='store_true', help='Riscarica tutto l\'intervallo anche se il CSV esiste (bulk)')
+
     args = parser.parse_args()
-    download_ticker(args.ticker, args.start, args.end, args.interval)
+    tickers = list(args.tickers or [])
+    if args.tickers_file:
+        with open(args.tickers_file, 'r') as f:
+            tickers += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    if not tickers:
+        download_ticker(args.ticker, args.start, args.end, args.interval)
+    else:
+        start = time.perf_counter()
+        results = download_many(
+            tickers, args.start, args.end, args.interval,
+            workers=args.workers, retries=args.retries, full=args.full
+        )
+        for result in results:
+            detail = result.get('error', f"+{result['rows_added']} righe")
+            print(f"{result['ticker']:<12} {result['status']:<11} {detail} ({result['attempts']} tentativi, {result['seconds']:.2f}s)")
+        print(f"\n{len(results)} ticker in {time.perf_counter() - start:.2f}s")
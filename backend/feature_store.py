@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import argparse
+
+import numpy as np
+
+import bar_store
+from indicators import FEATURE_COLUMNS, IndicatorEngine
+
+# Specifica delle feature: cambiarla (parametri o versione del motore) invalida le matrici salvate
+FEATURE_SPEC = {
+    'engine': 'indicators.IndicatorEngine',
+    'engine_version': 1,
+    'columns': FEATURE_COLUMNS,
+    'rsi': 14,
+    'ema': [20, 50],
+    'macd': [12, 26, 9],
+}
+
+STORE_VERSION = 1
+
+
+def spec_hash(spec=None):
+    """Hash breve e stabile della specifica delle feature."""
+    payload = json.dumps(spec or FEATURE_SPEC, sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def dataset_hash(bars, rows=None):
+    """
+    Hash del contenuto delle prime `rows` candele (timestamp e close, gli unici input degli indicatori).
+    Calcolato sul prefisso, permette di riconoscere un dataset a cui sono state solo aggiunte candele.
+    """
+    rows = len(bars) if rows is None else rows
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(bars.timestamps[:rows]).tobytes())
+    digest.update(np.ascontiguousarray(bars.close[:rows]).tobytes())
+    return digest.hexdigest()
+
+
+class FeatureSet:
+    """
+    Matrice delle feature di un dataset in formato colonnare (una riga per feature),
+    allineata riga per riga alle candele. Le candele di warm-up valgono NaN.
+    """
+    __slots__ = ('columns', 'values', 'status')
+
+    def __init__(self, columns, values, status=None):
+        self.columns = list(columns)
+        self.values = values
+        self.status = status # 'hit', 'append', 'build' o None se calcolata in memoria
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def matrix(self, feature_cols=None):
+        """Array (candele x feature) nell'ordine di feature_cols, pronto per predict_proba."""
+        index = [self.columns.index(col) for col in (feature_cols or self.columns)]
+        return self.values[index].T
+
+    def valid_mask(self, feature_cols=None):
+        """True sulle candele in cui tutte le feature richieste sono valorizzate."""
+        return ~np.isnan(self.matrix(feature_cols)).any(axis=1)
+
+    def to_dataframe(self, feature_cols=None):
+        import pandas as pd
+
+        return pd.DataFrame(self.matrix(feature_cols), columns=feature_cols or self.columns)
+
+
+def compute_features(closes, engine=None):
+    """
+    Calcola le feature con lo stesso IndicatorEngine usato dall'agente candela per candela
+    (parita' train/serve garantita). Con `engine` gia' avanzato prosegue dal suo stato.
+    Restituisce (matrice colonnare, engine).
+    """
+    engine = engine or IndicatorEngine()
+    values = np.empty((len(FEATURE_COLUMNS), len(closes)), dtype=np.float64)
+    row = values.T # vista (candele x feature) sulla stessa memoria
+    for i, close in enumerate(np.asarray(closes, dtype=np.float64).tolist()):
+        engine.update(close)
+        row[i] = [np.nan if value is None else value for value in engine.vector()]
+    return values, engine
+
+
+def features_from_dataframe(df):
+    """FeatureSet calcolato in memoria per un DataFrame OHLCV (senza cache su disco)."""
+    close = df['Close'] if 'Close' in df.columns else df['close']
+    values, _ = compute_features(close.to_numpy(dtype=np.float64))
+    return FeatureSet(FEATURE_COLUMNS, values)
+
+
+def store_paths(csv_path, cache_dir=None, spec=None, label=None):
+    """Percorsi di matrice, stato del motore e metadati per (dataset, timeframe ricampionato, specifica)."""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.cache', 'features')
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    if label:
+        name = f"{name}.{label}"
+    base = os.path.join(cache_dir, f"{name}.{spec_hash(spec)}")
+    return f"{base}.features.npy", f"{base}.state.pkl", f"{base}.meta.json"
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _tmp_path(path, suffix=''):
+    """File temporaneo unico per processo e chiamata: piu' worker possono salvare lo stesso dataset."""
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp{suffix}"
+
+
+def _save(csv_path, cache_dir, values, engine, bars):
+    """Scrittura atomica di matrice e stato del motore, metadati per ultimi (marcatore di validita')."""
+    values_path, state_path, meta_path = store_paths(csv_path, cache_dir, label=bars.label)
+    os.makedirs(os.path.dirname(values_path), exist_ok=True)
+
+    tmp_values = _tmp_path(values_path, '.npy')
+    np.save(tmp_values, values)
+    os.replace(tmp_values, values_path)
+
+    tmp_state = _tmp_path(state_path)
+    with open(tmp_state, 'wb') as f:
+        pickle.dump(engine, f)
+    os.replace(tmp_state, state_path)
+
+    meta = {
+        'version': STORE_VERSION,
+        'spec_hash': spec_hash(),
+        'spec': FEATURE_SPEC,
+        'rows': len(bars),
+        'dataset_hash': dataset_hash(bars),
+    }
+    tmp_meta = _tmp_path(meta_path)
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=4)
+    os.replace(tmp_meta, meta_path)
+
+
+def _load_entry(values_path, state_path, rows, mmap_mode=None, with_state=True):
+    """
+    Matrice (e stato del motore) salvati, solo se coerenti con i metadati: una voce scritta a meta'
+    da un altro processo (righe o colonne diverse, file troncati) restituisce None e va ricostruita.
+    """
+    try:
+        values = np.load(values_path, mmap_mode=mmap_mode)
+        if values.shape != (len(FEATURE_COLUMNS), rows):
+            return None
+        if not with_state:
+            return values, None
+        with open(state_path, 'rb') as f:
+            engine = pickle.load(f)
+        if engine.bars != rows:
+            return None
+        return values, engine
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def load_features(csv_path, cache_dir=None, bars=None):
+    """
+    Restituisce il FeatureSet di un CSV:
+    - hit: dataset invariato, matrice letta (memory-mapped) dal disco
+    - append: al dataset sono state aggiunte candele, si calcolano solo le nuove
+      ripartendo dallo stato salvato del motore
+    - build: nessuna matrice valida, calcolo completo
+    """
+    bars = bars if bars is not None else bar_store.load_bars(csv_path)
+    values_path, state_path, meta_path = store_paths(csv_path, cache_dir, label=bars.label)
+    meta = _read_meta(meta_path)
+
+    usable = (
+        meta is not None
+        and meta.get('version') == STORE_VERSION
+        and meta.get('spec_hash') == spec_hash()
+        and meta.get('rows', 0) <= len(bars)
+        and os.path.exists(values_path)
+        and os.path.exists(state_path)
+        and meta.get('dataset_hash') == dataset_hash(bars, meta.get('rows'))
+    )
+
+    if usable and meta['rows'] == len(bars):
+        entry = _load_entry(values_path, state_path, meta['rows'], mmap_mode='r', with_state=False)
+        if entry is not None:
+            return FeatureSet(FEATURE_COLUMNS, entry[0], status='hit')
+
+    entry = _load_entry(values_path, state_path, meta['rows']) if usable else None
+    if entry is not None:
+        new_values, engine = compute_features(bars.close[meta['rows']:], entry[1])
+        values = np.concatenate([entry[0], new_values], axis=1)
+        status = 'append'
+    else:
+        values, engine = compute_features(bars.close)
+        status = 'build'
+
+    _save(csv_path, cache_dir, values, engine, bars)
+    return FeatureSet(FEATURE_COLUMNS, values, status=status)
+
+
+def build_features(csv_path, cache_dir=None):
+    """
+    Costruisce o aggiorna la matrice in cache di un CSV (eseguibile in un processo worker):
+    restituisce solo (csv_path, candele, stato, secondi), la matrice resta su disco.
+    """
+    start = time.perf_counter()
+    features = load_features(csv_path, cache_dir)
+    return csv_path, len(features), features.status, time.perf_counter() - start
+
+
+def training_frame(csv_path, cache_dir=None):
+    """
+    DataFrame per il training con le stesse righe di train_model.prepare_data:
+    feature, target (close successiva > close attuale) e candele di warm-up rimosse.
+    """
+    bars = bar_store.load_bars(csv_path)
+    features = load_features(csv_path, cache_dir, bars=bars)
+    df = features.to_dataframe()
+    close = np.asarray(bars.close)
+    target = np.zeros(len(close), dtype=int)
+    target[:-1] = close[1:] > close[:-1]
+    df['target'] = target
+    return df[features.valid_mask()]
+
+
+def training_chunks(csv_path, chunk_rows=100000):
+    """
+    Stesse righe di training_frame lette a blocchi di chunk_rows candele, senza caricare il CSV:
+    lo stato dell'IndicatorEngine prosegue da un blocco all'altro e l'ultima candela di ogni
+    blocco attende la prima del successivo per il target. Genera (X, y) con X (righe x feature).
+    """
+    import pandas as pd
+
+    engine = None
+    carry_close, carry_row = None, None
+    reader = pd.read_csv(csv_path, usecols=['Close'], chunksize=chunk_rows, float_precision='round_trip')
+    for chunk in reader:
+        closes = chunk['Close'].to_numpy(dtype=np.float64)
+        if len(closes) == 0:
+            continue
+        values, engine = compute_features(closes, engine)
+        rows = values.T
+        if carry_row is not None:
+            closes = np.concatenate([[carry_close], closes])
+            rows = np.concatenate([carry_row, rows])
+        # L'ultima candela resta in sospeso fino al blocco successivo
+        carry_close, carry_row = closes[-1], rows[-1:]
+        X, target = rows[:-1], closes[1:] > closes[:-1]
+        valid = ~np.isnan(X).any(axis=1)
+        if valid.any():
+            yield np.ascontiguousarray(X[valid]), target[valid].astype(np.int8)
+
+    # Ultima candela del dataset: nessuna successiva, target 0 come in training_frame
+    if carry_row is not None and not np.isnan(carry_row).any():
+        yield carry_row.copy(), np.zeros(1, dtype=np.int8)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Precalcola le matrici delle feature dei CSV di backend/data')
+    parser.add_argument('--data_dir', type=str, default='backend/data', help='Cartella dei CSV')
+
+    args = parser.parse_args()
+    print(f"Specifica feature: {spec_hash()}")
+    for name in sorted(os.listdir(args.data_dir)):
+        if not name.endswith('.csv'):
+            continue
+        features = load_features(os.path.join(args.data_dir, name))
+        print(f"{name}: {features.status} ({len(features)} righe)")
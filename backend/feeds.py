@@ -0,0 +1,58 @@
+import datetime
+
+import backtrader as bt
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class BarStoreData(bt.feed.DataBase):
+    """
+    Feed Backtrader che legge le candele da un bar_store.BarSet invece di fare il parsing
+    riga per riga di un CSV. Gli array memory-mapped vengono letti a blocchi di BLOCK candele
+    man mano che il backtest avanza: all'avvio non si carica niente e in memoria resta un solo
+    blocco, qualunque sia la lunghezza del dataset.
+    Le date vengono convertite con date2num di Backtrader, come in GenericCSVData
+    (dati daily allineati alla fine sessione).
+    """
+    params = (
+        ('bars', None),
+    )
+
+    BLOCK = 4096
+
+    def start(self):
+        super().start()
+        bars = self.p.bars
+        self._arrays = (bars.timestamps, bars.open, bars.high, bars.low, bars.close, bars.volume)
+        self._size = len(bars)
+        self._daily = self.p.timeframe >= bt.TimeFrame.Days
+        self._idx = 0
+        self._block_start = 0
+        self._block = ([],) * len(self._arrays)
+
+    def _load(self):
+        idx = self._idx
+        if idx >= self._size:
+            return False
+
+        pos = idx - self._block_start
+        if pos >= len(self._block[0]):
+            # Blocco successivo: una sola conversione in liste Python per BLOCK candele
+            self._block = tuple(col[idx:idx + self.BLOCK].tolist() for col in self._arrays)
+            self._block_start, pos = idx, 0
+        timestamps, open_, high, low, close, volume = self._block
+
+        dt = EPOCH + datetime.timedelta(seconds=timestamps[pos])
+        if self._daily:
+            dt = datetime.datetime.combine(dt.date(), self.p.sessionend)
+
+        lines = self.lines
+        lines.datetime[0] = self.date2num(dt)
+        lines.open[0] = open_[pos]
+        lines.high[0] = high[pos]
+        lines.low[0] = low[pos]
+        lines.close[0] = close[pos]
+        lines.volume[0] = volume[pos]
+        lines.openinterest[0] = float('NaN')
+        self._idx = idx + 1
+        return True
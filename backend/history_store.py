@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import sqlite3
+import datetime
+
+# Un database SQLite per bot (sessions/history_<bot_id>.db), in WAL: il bot scrive in append
+# a blocchi mentre app.py legge senza bloccarlo. Ogni esecuzione del bot e' una run separata.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    ended TEXT,
+    info TEXT
+);
+CREATE TABLE IF NOT EXISTS equity (
+    run_id INTEGER NOT NULL,
+    bar INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    value REAL NOT NULL,
+    cash REAL,
+    PRIMARY KEY (run_id, bar)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS equity_ts ON equity (run_id, ts);
+CREATE TABLE IF NOT EXISTS trades (
+    run_id INTEGER NOT NULL,
+    bar INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    side TEXT NOT NULL,
+    price REAL NOT NULL,
+    size REAL NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (run_id, ts);
+"""
+
+DEFAULT_POINTS = 1000
+MAX_POINTS = 10000
+
+
+def history_path(sessions_dir, bot_id):
+    return os.path.join(sessions_dir, f'history_{bot_id}.db')
+
+
+def connect(path, readonly=False):
+    if readonly:
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=5)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL') # In WAL: durabile a ogni checkpoint, commit senza fsync
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class HistoryWriter:
+    """
+    Storico append-only di una run: un punto di equity ogni `every` candele e ogni fill.
+    Le righe restano in memoria e vengono scritte in una sola transazione ogni batch_size
+    righe o flush_interval secondi, cosi' il costo per candela resta un append su lista.
+    Gli errori di scrittura vengono stampati e disattivano lo storico, mai la run.
+    """
+
+    def __init__(self, path, info=None, every=1, batch_size=1000, flush_interval=1.0):
+        self.path = path
+        self.every = max(1, int(every))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._equity = []
+        self._trades = []
+        self._last_flush = time.monotonic()
+        self.conn, self.run_id = None, None
+        try:
+            self.conn = connect(path)
+            with self.conn:
+                cursor = self.conn.execute(
+                    'INSERT INTO runs (started, info) VALUES (?, ?)',
+                    (datetime.datetime.now().isoformat(), json.dumps(info or {}))
+                )
+            self.run_id = cursor.lastrowid
+        except sqlite3.Error as e:
+            print(f"Storico non disponibile ({path}): {str(e)}")
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def due(self, bar):
+        """True se per la candela `bar` (1-based) va registrato un punto di equity."""
+        return self.conn is not None and bar % self.every == 0
+
+    def add_equity(self, bar, ts, value, cash=None):
+        self._equity.append((self.run_id, bar, ts, value, cash))
+        self._maybe_flush()
+
+    def extend_equity(self, rows):
+        """Punti di equity (bar, ts, value, cash) gia' calcolati, es. dal motore vettoriale."""
+        run_id = self.run_id
+        self._equity.extend((run_id, bar, ts, value, cash) for bar, ts, value, cash in rows)
+        self.flush()
+
+    def add_trade(self, bar, ts, side, price, size, value=None):
+        self._trades.append((self.run_id, bar, ts, side, price, size, value))
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (len(self._equity) + len(self._trades) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if self.conn is not None and (self._equity or self._trades):
+            try:
+                with self.conn:
+                    # OR REPLACE: l'ultimo punto registrato a fine run puo' coincidere con uno campionato
+                    self.conn.executemany('INSERT OR REPLACE INTO equity VALUES (?, ?, ?, ?, ?)', self._equity)
+                    self.conn.executemany('INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?)', self._trades)
+            except sqlite3.Error as e:
+                print(f"Errore nella scrittura dello storico {self.path}: {str(e)}")
+                self.conn.close()
+                self.conn = None
+        self._equity.clear()
+        self._trades.clear()
+
+    def close(self, final=None):
+        """Scrive le righe in sospeso e chiude la run (final: campi del riepilogo da salvare in info)."""
+        self.flush()
+        if self.conn is None:
+            return
+        try:
+            with self.conn:
+                if final:
+                    info = json.loads(self.conn.execute('SELECT info FROM runs WHERE run_id = ?', (self.run_id,)).fetchone()[0])
+                    info.update(final)
+                    self.conn.execute('UPDATE runs SET info = ? WHERE run_id = ?', (json.dumps(info), self.run_id))
+                self.conn.execute('UPDATE runs SET ended = ? WHERE run_id = ?', (datetime.datetime.now().isoformat(), self.run_id))
+        except sqlite3.Error as e:
+            print(f"Errore nella chiusura dello storico {self.path}: {str(e)}")
+        self.conn.close()
+        self.conn = None
+
+
+def _bar_bounds(conn, run_id, start, end):
+    """Prima e ultima candela registrate nella finestra temporale [start, end] (estremi opzionali)."""
+    first = conn.execute(
+        'SELECT bar FROM equity WHERE run_id = ? AND ts >= ? ORDER BY ts, bar LIMIT 1', (run_id, start or '')
+    ).fetchone()
+    if end:
+        last = conn.execute(
+            'SELECT bar FROM equity WHERE run_id = ? AND ts <= ? ORDER BY ts DESC, bar DESC LIMIT 1', (run_id, end)
+        ).fetchone()
+    else:
+        last = conn.execute('SELECT MAX(bar) FROM equity WHERE run_id = ?', (run_id,)).fetchone()
+    if first is None or last is None or last[0] is None or last[0] < first[0]:
+        return None
+    return first[0], last[0]
+
+
+def query_equity(conn, run_id, start=None, end=None, points=DEFAULT_POINTS):
+    """
+    Curva di equity della finestra ridotta a circa `points` punti: la finestra viene divisa in
+    intervalli di candele uguali e per ognuno si legge l'ultimo punto con una ricerca sulla
+    chiave primaria, quindi il costo dipende da `points` e non dalla lunghezza della run.
+    """
+    bounds = _bar_bounds(conn, run_id, start, end)
+    if bounds is None:
+        return [], 1
+    first, last = bounds
+    stride = max(1, -(-(last - first + 1) // points))
+    if stride == 1:
+        rows = conn.execute(
+            'SELECT bar, ts, value, cash FROM equity WHERE run_id = ? AND bar BETWEEN ? AND ? ORDER BY bar',
+            (run_id, first, last)
+        ).fetchall()
+    else:
+        rows, seen = [], None
+        seek = 'SELECT bar, ts, value, cash FROM equity WHERE run_id = ? AND bar <= ? ORDER BY bar DESC LIMIT 1'
+        for boundary in list(range(first + stride - 1, last, stride)) + [last]:
+            row = conn.execute(seek, (run_id, boundary)).fetchone()
+            if row is not None and row[0] != seen and row[0] >= first:
+                rows.append(row)
+                seen = row[0]
+    return [{'bar': bar, 'ts': ts, 'value': value, 'cash': cash} for bar, ts, value, cash in rows], stride
+
+
+def query_trades(conn, run_id, start=None, end=None, limit=None):
+    sql = 'SELECT bar, ts, side, price, size, value FROM trades WHERE run_id = ? AND ts >= ?'
+    args = [run_id, start or '']
+    if end:
+        sql += ' AND ts <= ?'
+        args.append(end)
+    sql += ' ORDER BY ts, bar'
+    if limit:
+        sql += ' LIMIT ?'
+        args.append(limit)
+    return [
+        {'bar': bar, 'ts': ts, 'side': side, 'price': price, 'size': size, 'value': value}
+        for bar, ts, side, price, size, value in conn.execute(sql, args)
+    ]
+
+
+def read_history(path, run_id=None, start=None, end=None, points=DEFAULT_POINTS, trades_limit=None):
+    """
+    Storico di una run (default: l'ultima) nella finestra [start, end] (timestamp ISO):
+    equity ridotta a circa `points` punti e trade della finestra. None se lo storico non esiste.
+    """
+    if not os.path.exists(path):
+        return None
+    points = max(1, min(int(points), MAX_POINTS))
+    conn = connect(path, readonly=True)
+    try:
+        runs = [
+            {'run_id': rid, 'started': started, 'ended': ended, 'info': json.loads(info or '{}')}
+            for rid, started, ended, info in conn.execute('SELECT run_id, started, ended, info FROM runs ORDER BY run_id')
+        ]
+        if not runs:
+            return None
+        selected = runs[-1] if run_id is None else next((run for run in runs if run['run_id'] == int(run_id)), None)
+        if selected is None:
+            return None
+        equity, stride = query_equity(conn, selected['run_id'], start, end, points)
+        trades = query_trades(conn, selected['run_id'], start, end, trades_limit)
+    finally:
+        conn.close()
+    return {
+        'run': selected,
+        'runs': [run['run_id'] for run in runs],
+        'stride': stride,
+        'equity': equity,
+        'trades': trades,
+    }
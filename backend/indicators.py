@@ -0,0 +1,209 @@
+import math
+import argparse
+
+# Colonne prodotte dal motore, con gli stessi nomi usati da pandas_ta in train_model.prepare_data
+FEATURE_COLUMNS = ['rsi', 'ema_20', 'ema_50', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+
+# Candele necessarie perche' ciascuna feature sia valorizzata
+FEATURE_LOOKBACK = {
+    'rsi': 15,            # RSI 14 sulle differenze: 14 + 1
+    'ema_20': 20,
+    'ema_50': 50,
+    'MACD_12_26_9': 26,   # EMA lenta
+    'MACDh_12_26_9': 34,  # Segnale: 26 + 9 - 1
+    'MACDs_12_26_9': 34,
+}
+
+
+def required_history(feature_cols=None):
+    """
+    Numero minimo di candele richiesto dalle feature indicate (default: tutte).
+    Le colonne non prodotte dal motore vengono ignorate.
+    """
+    lookbacks = [FEATURE_LOOKBACK[col] for col in (feature_cols or FEATURE_COLUMNS) if col in FEATURE_LOOKBACK]
+    return max(lookbacks) if lookbacks else max(FEATURE_LOOKBACK.values())
+
+
+def unknown_features(feature_cols):
+    """Colonne di un modello che il motore non produce (es. symbol o *_xs del modello pooled)."""
+    return [col for col in feature_cols if col not in FEATURE_COLUMNS]
+
+
+class StreamingEMA:
+    """
+    EMA incrementale con la stessa semantica di ta.ema (presma=True, adjust=False):
+    il primo valore e' la media semplice delle prime `length` osservazioni,
+    poi ema = alpha * x + (1 - alpha) * ema_precedente.
+    """
+    __slots__ = ('length', 'alpha', 'value', '_count', '_sum')
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.value = None
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, x):
+        if self._count < self.length:
+            self._count += 1
+            self._sum += x
+            if self._count == self.length:
+                self.value = self._sum / self.length
+            return self.value
+        self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class StreamingRSI:
+    """
+    RSI incrementale con la stessa semantica di ta.rsi: le medie di guadagni e perdite
+    sono RMA di Wilder calcolate come ewm(alpha=1/length, adjust=True), quindi
+    manteniamo numeratore e denominatore pesati invece della sola media.
+    """
+    __slots__ = ('length', 'decay', 'value', '_prev', '_count', '_pos_num', '_neg_num', '_den')
+
+    def __init__(self, length=14):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.value = None
+        self._prev = None
+        self._count = 0
+        self._pos_num = 0.0
+        self._neg_num = 0.0
+        self._den = 0.0
+
+    def update(self, x):
+        if self._prev is None:
+            # La prima differenza e' NaN: nessun contributo alle medie
+            self._prev = x
+            return None
+
+        change = x - self._prev
+        self._prev = x
+        self._count += 1
+        self._pos_num = self._pos_num * self.decay + (change if change > 0 else 0.0)
+        self._neg_num = self._neg_num * self.decay + (-change if change < 0 else 0.0)
+        self._den = self._den * self.decay + 1.0
+
+        if self._count < self.length:
+            return None
+
+        pos_avg = self._pos_num / self._den
+        neg_avg = self._neg_num / self._den
+        total = pos_avg + neg_avg
+        self.value = 100.0 * pos_avg / total if total != 0 else math.nan
+        return self.value
+
+
+class StreamingMACD:
+    """
+    MACD incrementale (fast, slow, signal) equivalente a ta.macd:
+    la linea di segnale e' una EMA della linea MACD a partire dal suo primo valore valido.
+    """
+    __slots__ = ('fast', 'slow', 'signal', '_fast_ema', '_slow_ema', '_signal_ema', 'macd', 'hist', 'signal_value')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self._fast_ema = StreamingEMA(fast)
+        self._slow_ema = StreamingEMA(slow)
+        self._signal_ema = StreamingEMA(signal)
+        self.macd = None
+        self.hist = None
+        self.signal_value = None
+
+    def update(self, x):
+        fast_value = self._fast_ema.update(x)
+        slow_value = self._slow_ema.update(x)
+        if fast_value is None or slow_value is None:
+            return self.macd, self.hist, self.signal_value
+
+        self.macd = fast_value - slow_value
+        self.signal_value = self._signal_ema.update(self.macd)
+        if self.signal_value is not None:
+            self.hist = self.macd - self.signal_value
+        return self.macd, self.hist, self.signal_value
+
+
+class IndicatorEngine:
+    """
+    Motore di indicatori in streaming: ogni chiamata a update() costa O(1)
+    e restituisce le feature dell'ultima candela con i nomi di FEATURE_COLUMNS.
+    I valori non ancora disponibili (warm-up) sono None.
+    """
+    __slots__ = ('rsi', 'ema_20', 'ema_50', 'macd', 'bars', 'features')
+
+    def __init__(self):
+        self.rsi = StreamingRSI(14)
+        self.ema_20 = StreamingEMA(20)
+        self.ema_50 = StreamingEMA(50)
+        self.macd = StreamingMACD(12, 26, 9)
+        self.bars = 0
+        self.features = dict.fromkeys(FEATURE_COLUMNS)
+
+    @property
+    def warmup(self):
+        """Numero di candele dopo il quale tutte le feature sono valorizzate."""
+        return required_history(FEATURE_COLUMNS)
+
+    @property
+    def ready(self):
+        return all(value is not None for value in self.features.values())
+
+    def update(self, close):
+        """Aggiorna lo stato con il prezzo di chiusura della nuova candela."""
+        close = float(close)
+        self.bars += 1
+        macd, hist, signal = self.macd.update(close)
+        features = self.features
+        features['rsi'] = self.rsi.update(close)
+        features['ema_20'] = self.ema_20.update(close)
+        features['ema_50'] = self.ema_50.update(close)
+        features['MACD_12_26_9'] = macd
+        features['MACDh_12_26_9'] = hist
+        features['MACDs_12_26_9'] = signal
+        return features
+
+    def vector(self, feature_cols=None):
+        """Restituisce le feature correnti come lista ordinata secondo feature_cols."""
+        return [self.features[col] for col in (feature_cols or FEATURE_COLUMNS)]
+
+
+def check_parity(data_path, tolerance=1e-9):
+    """
+    Confronta il motore in streaming con train_model.prepare_data (pandas_ta)
+    sul CSV indicato e restituisce lo scarto massimo per colonna.
+    """
+    import pandas as pd
+    from train_model import prepare_data
+
+    raw = pd.read_csv(data_path)
+    reference = prepare_data(raw.copy())
+
+    engine = IndicatorEngine()
+    streamed = []
+    for close in raw['Close'].to_numpy():
+        engine.update(close)
+        streamed.append(engine.vector())
+    streamed = pd.DataFrame(streamed, columns=FEATURE_COLUMNS, dtype=float)
+
+    max_diff = {}
+    for col in FEATURE_COLUMNS:
+        diff = (streamed.loc[reference.index, col] - reference[col]).abs()
+        max_diff[col] = float(diff.max())
+    ok = all(value <= tolerance for value in max_diff.values())
+    return ok, max_diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Verifica parita indicatori streaming vs pandas_ta')
+    parser.add_argument('--data', type=str, default='backend/data/EURUSD_X.csv', help='Percorso file CSV')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='Scarto massimo ammesso')
+
+    args = parser.parse_args()
+    ok, max_diff = check_parity(args.data, args.tolerance)
+    for col, diff in max_diff.items():
+        print(f"{col:>15}: max diff {diff:.3e}")
+    print("Parita OK" if ok else "Parita NON rispettata")
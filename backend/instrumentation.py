@@ -0,0 +1,146 @@
+import io
+import time
+import pstats
+import cProfile
+from bisect import bisect_left
+
+# Limiti superiori (secondi) degli istogrammi: da 1 us a 10 s, tre bucket per decade
+BUCKETS = tuple(round(m * 10.0 ** e, 9) for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+
+# Fasi misurate per candela nel loop della strategia
+PHASES = ('bar', 'status', 'decision', 'indicators', 'predict', 'order')
+
+
+class Histogram:
+    """
+    Istogramma a bucket fissi: add() costa una bisect e due somme, niente allocazioni,
+    quindi puo' stare sul percorso di ogni candela. I percentili sono stimati dai bucket.
+    """
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # Ultimo bucket: oltre BUCKETS[-1] (+Inf)
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Limite superiore del bucket che contiene il quantile q (None se vuoto)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return BUCKETS[idx] if idx < len(BUCKETS) else float('inf')
+        return float('inf')
+
+    def to_dict(self):
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {
+            'counts': list(self.counts),
+            'sum': self.total,
+            'count': self.count,
+            'p50_ms': None if p50 is None else p50 * 1000,
+            'p99_ms': None if p99 is None else p99 * 1000,
+        }
+
+
+class BotMetrics:
+    """Istogrammi per fase e throughput (candele/s) di un bot, pubblicati nel file di stato."""
+
+    def __init__(self, phases=PHASES):
+        self.phases = {phase: Histogram() for phase in phases}
+        self.bars = 0
+        self.started = None
+
+    def add(self, phase, seconds):
+        self.phases[phase].add(seconds)
+
+    def bar_done(self, seconds):
+        if self.started is None:
+            self.started = time.perf_counter() - seconds
+        self.bars += 1
+        self.phases['bar'].add(seconds)
+
+    def bars_per_sec(self):
+        if not self.bars:
+            return 0.0
+        elapsed = time.perf_counter() - self.started
+        return self.bars / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        return {
+            'bars': self.bars,
+            'bars_per_sec': round(self.bars_per_sec(), 2),
+            'phases': {phase: hist.to_dict() for phase, hist in self.phases.items() if hist.count},
+        }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def render_prometheus(statuses):
+    """
+    Testo in formato Prometheus dagli stati dei bot ({bot_id: stato}): istogrammi per fase,
+    candele elaborate, throughput, latenza tick->decisione (live) e valore del portafoglio.
+    """
+    phase_lines, bars_lines, rate_lines, live_lines, value_lines = [], [], [], [], []
+    for bot_id, status in sorted(statuses.items()):
+        metrics = status.get('metrics') or {}
+        for phase, hist in sorted(metrics.get('phases', {}).items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), hist['counts']):
+                cumulative += bucket_count
+                phase_lines.append(f"trading_bot_phase_seconds_bucket{_labels(bot_id=bot_id, phase=phase, le=bound)} {cumulative}")
+            phase_lines.append(f"trading_bot_phase_seconds_sum{_labels(bot_id=bot_id, phase=phase)} {hist['sum']:.9f}")
+            phase_lines.append(f"trading_bot_phase_seconds_count{_labels(bot_id=bot_id, phase=phase)} {hist['count']}")
+        if metrics:
+            bars_lines.append(f"trading_bot_bars_total{_labels(bot_id=bot_id)} {metrics['bars']}")
+            rate_lines.append(f"trading_bot_bars_per_second{_labels(bot_id=bot_id)} {metrics['bars_per_sec']}")
+
+        latency = (status.get('latency_ms') or {})
+        latency = latency.get('tick_to_decision', latency) # Stato finale: {'tick_to_decision': ..., 'ingest': ...}
+        for quantile, key in (('0.5', 'p50_ms'), ('0.9', 'p90_ms'), ('0.99', 'p99_ms')):
+            if latency.get(key) is not None:
+                live_lines.append(f"trading_bot_tick_to_decision_seconds{_labels(bot_id=bot_id, quantile=quantile)} {latency[key] / 1000:.6f}")
+
+        if status.get('portfolio_value') is not None:
+            value_lines.append(f"trading_bot_portfolio_value{_labels(bot_id=bot_id)} {status['portfolio_value']}")
+
+    out = []
+    for name, kind, help_text, lines in (
+        ('trading_bot_phase_seconds', 'histogram', 'Durata per candela delle fasi del loop della strategia', phase_lines),
+        ('trading_bot_bars_total', 'counter', 'Candele elaborate dalla strategia', bars_lines),
+        ('trading_bot_bars_per_second', 'gauge', 'Candele elaborate al secondo', rate_lines),
+        ('trading_bot_tick_to_decision_seconds', 'summary', 'Latenza dalla candela live alla decisione', live_lines),
+        ('trading_bot_portfolio_value', 'gauge', 'Valore del portafoglio del bot', value_lines),
+    ):
+        if lines:
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+    return '\n'.join(out) + '\n'
+
+
+def run_profiled(func, path, *args, top=25, **kwargs):
+    """Esegue func sotto cProfile, salva le statistiche in path (.prof) e stampa le funzioni piu' costose."""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        print(report.getvalue())
+        print(f"Profilo salvato in {path} (python -m pstats {path} | snakeviz {path})")
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import datetime
+import threading
+
+import numpy as np
+import backtrader as bt
+
+import bar_store
+from feeds import EPOCH
+
+# Protocollo: una candela JSON per riga su TCP (t = epoch secondi, sent = time.time() di invio),
+# chiusa da {"eof": true}. Stesso formato per il server di replay e per sorgenti esterne.
+EOF_MESSAGE = b'{"eof": true}\n'
+
+BACKPRESSURE_POLICIES = ('block', 'drop_oldest')
+
+
+def encode_bar(timestamp, open_, high, low, close, volume):
+    return (json.dumps({
+        't': timestamp, 'o': open_, 'h': high, 'l': low, 'c': close, 'v': volume, 'sent': time.time()
+    }) + '\n').encode()
+
+
+def parse_address(address, default_host='127.0.0.1'):
+    """'host:porta' o 'porta' -> (host, porta)."""
+    host, _, port = str(address).rpartition(':')
+    return host or default_host, int(port)
+
+
+class LatencyStats:
+    """Campioni di latenza (secondi) con percentili in millisecondi, thread-safe."""
+
+    def __init__(self, max_samples=100000):
+        self.max_samples = max_samples
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            if len(self.samples) > self.max_samples:
+                # Finestra scorrevole: dimezza invece di spostare un elemento alla volta
+                del self.samples[:len(self.samples) // 2]
+
+    def summary(self):
+        with self.lock:
+            samples = np.array(self.samples, dtype='float64')
+        if not len(samples):
+            return {'count': 0}
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000
+        return {
+            'count': int(len(samples)),
+            'p50_ms': round(float(p50), 3),
+            'p90_ms': round(float(p90), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(samples.max()) * 1000, 3),
+        }
+
+
+class LiveBarData(bt.feed.DataBase):
+    """
+    Feed Backtrader live: un thread legge le candele dal socket e le mette in una coda limitata,
+    _load le consegna a Cerebro appena arrivano (attesa massima qcheck, poi None = "nessun dato ancora").
+
+    Backpressure: con 'block' il lettore si ferma quando la coda e' piena, il buffer TCP si riempie e
+    il server rallenta (nessuna candela persa); con 'drop_oldest' vengono scartate le candele piu'
+    vecchie in coda, per decidere sempre sui dati piu' recenti (contate in `dropped`).
+    """
+    params = (
+        ('host', '127.0.0.1'),
+        ('port', None),
+        ('queue_size', 256),
+        ('backpressure', 'block'),
+        ('qcheck', 0.5),
+        ('connect_timeout', 10.0),
+    )
+
+    def islive(self):
+        return True
+
+    def haslivedata(self):
+        return bool(self._queue.qsize())
+
+    def start(self):
+        super().start()
+        if self.p.backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Politica di backpressure non valida: {self.p.backpressure}")
+        self._queue = queue.Queue(maxsize=max(1, self.p.queue_size))
+        self._daily = self.p.timeframe >= bt.TimeFrame.Days
+        self._done = False
+        self.dropped = 0
+        self.bar_sent_at = None
+        self.ingest_latency = LatencyStats()
+
+        self._sock = socket.create_connection((self.p.host, self.p.port), timeout=self.p.connect_timeout)
+        self._sock.settimeout(None)
+        self._reader = threading.Thread(target=self._read_loop, name='live-feed-reader', daemon=True)
+        self._reader.start()
+        self.put_notification(self.LIVE)
+
+    def stop(self):
+        super().stop()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def _enqueue(self, item):
+        if self.p.backpressure == 'block':
+            self._queue.put(item)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _read_loop(self):
+        try:
+            with self._sock.makefile('rb') as stream:
+                for line in stream:
+                    message = json.loads(line)
+                    if message.get('eof'):
+                        break
+                    message['received'] = time.time()
+                    self._enqueue(message)
+        except (OSError, ValueError) as e:
+            print(f"Feed live interrotto: {str(e)}")
+        finally:
+            # La fine stream passa sempre dalla coda, dopo le candele ancora da consegnare
+            self._queue.put(None)
+
+    def _load(self):
+        if self._done:
+            return False
+        try:
+            message = self._queue.get(timeout=self._qcheck) if self._qcheck else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+        if message is None:
+            self._done = True
+            return False
+
+        dt = EPOCH + datetime.timedelta(seconds=message['t'])
+        if self._daily:
+            dt = datetime.datetime.combine(dt.date(), self.p.sessionend)
+
+        lines = self.lines
+        lines.datetime[0] = self.date2num(dt)
+        lines.open[0] = message['o']
+        lines.high[0] = message['h']
+        lines.low[0] = message['l']
+        lines.close[0] = message['c']
+        lines.volume[0] = message['v']
+        lines.openinterest[0] = float('NaN')
+        self.bar_sent_at = message['sent']
+        self.ingest_latency.add(time.time() - message['sent'])
+        return True
+
+
+class ReplayServer:
+    """
+    Sostituto locale di una sorgente live: trasmette un CSV (via bar_store) a ogni client
+    connesso, rispettando la distanza tra le candele divisa per `speed` (0 = il piu' veloce possibile).
+    """
+
+    def __init__(self, datapath, host='127.0.0.1', port=0, speed=0.0, limit=None, timeframe=None):
+        self.bars = bar_store.load_bars(datapath, timeframe=timeframe)
+        self.speed = speed
+        self.limit = limit
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()[:2]
+        self.thread = None
+        self.closed = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='replay-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        while not self.closed.is_set():
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.stream, args=(client,), daemon=True).start()
+
+    def stream(self, client):
+        bars = self.bars
+        count = len(bars) if self.limit is None else min(self.limit, len(bars))
+        timestamps = bars.timestamps.tolist()
+        cols = [col.tolist() for col in (bars.open, bars.high, bars.low, bars.close, bars.volume)]
+        started = time.perf_counter()
+        try:
+            with client:
+                for idx in range(count):
+                    if self.closed.is_set():
+                        break
+                    if self.speed > 0:
+                        due = started + (timestamps[idx] - timestamps[0]) / self.speed
+                        delay = due - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    # sendall si blocca se il client non legge: e' la backpressure del feed
+                    client.sendall(encode_bar(timestamps[idx], *(col[idx] for col in cols)))
+                client.sendall(EOF_MESSAGE)
+        except OSError:
+            pass # Client disconnesso
+
+    def close(self):
+        self.closed.set()
+        try:
+            self.server.close()
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Server di replay: trasmette un CSV come feed live locale')
+    parser.add_argument('--data_file', type=str, default='dati_esempio.csv', help='File CSV in backend/data/')
+    parser.add_argument('--port', type=int, default=9100, help='Porta TCP in ascolto')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Indirizzo in ascolto')
+    parser.add_argument('--speed', type=float, default=60.0, help='Fattore di accelerazione (0 = massima velocita)')
+    parser.add_argument('--limit', type=int, default=None, help='Numero massimo di candele trasmesse')
+    parser.add_argument('--timeframe', type=str, default=None, help='Trasmette le candele ricampionate (es. 1h)')
+
+    args = parser.parse_args()
+    datapath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', args.data_file)
+    server = ReplayServer(datapath, args.host, args.port, args.speed, args.limit, args.timeframe)
+    print(f"Replay di {args.data_file} su {server.address[0]}:{server.address[1]} (speed={args.speed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
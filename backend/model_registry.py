@@ -0,0 +1,102 @@
+import os
+import time
+import json
+import shutil
+
+from status_channel import write_json_atomic
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+MODELS_DIR = os.path.join(BASEDIR, 'models')
+REGISTRY_DIR = os.path.join(MODELS_DIR, 'registry')
+INDEX_FILE = os.path.join(REGISTRY_DIR, 'index.json')
+
+# Campi del run.json riportati nell'indice per elencare i run senza aprirli tutti
+INDEX_FIELDS = ('run_id', 'kind', 'dataset', 'created', 'parent', 'trained_bars', 'metrics')
+
+
+def new_run_id(dataset, kind):
+    """Identificativo leggibile e ordinabile: data_ora_tipo_dataset."""
+    name = os.path.splitext(os.path.basename(dataset))[0]
+    return f"{time.strftime('%Y%m%d_%H%M%S')}_{kind}_{name}"
+
+
+def create_run(dataset, kind):
+    """
+    Riserva la cartella di un nuovo run e ne restituisce l'id. La cartella viene creata in modo
+    esclusivo: due run avviati nello stesso secondo (es. due processi in parallelo) ricevono
+    id distinti (_2, _3, ...) invece di sovrascriversi modelli e metriche.
+    """
+    base = new_run_id(dataset, kind)
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    for attempt in range(1, 1000):
+        run_id = base if attempt == 1 else f"{base}_{attempt}"
+        try:
+            os.mkdir(os.path.join(REGISTRY_DIR, run_id))
+            return run_id
+        except FileExistsError:
+            continue
+    raise RuntimeError(f"Impossibile creare un nuovo run per {base}")
+
+
+def run_dir(run_id, create=False):
+    path = os.path.join(REGISTRY_DIR, run_id)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _read_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_run(record):
+    """Scrive run.json nella cartella del run e aggiorna l'indice del registry."""
+    run_id = record['run_id']
+    record.setdefault('created', time.strftime('%Y-%m-%dT%H:%M:%S'))
+    write_json_atomic(os.path.join(run_dir(run_id, create=True), 'run.json'), record)
+
+    index = [entry for entry in _read_json(INDEX_FILE, []) if entry['run_id'] != run_id]
+    index.append({field: record.get(field) for field in INDEX_FIELDS})
+    write_json_atomic(INDEX_FILE, index)
+    return record
+
+
+def load_run(run_id):
+    record = _read_json(os.path.join(run_dir(run_id), 'run.json'), None)
+    if record is None:
+        raise FileNotFoundError(f"Run non trovato nel registry: {run_id}")
+    return record
+
+
+def list_runs():
+    """Riepilogo di tutti i run registrati, dal piu' vecchio al piu' recente."""
+    return sorted(_read_json(INDEX_FILE, []), key=lambda entry: entry['run_id'])
+
+
+def model_path(run_id, name='final.pkl'):
+    """Percorso di un modello salvato nel run (final.pkl o fold_<k>.pkl)."""
+    return os.path.join(run_dir(run_id), name)
+
+
+def promote(run_id, model_name):
+    """
+    Copia il modello finale del run in backend/models/<model_name> (con lista feature
+    ed esportazione compilata), cosi' agenti e sweep lo usano come un modello addestrato con train_model.
+    """
+    source = model_path(run_id)
+    target = os.path.join(MODELS_DIR, model_name)
+    for suffix in ('', '_features.pkl', '_compiled.npz'):
+        if os.path.exists(f"{source}{suffix}"):
+            shutil.copyfile(f"{source}{suffix}", f"{target}{suffix}")
+
+    # L'esportazione compilata e' legata al contenuto del .pkl, che non cambia con la copia
+    record = load_run(run_id)
+    record.setdefault('promoted_as', [])
+    if model_name not in record['promoted_as']:
+        record['promoted_as'].append(model_name)
+    save_run(record)
+    return target
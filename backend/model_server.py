@@ -0,0 +1,251 @@
+import os
+import sys
+import time
+import queue
+import secrets
+import argparse
+import threading
+from multiprocessing.connection import Listener, Client
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+MODELS_DIR = os.path.join(BASEDIR, 'models')
+
+# Socket Unix dove disponibile, altrimenti TCP locale (Windows)
+if sys.platform == 'win32':
+    DEFAULT_ADDRESS = ('127.0.0.1', 6001)
+else:
+    DEFAULT_ADDRESS = os.path.join(BASEDIR, 'sessions', 'model_server.sock')
+
+SESSIONS_DIR = os.path.join(BASEDIR, 'sessions')
+
+# Secondi di attesa massima di una risposta: oltre, il client solleva e l'agente passa all'inference locale
+REPLY_TIMEOUT = float(os.environ.get('MODEL_SERVER_TIMEOUT', 5.0))
+
+
+def resolve_address(address=None):
+    """Indirizzo del server: argomento esplicito, variabile MODEL_SERVER_ADDRESS o default."""
+    address = address or os.environ.get('MODEL_SERVER_ADDRESS') or DEFAULT_ADDRESS
+    if isinstance(address, str) and ':' in address and not os.path.isabs(address):
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address
+
+
+def authkey_path(address):
+    """File della chiave di autenticazione del server in ascolto su `address` (accanto al socket)."""
+    if isinstance(address, str):
+        return f"{address}.key"
+    host, port = address
+    return os.path.join(SESSIONS_DIR, f"model_server_{port}.key")
+
+
+def resolve_authkey(address, create=False):
+    """
+    Chiave condivisa tra server e bot. Listener e Client di multiprocessing.connection
+    fanno unpickle dei messaggi, quindi la chiave non puo' essere nota a priori:
+    - MODEL_SERVER_AUTHKEY se impostata (deploy con piu' macchine o utenti)
+    - altrimenti il server ne genera una casuale a ogni avvio e la scrive in un file
+      leggibile solo dall'utente corrente, da cui la leggono i client
+    """
+    env_key = os.environ.get('MODEL_SERVER_AUTHKEY')
+    if env_key:
+        return env_key.encode()
+
+    path = authkey_path(address)
+    if create:
+        key = secrets.token_hex(32)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(key)
+        return key.encode()
+
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip().encode()
+    except OSError:
+        raise RuntimeError(f"Chiave del model server non trovata ({path}): server non avviato o MODEL_SERVER_AUTHKEY mancante")
+
+
+class ModelServer:
+    """
+    Servizio di inference condiviso: carica ogni modello una sola volta e,
+    per ogni finestra di tick, raggruppa le richieste di tutti i bot in una
+    sola chiamata predict_proba per modello.
+    """
+
+    def __init__(self, address=None, authkey=None, batch_window=0.002, max_batch=1024):
+        self.address = resolve_address(address)
+        self.authkey = authkey # None: generata in serve_forever (vedi resolve_authkey)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.models = {} # model_name -> (modello, feature_cols)
+        self.requests = queue.Queue()
+        self.stats = {'requests': 0, 'batches': 0}
+        self._stop = threading.Event()
+
+    def load(self, model_name):
+        """Carica (una sola volta) modello e lista feature da backend/models."""
+        if model_name not in self.models:
+            from compiled_model import load_predictor, load_feature_list
+
+            model_path = os.path.join(MODELS_DIR, model_name)
+            model = load_predictor(model_path)
+            feature_cols = load_feature_list(f"{model_path}_features.pkl")
+            self.models[model_name] = (model, feature_cols)
+            print(f"[model_server] Modello caricato: {model_path}")
+        return self.models[model_name]
+
+    def serve_forever(self):
+        if isinstance(self.address, str):
+            os.makedirs(os.path.dirname(self.address), exist_ok=True)
+            if os.path.exists(self.address):
+                os.remove(self.address)
+
+        if self.authkey is None:
+            self.authkey = resolve_authkey(self.address, create=True)
+
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"[model_server] In ascolto su {self.address}")
+            while not self._stop.is_set():
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"[model_server] Connessione rifiutata: {e}")
+                    continue
+                threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _client_loop(self, conn):
+        """Riceve le richieste di un bot e le accoda al batcher."""
+        send_lock = threading.Lock()
+        try:
+            while True:
+                message = conn.recv()
+                op = message.get('op')
+                if op == 'predict':
+                    self.requests.put((message, conn, send_lock))
+                elif op == 'ping':
+                    with send_lock:
+                        conn.send({'ok': True, 'models': list(self.models), 'stats': dict(self.stats)})
+                else:
+                    with send_lock:
+                        conn.send({'id': message.get('id'), 'error': f"Operazione sconosciuta: {op}"})
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _collect_batch(self):
+        """Attende la prima richiesta e raccoglie quelle arrivate entro batch_window."""
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        import numpy as np
+
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            by_model = {}
+            for item in batch:
+                by_model.setdefault(item[0]['model'], []).append(item)
+
+            for model_name, items in by_model.items():
+                try:
+                    model, feature_cols = self.load(model_name)
+                    rows = np.array([item[0]['features'] for item in items], dtype=np.float64)
+                    probs = model.predict_proba(rows)[:, 1]
+                    replies = [{'id': item[0].get('id'), 'prob': float(prob)} for item, prob in zip(items, probs)]
+                except Exception as e:
+                    replies = [{'id': item[0].get('id'), 'error': str(e)} for item in items]
+
+                self.stats['requests'] += len(items)
+                self.stats['batches'] += 1
+                for (message, conn, send_lock), reply in zip(items, replies):
+                    try:
+                        with send_lock:
+                            conn.send(reply)
+                    except (EOFError, OSError):
+                        pass # Il bot si e' disconnesso nel frattempo
+
+
+class ModelClient:
+    """Client sincrono usato da TradingAgent per delegare la predizione al ModelServer."""
+
+    def __init__(self, address=None, authkey=None, timeout=REPLY_TIMEOUT):
+        self.address = resolve_address(address)
+        self.timeout = timeout
+        self.conn = self._connect(authkey or resolve_authkey(self.address))
+        self._next_id = 0
+
+    def _connect(self, authkey):
+        """Client() non ha timeout (l'handshake di autenticazione attende il server): connessione in un thread."""
+        result = {}
+
+        def connect():
+            try:
+                result['conn'] = Client(self.address, authkey=authkey)
+            except Exception as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=connect, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if 'error' in result:
+            raise result['error']
+        if 'conn' not in result:
+            raise TimeoutError(f"Model server: connessione non completata entro {self.timeout}s")
+        return result['conn']
+
+    def _recv(self):
+        """
+        Risposta del server entro timeout secondi. Se il server non risponde la connessione
+        viene chiusa (una risposta tardiva la desincronizzerebbe) e si solleva TimeoutError.
+        """
+        if not self.conn.poll(self.timeout):
+            self.conn.close()
+            raise TimeoutError(f"Model server: nessuna risposta entro {self.timeout}s")
+        return self.conn.recv()
+
+    def predict(self, model_name, features):
+        """Probabilità della classe Up per una riga di feature (ordinata come feature_cols)."""
+        self._next_id += 1
+        self.conn.send({'op': 'predict', 'id': self._next_id, 'model': model_name, 'features': list(features)})
+        reply = self._recv()
+        if 'error' in reply:
+            raise RuntimeError(f"Model server: {reply['error']}")
+        return reply['prob']
+
+    def ping(self):
+        self.conn.send({'op': 'ping'})
+        return self._recv()
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Servizio di inference condiviso tra i bot')
+    parser.add_argument('--address', type=str, default=None, help='Socket Unix o host:porta (default: sessions/model_server.sock)')
+    parser.add_argument('--models', type=str, nargs='*', default=['trading_model.pkl'], help='Modelli da precaricare')
+    parser.add_argument('--batch_window_ms', type=float, default=2.0, help='Finestra di raggruppamento richieste (ms)')
+
+    args = parser.parse_args()
+    server = ModelServer(args.address, batch_window=args.batch_window_ms / 1000.0)
+    for name in args.models:
+        server.load(name)
+    server.serve_forever()
@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import datetime
+
+import numpy as np
+
+import bar_store
+import feature_store
+
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASEDIR, 'data', '.cache', 'results')
+
+# Cambiarla invalida tutti i risultati salvati (es. modifiche alla logica della strategia o del broker)
+CACHE_VERSION = 1
+
+# Risultati mantenuti su disco: oltre questo numero si eliminano i meno usati di recente
+MAX_ENTRIES = int(os.environ.get('BACKTEST_CACHE_SIZE', 64))
+
+
+def is_deterministic(mode, engine, safe_mode):
+    """
+    True se la run da' sempre lo stesso risultato a parita' di dati, modello e parametri:
+    le decisioni batch (fast-backtest, motore vettoriale) non usano mai il fallback casuale,
+    quelle per candela solo se safe_mode lo sostituisce con HOLD.
+    """
+    if mode not in ('backtest', 'fast-backtest'):
+        return False
+    return mode == 'fast-backtest' or engine == 'vector' or bool(safe_mode)
+
+
+def dataset_digest(datapath, timeframe=None):
+    """Hash del contenuto del dataset cosi' come lo vede il motore (timestamp e OHLCV dal bar store)."""
+    bars = bar_store.load_bars(datapath, timeframe=timeframe)
+    digest = hashlib.sha1()
+    for column in (bars.timestamps, bars.open, bars.high, bars.low, bars.close, bars.volume):
+        digest.update(np.ascontiguousarray(column).tobytes())
+    return digest.hexdigest()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def result_key(datapath, params, model_name='trading_model.pkl'):
+    """Chiave del risultato: hash di dataset, modello (e lista feature), specifica feature e parametri."""
+    models_dir = os.path.join(BASEDIR, 'models')
+    payload = {
+        'version': CACHE_VERSION,
+        'dataset': dataset_digest(datapath, params.get('timeframe')),
+        'model': file_digest(os.path.join(models_dir, model_name)),
+        'features': file_digest(os.path.join(models_dir, f"{model_name}_features.pkl")),
+        'feature_spec': feature_store.spec_hash(),
+        'params': params,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def entry_path(key, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, f"{key}.json")
+
+
+def load(key, cache_dir=None):
+    """Risultato salvato (riepilogo con la lista dei trade) o None. Un hit aggiorna l'ordine LRU."""
+    path = entry_path(key, cache_dir)
+    try:
+        with open(path, 'r') as f:
+            entry = json.load(f)
+        os.utime(path) # mtime = ultimo utilizzo
+    except (OSError, ValueError):
+        return None
+    result = entry['result']
+    result['trades'] = [tuple(trade) for trade in result.get('trades', [])]
+    return result
+
+
+def store(key, result, params, cache_dir=None, max_entries=None):
+    """Salva il risultato in modo atomico ed elimina le voci meno usate oltre max_entries."""
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    path = entry_path(key, cache_dir)
+    entry = {'created': datetime.datetime.now().isoformat(), 'params': params, 'result': result}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+    evict(cache_dir, MAX_ENTRIES if max_entries is None else max_entries)
+
+
+def evict(cache_dir, max_entries):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.json'):
+            try:
+                entries.append((os.stat(os.path.join(cache_dir, name)).st_mtime_ns, name))
+            except OSError:
+                pass # Eliminata da un altro processo
+    entries.sort()
+    for _, name in entries[:max(0, len(entries) - max_entries)]:
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
@@ -94,12 +94,66 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // Funzione principale di aggiornamento dashboard
+    // Stato corrente dei bot, aggiornato dallo stream SSE o dal polling
+    let botsState = {};
+    let pollTimer = null;
+
+    // Polling di /status: usato solo se lo stream non e' disponibile
     async function refreshDashboard() {
         try {
             const response = await fetch('/status');
-            const botsData = await response.json();
+            botsState = await response.json();
+            renderDashboard(botsState);
+        } catch (error) {
+            console.error('Errore aggiornamento dashboard:', error);
+        }
+    }
+
+    function startPolling() {
+        if (pollTimer === null) {
+            pollTimer = setInterval(refreshDashboard, 2000);
+            refreshDashboard();
+        }
+    }
+
+    function stopPolling() {
+        if (pollTimer !== null) {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        }
+    }
+
+    // Stream /status/stream: snapshot iniziale, poi solo i bot cambiati o rimossi
+    function connectStatusStream() {
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
 
+        const source = new EventSource('/status/stream');
+        source.onopen = () => stopPolling();
+        source.addEventListener('snapshot', (event) => {
+            botsState = JSON.parse(event.data);
+            renderDashboard(botsState);
+        });
+        source.addEventListener('delta', (event) => {
+            const delta = JSON.parse(event.data);
+            Object.assign(botsState, delta.changed);
+            delta.removed.forEach(botId => delete botsState[botId]);
+            renderDashboard(botsState);
+        });
+        // Durante la riconnessione automatica (o se lo stream e' chiuso) si torna al polling
+        source.onerror = () => {
+            startPolling();
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(connectStatusStream, 5000);
+            }
+        };
+    }
+
+    // Disegna le card dei bot a partire dallo stato corrente
+    function renderDashboard(botsData) {
+        try {
             if (Object.keys(botsData).length === 0) {
                 botsContainer.innerHTML = '<p style="color: #777;">Nessun bot attivo al momento.</p>';
                 return;
@@ -155,7 +209,7 @@ document.addEventListener('DOMContentLoaded', () => {
                             ${logsHtml || '<div style="color: #555;">In attesa di log...</div>'}
                         </div>
                         ${finalResultHtml}
-                        <button class="btn-stop" onclick="window.stopBotDelegated('${botId}')">Ferma Bot</button>
+                        <button class="btn-stop" onclick="window.stopBotDelegated('${data.portfolio || botId}')">${data.portfolio ? `Ferma Portfolio ${data.portfolio}` : 'Ferma Bot'}</button>
                     </div>
                 `;
             }
@@ -175,6 +229,6 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Inizializzazione
     loadDatasets();
-    setInterval(refreshDashboard, 2000);
     refreshDashboard();
+    connectStatusStream();
 });
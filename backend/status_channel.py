@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import threading
+
+
+def write_json_atomic(path, payload):
+    """
+    Scrive il JSON su un file temporaneo e lo sostituisce con os.replace:
+    chi legge vede sempre il file precedente o quello nuovo, mai uno scritto a meta'.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+class StatusPublisher:
+    """
+    Canale di stato di un bot con pubblicazione limitata nel tempo (coalescing):
+    gli aggiornamenti che arrivano entro min_interval dall'ultima scrittura
+    vengono scartati e assorbiti dalla successiva, mentre quelli forzati
+    (inizializzazione, fine run, ordini e trade in live) vengono sempre scritti.
+    """
+    __slots__ = ('path', 'min_interval', 'writes', 'coalesced', '_dirty', '_last_write')
+
+    def __init__(self, path, min_interval=1.0):
+        self.path = path
+        self.min_interval = min_interval
+        self.writes = 0
+        self.coalesced = 0
+        self._dirty = False
+        self._last_write = float('-inf')
+
+    def due(self, force=False):
+        """True se un aggiornamento va scritto ora; altrimenti lo conta come coalescato."""
+        if force or time.monotonic() - self._last_write >= self.min_interval:
+            return True
+        self.coalesced += 1
+        self._dirty = True
+        return False
+
+    @property
+    def pending(self):
+        """True se ci sono aggiornamenti scartati dopo l'ultima scrittura."""
+        return self._dirty
+
+    def publish(self, payload):
+        write_json_atomic(self.path, payload)
+        self._last_write = time.monotonic()
+        self.writes += 1
+        self._dirty = False
+
+
+def diff_statuses(old, new):
+    """Differenza tra due snapshot {bot_id: stato}: (bot cambiati o nuovi, bot rimossi)."""
+    changed = {bot_id: data for bot_id, data in new.items() if old.get(bot_id) != data}
+    removed = [bot_id for bot_id in old if bot_id not in new]
+    return changed, removed
+
+
+class StatusCache:
+    """
+    Cache in memoria dello stato di tutti i bot, aggiornata da un solo thread:
+    collect() viene chiamata ogni `interval` secondi (o subito dopo poke())
+    e la versione avanza solo quando lo snapshot cambia davvero.
+    Chi serve /status o /status/stream legge la cache senza toccare il disco.
+    """
+
+    def __init__(self, collect, interval=0.5):
+        self.collect = collect
+        self.interval = interval
+        self.version = 0
+        self._snapshot = {}
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Avvia il thread di aggiornamento al primo utilizzo (idempotente)."""
+        with self._changed:
+            if self._thread is None:
+                self._refresh()
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        return self
+
+    def snapshot(self):
+        """(versione, copia dello stato corrente)."""
+        with self._changed:
+            return self.version, dict(self._snapshot)
+
+    def poke(self):
+        """Richiede un aggiornamento immediato (es. dopo start/stop di un bot)."""
+        self._wake.set()
+
+    def wait_for_change(self, version, timeout=None):
+        """Attende una versione successiva a `version`; restituisce (versione, snapshot)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version, dict(self._snapshot)
+
+    def _refresh(self):
+        try:
+            snapshot = self.collect()
+        except Exception as e:
+            print(f"[status_cache] Errore aggiornamento stato: {e}")
+            return
+        with self._changed:
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                self.version += 1
+                self._changed.notify_all()
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._refresh()
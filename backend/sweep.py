@@ -0,0 +1,177 @@
+import os
+import json
+import math
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bar_store
+import feature_store
+import vector_engine
+from ai_agent import TradingAgent
+from compiled_model import load_feature_list
+from indicators import unknown_features
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+DATA_DIR = os.path.join(BASEDIR, 'data')
+MODELS_DIR = os.path.join(BASEDIR, 'models')
+
+DEFAULT_BUY_THRESHOLDS = [0.55, 0.6, 0.65]
+DEFAULT_SELL_THRESHOLDS = [0.35, 0.4, 0.45]
+
+# Cache per processo worker: (modello, dataset) -> (probabilita, open, close)
+_worker_cache = {}
+
+
+def list_datasets():
+    """CSV disponibili in backend/data."""
+    if not os.path.exists(DATA_DIR):
+        return []
+    return sorted(f for f in os.listdir(DATA_DIR) if f.endswith('.csv'))
+
+
+def list_models():
+    """
+    Modelli disponibili in backend/models (esclusi i file *_features.pkl), solo se l'agente
+    sa calcolarne tutte le feature: gli altri (es. modelli pooled) vengono scartati con un avviso.
+    """
+    if not os.path.exists(MODELS_DIR):
+        return []
+    models = []
+    for name in sorted(f for f in os.listdir(MODELS_DIR) if f.endswith('.pkl') and not f.endswith('_features.pkl')):
+        try:
+            unknown = unknown_features(load_feature_list(os.path.join(MODELS_DIR, f"{name}_features.pkl")))
+        except Exception as e:
+            print(f"Modello {name} escluso: lista feature non leggibile ({str(e)})")
+            continue
+        if unknown:
+            print(f"Modello {name} escluso: feature non supportate dall'agente {unknown}")
+            continue
+        models.append(name)
+    return models
+
+
+def build_grid(buy_thresholds, sell_thresholds, datasets, models, initial_capital):
+    """
+    Prodotto cartesiano dei parametri. Le combinazioni con sell >= buy vengono scartate.
+    I task sono ordinati per (modello, dataset) cosi' i chunk di un worker riusano la stessa cache.
+    """
+    tasks = [
+        (model, dataset, buy, sell, initial_capital)
+        for model, dataset, buy, sell in itertools.product(models, datasets, buy_thresholds, sell_thresholds)
+        if sell < buy
+    ]
+    return sorted(tasks, key=lambda task: (task[0], task[1]))
+
+
+def _load_pair(model_name, data_file):
+    """Carica modello e dataset una sola volta per worker e calcola le probabilita in batch."""
+    key = (model_name, data_file)
+    if key not in _worker_cache:
+        agent = TradingAgent(model_name=model_name, safe_mode=True)
+        data_path = os.path.join(DATA_DIR, data_file)
+        df = bar_store.load_dataframe(data_path)
+        _worker_cache[key] = (
+            agent.get_batch_probabilities(df, feature_store.load_features(data_path)),
+            df['Open'].to_numpy(dtype=np.float64),
+            df['Close'].to_numpy(dtype=np.float64),
+        )
+    return _worker_cache[key]
+
+
+def evaluate(task):
+    """Esegue un singolo backtest vettoriale per una combinazione della griglia."""
+    model_name, data_file, buy, sell, initial_capital = task
+    row = {
+        'model': model_name,
+        'dataset': data_file,
+        'buy_threshold': buy,
+        'sell_threshold': sell,
+        'initial_capital': initial_capital,
+    }
+    try:
+        probs, opens, closes = _load_pair(model_name, data_file)
+        signals = vector_engine.signals_from_probabilities(probs, buy, sell)
+        result = vector_engine.simulate(signals, opens, closes, initial_capital)
+        row.update({
+            'final_portfolio_value': round(result['final_portfolio_value'], 2),
+            'final_pnl': round(result['final_pnl'], 2),
+            'trades': int(np.count_nonzero(result['fills'])),
+            'max_drawdown_pct': round(vector_engine.max_drawdown(result['equity']), 6),
+        })
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def run_sweep(buy_thresholds=None, sell_thresholds=None, datasets=None, models=None,
+              initial_capital=10000.0, workers=None):
+    """
+    Distribuisce i backtest della griglia su un pool di processi
+    e restituisce i risultati ordinati per PnL (errori in fondo).
+    """
+    tasks = build_grid(
+        buy_thresholds or DEFAULT_BUY_THRESHOLDS,
+        sell_thresholds or DEFAULT_SELL_THRESHOLDS,
+        datasets or list_datasets(),
+        models or list_models(),
+        initial_capital,
+    )
+    if not tasks:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(evaluate, tasks, chunksize=chunksize))
+
+    return sorted(results, key=lambda row: ('error' in row, -row.get('final_pnl', 0.0)))
+
+
+def format_table(results, top=None):
+    """Tabella testuale dei risultati per la CLI."""
+    header = f"{'#':>3}  {'model':<24} {'dataset':<20} {'buy':>5} {'sell':>5} {'pnl':>10} {'trades':>7} {'max_dd%':>8}"
+    lines = [header, '-' * len(header)]
+    for rank, row in enumerate(results[:top] if top else results, start=1):
+        if 'error' in row:
+            lines.append(f"{rank:>3}  {row['model']:<24} {row['dataset']:<20} ERRORE: {row['error']}")
+            continue
+        lines.append(
+            f"{rank:>3}  {row['model']:<24} {row['dataset']:<20} {row['buy_threshold']:>5.2f} "
+            f"{row['sell_threshold']:>5.2f} {row['final_pnl']:>10.2f} {row['trades']:>7} {row['max_drawdown_pct']:>8.4f}"
+        )
+    return '\n'.join(lines)
+
+
+def write_results(path, results, seconds):
+    """Salva i risultati in JSON (scrittura atomica: chi legge non vede mai un file a meta')."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {'combinations': len(results), 'seconds': round(seconds, 3), 'results': results}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Grid search parallela su soglie, dataset e modelli')
+    parser.add_argument('--buy', type=float, nargs='+', default=DEFAULT_BUY_THRESHOLDS, help='Soglie BUY')
+    parser.add_argument('--sell', type=float, nargs='+', default=DEFAULT_SELL_THRESHOLDS, help='Soglie SELL')
+    parser.add_argument('--datasets', type=str, nargs='+', default=None, help='CSV in backend/data/ (default: tutti)')
+    parser.add_argument('--models', type=str, nargs='+', default=None, help='Modelli in backend/models/ (default: tutti)')
+    parser.add_argument('--capital', type=float, default=10000.0, help='Capitale iniziale')
+    parser.add_argument('--workers', type=int, default=None, help='Numero di processi (default: tutti i core)')
+    parser.add_argument('--top', type=int, default=20, help='Righe da mostrare')
+    parser.add_argument('--output', type=str, default=None, help='File JSON in cui salvare tutti i risultati')
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    results = run_sweep(args.buy, args.sell, args.datasets, args.models, args.capital, args.workers)
+    seconds = time.perf_counter() - start
+    if args.output:
+        write_results(args.output, results, seconds)
+    print(format_table(results, args.top))
+    print(f"\n{len(results)} combinazioni in {seconds:.2f}s")
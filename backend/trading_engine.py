@@ -1,23 +1,48 @@
 import backtrader as bt
 import datetime
 import os
+import sys
 import json
+import time
 import argparse
 from ai_agent import TradingAgent
+from indicators import IndicatorEngine
+from status_channel import StatusPublisher, write_json_atomic
+import vector_engine
+import bar_store
+import result_cache
+import feature_store
+from feeds import BarStoreData
+from live_feed import LiveBarData, LatencyStats, ReplayServer, parse_address
+from instrumentation import BotMetrics, run_profiled
+from history_store import HistoryWriter, history_path
+
+DEFAULT_INITIAL_CAPITAL = 10000.0
 
 class AgentStrategy(bt.Strategy):
     """
     Questa è la strategia di trading.
     Riceve un bot_id e gestisce i log recenti.
-    Usa TradingAgent per prendere decisioni.
+    Usa TradingAgent per prendere decisioni, oppure riproduce
+    segnali precalcolati (lista di (decisione, info) per candela) se forniti.
     """
     params = (
         ('bot_id', 'default_bot'),
+        ('signals', None),
+        ('safe_mode', False),
+        ('buy_threshold', 0.6),
+        ('sell_threshold', 0.4),
+        ('model_server', None),
+        ('status_interval', 1.0), # Secondi minimi tra due scritture del file di stato (0 = ogni aggiornamento)
+        ('instrument', True), # Tempi per fase e throughput pubblicati nel file di stato (esposti da /metrics)
+        ('history_every', 0), # Storico SQLite (sessions/history_<bot_id>.db): un punto di equity ogni N candele (0 = disattivo)
+        ('run_info', None), # Metadati della run salvati nello storico (mode, data_file, ...)
     )
 
     def log(self, txt, dt=None):
         '''Funzione di logging per questa strategia'''
-        dt = dt or self.datas[0].datetime.date(0)
+        # In live (senza preload) nessuna candela e' ancora disponibile in __init__
+        dt = dt or (self.datas[0].datetime.date(0) if len(self.datas[0]) else datetime.date.today())
         msg = f'{dt.isoformat()} {txt}'
         print(f'[{self.params.bot_id}] {msg}')
         
@@ -32,6 +57,7 @@ class AgentStrategy(bt.Strategy):
         self.dataclose = self.datas[0].close
         self.order = None
         self.recent_logs = []
+        self.trades = []
         
         # Assicurati che la cartella sessions esista
         sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
@@ -39,12 +65,49 @@ class AgentStrategy(bt.Strategy):
         
         # Salva nella cartella sessions usando il percorso assoluto
         self.status_file = os.path.join(sessions_dir, f'status_{self.params.bot_id}.json')
+        self.status_channel = StatusPublisher(self.status_file, self.params.status_interval)
+        self.history = None
+        if self.params.history_every:
+            self.history = HistoryWriter(
+                history_path(sessions_dir, self.params.bot_id),
+                info=dict(self.params.run_info or {}, bot_id=self.params.bot_id),
+                every=self.params.history_every
+            )
         
-        # Inizializza l'Agente AI
-        self.agent = TradingAgent()
+        # Inizializza l'Agente AI (non serve se i segnali sono gia' calcolati)
+        self.agent = None
+        if self.params.signals is None:
+            self.agent = TradingAgent(
+                safe_mode=self.params.safe_mode,
+                buy_threshold=self.params.buy_threshold,
+                sell_threshold=self.params.sell_threshold,
+                model_server=self.params.model_server
+            )
         
+        # In live: latenza dall'invio della candela alla decisione presa
+        self.decision_latency = LatencyStats() if self.datas[0].islive() else None
+
+        # In live la candela successiva puo' arrivare dopo minuti o ore: ordini e trade vanno
+        # pubblicati subito. In backtest le candele si susseguono senza pause e restano coalescati.
+        self.force_events = self.datas[0].islive()
+
+        # Istogrammi per fase (bar, status, decision, indicators, predict, order)
+        self.metrics = BotMetrics() if self.params.instrument else None
+        if self.agent is not None:
+            self.agent.metrics = self.metrics
+
         self.log('Strategia Inizializzata')
-        self.write_status('Inizializzazione')
+        self.write_status('Inizializzazione', force=True)
+
+    def stop(self):
+        """Fine dati: pubblica l'ultimo stato se ci sono aggiornamenti coalescati e chiude lo storico."""
+        if self.status_channel.pending:
+            self.write_status('Fine dati', force=True)
+        if self.history is not None:
+            value = self.broker.getvalue()
+            if len(self):
+                self.history.add_equity(len(self), self.datas[0].datetime.datetime(0).isoformat(), value, self.broker.getcash())
+            self.history.close({'final_portfolio_value': round(value, 2)})
 
     def notify_order(self, order):
         """Gestisce il ciclo di vita ordine e sblocca la strategia."""
@@ -53,6 +116,10 @@ class AgentStrategy(bt.Strategy):
 
         if order.status == order.Completed:
             side = 'BUY' if order.isbuy() else 'SELL'
+            ts = self.datas[0].datetime.datetime(0).isoformat()
+            self.trades.append((ts, side, order.executed.price, order.executed.size))
+            if self.history is not None:
+                self.history.add_trade(len(self), ts, side, order.executed.price, order.executed.size, self.broker.getvalue())
             self.log(
                 f'ORDER COMPLETED {side} @ {order.executed.price:.5f} '
                 f'(size: {order.executed.size})'
@@ -66,10 +133,16 @@ class AgentStrategy(bt.Strategy):
 
         # Qualunque stato finale deve liberare il lock ordine
         self.order = None
-        self.write_status('Aggiornamento ordine')
+        self.write_status('Aggiornamento ordine', force=self.force_events)
+
+    def write_status(self, event="Update", force=False):
+        """
+        Scrive lo stato attuale e i log recenti su file, al massimo una volta
+        ogni status_interval secondi (force=True scrive sempre).
+        """
+        if not self.status_channel.due(force):
+            return
 
-    def write_status(self, event="Update"):
-        """Scrive lo stato attuale e i log recenti su file"""
         status = {
             'bot_id': self.params.bot_id,
             'timestamp': datetime.datetime.now().isoformat(),
@@ -81,15 +154,36 @@ class AgentStrategy(bt.Strategy):
             'last_close': self.dataclose[0] if len(self.dataclose) > 0 else None,
             'status': 'In esecuzione'
         }
+        if self.decision_latency is not None:
+            status['latency_ms'] = self.decision_latency.summary()
+        if self.metrics is not None:
+            status['metrics'] = self.metrics.snapshot()
         try:
-            with open(self.status_file, 'w') as f:
-                json.dump(status, f, indent=4)
+            self.status_channel.publish(status)
         except Exception as e:
             print(f"Errore nella scrittura di {self.status_file}: {str(e)}")
 
     def next(self):
         """Logica chiamata per ogni candela"""
+        start = time.perf_counter()
+        self.step()
+        history = self.history
+        if history is not None and history.due(len(self)):
+            history.add_equity(len(self), self.datas[0].datetime.datetime(0).isoformat(), self.broker.getvalue(), self.broker.getcash())
+        if self.metrics is not None:
+            self.metrics.bar_done(time.perf_counter() - start)
+        if self.decision_latency is not None and self.datas[0].bar_sent_at is not None:
+            self.decision_latency.add(time.time() - self.datas[0].bar_sent_at)
+
+    def step(self):
+        """Stato, decisione dell'agente ed eventuale ordine per la candela corrente."""
+        metrics = self.metrics
+        start = time.perf_counter()
         self.write_status()
+        if metrics is not None:
+            now = time.perf_counter()
+            metrics.add('status', now - start)
+            start = now
 
         if self.order:
             return
@@ -104,17 +198,223 @@ class AgentStrategy(bt.Strategy):
         }
 
         # Chiedi all'Agente cosa fare
-        decision, info = self.agent.get_decision(market_data)
+        decision, info = self.decide(market_data)
+        if metrics is not None:
+            now = time.perf_counter()
+            metrics.add('decision', now - start)
+            start = now
 
         if decision == 'BUY' and not self.position:
             self.log(f'BUY SIGNAL ({info.get("reason")}) - Price: {self.dataclose[0]}')
             self.order = self.buy()
-            self.write_status(f'Acquisto: {info.get("reason")}')
+            self.write_status(f'Acquisto: {info.get("reason")}', force=self.force_events)
             
         elif decision == 'SELL' and self.position:
             self.log(f'SELL SIGNAL ({info.get("reason")}) - Price: {self.dataclose[0]}')
             self.order = self.sell()
-            self.write_status(f'Vendita: {info.get("reason")}')
+            self.write_status(f'Vendita: {info.get("reason")}', force=self.force_events)
+        else:
+            return
+
+        if metrics is not None:
+            metrics.add('order', time.perf_counter() - start)
+
+    def decide(self, market_data):
+        """Restituisce la decisione per la candela corrente."""
+        if self.params.signals is not None:
+            return self.params.signals[len(self) - 1]
+        return self.agent.get_decision(market_data)
+
+
+class PortfolioBot:
+    """Stato di un bot dentro PortfolioStrategy: feed, indicatori, contabilita' e file di stato propri."""
+
+    def __init__(self, bot_id, data, capital, status_file, status_interval):
+        self.bot_id = bot_id
+        self.data = data
+        self.capital = capital
+        self.cash = capital
+        self.order = None
+        self.recent_logs = []
+        self.trades = []
+        self.indicators = IndicatorEngine()
+        self.bars = 0
+        self.status_file = status_file
+        self.status_channel = StatusPublisher(status_file, status_interval)
+        self.force_events = data.islive() # Come AgentStrategy: in live ordini e trade senza coalescing
+        self.history = None
+
+    def log(self, txt):
+        msg = f'{self.data.datetime.date(0).isoformat()} {txt}'
+        print(f'[{self.bot_id}] {msg}')
+        self.recent_logs.append(msg)
+        if len(self.recent_logs) > 10:
+            self.recent_logs.pop(0)
+
+    def value(self, position_size):
+        """Valore del portafoglio del solo bot: cassa propria + posizione al prezzo corrente."""
+        close = self.data.close[0] if len(self.data) else 0.0
+        return self.cash + position_size * close
+
+
+class PortfolioStrategy(bt.Strategy):
+    """
+    Piu' bot in un solo Cerebro: un feed per bot (simboli e timeframe diversi),
+    un solo TradingAgent condiviso e, a ogni candela, un'unica chiamata al modello
+    per tutti i simboli che hanno ricevuto una nuova barra.
+    Ogni bot ha cassa, ordini, log e file di stato propri (status_<bot_id>.json).
+    """
+    params = (
+        ('bot_ids', ()),
+        ('capital', DEFAULT_INITIAL_CAPITAL), # Capitale assegnato a ciascun bot
+        ('signals', None), # {bot_id: segnali precalcolati} per fast-backtest
+        ('safe_mode', False),
+        ('buy_threshold', 0.6),
+        ('sell_threshold', 0.4),
+        ('status_interval', 1.0),
+        ('history_every', 0), # Storico per bot, come AgentStrategy
+        ('run_info', None),
+    )
+
+    def __init__(self):
+        sessions_dir = os.path.join(os.path.dirname(__file__), 'sessions')
+        os.makedirs(sessions_dir, exist_ok=True)
+
+        self.bots = []
+        self.bot_by_data = {}
+        for bot_id, data in zip(self.params.bot_ids, self.datas):
+            status_file = os.path.join(sessions_dir, f'status_{bot_id}.json')
+            bot = PortfolioBot(bot_id, data, self.params.capital, status_file, self.params.status_interval)
+            if self.params.history_every:
+                bot.history = HistoryWriter(
+                    history_path(sessions_dir, bot_id),
+                    info=dict(self.params.run_info or {}, bot_id=bot_id, capital=self.params.capital),
+                    every=self.params.history_every
+                )
+            self.bots.append(bot)
+            self.bot_by_data[data] = bot
+
+        # Un solo modello per tutti i bot (non serve se i segnali sono gia' calcolati)
+        self.agent = None
+        if self.params.signals is None:
+            self.agent = TradingAgent(
+                safe_mode=self.params.safe_mode,
+                buy_threshold=self.params.buy_threshold,
+                sell_threshold=self.params.sell_threshold
+            )
+
+        for bot in self.bots:
+            bot.log('Strategia Inizializzata')
+            self.write_status(bot, 'Inizializzazione', force=True)
+
+    def stop(self):
+        for bot in self.bots:
+            if bot.status_channel.pending:
+                self.write_status(bot, 'Fine dati', force=True)
+            if bot.history is not None:
+                value = bot.value(self.getposition(bot.data).size)
+                if bot.bars:
+                    bot.history.add_equity(bot.bars, bot.data.datetime.datetime(0).isoformat(), value, bot.cash)
+                bot.history.close({'final_portfolio_value': round(value, 2)})
+
+    def notify_order(self, order):
+        if order.status in [order.Submitted, order.Accepted]:
+            return
+
+        bot = self.bot_by_data[order.data]
+        if order.status == order.Completed:
+            side = 'BUY' if order.isbuy() else 'SELL'
+            bot.cash -= order.executed.size * order.executed.price + order.executed.comm
+            ts = bot.data.datetime.datetime(0).isoformat()
+            bot.trades.append((ts, side, order.executed.price, order.executed.size))
+            if bot.history is not None:
+                bot.history.add_trade(
+                    bot.bars, ts, side, order.executed.price, order.executed.size,
+                    bot.value(self.getposition(bot.data).size)
+                )
+            bot.log(
+                f'ORDER COMPLETED {side} @ {order.executed.price:.5f} '
+                f'(size: {order.executed.size})'
+            )
+        elif order.status == order.Canceled:
+            bot.log('ORDER CANCELED')
+        elif order.status == order.Margin:
+            bot.log('ORDER MARGIN REJECTED')
+        elif order.status == order.Rejected:
+            bot.log('ORDER REJECTED')
+
+        bot.order = None
+        self.write_status(bot, 'Aggiornamento ordine', force=bot.force_events)
+
+    def write_status(self, bot, event="Update", force=False):
+        """Stato del singolo bot, con gli stessi campi di AgentStrategy.write_status."""
+        if not bot.status_channel.due(force):
+            return
+
+        position = self.getposition(bot.data)
+        status = {
+            'bot_id': bot.bot_id,
+            'timestamp': datetime.datetime.now().isoformat(),
+            'event': event,
+            'recent_logs': bot.recent_logs,
+            'portfolio_value': round(bot.value(position.size), 2),
+            'cash': round(bot.cash, 2),
+            'position_size': position.size,
+            'last_close': bot.data.close[0] if len(bot.data) > 0 else None,
+            'status': 'In esecuzione'
+        }
+        try:
+            bot.status_channel.publish(status)
+        except Exception as e:
+            print(f"Errore nella scrittura di {bot.status_file}: {str(e)}")
+
+    def prenext(self):
+        # Con piu' feed Backtrader chiama next solo quando tutti hanno almeno una candela:
+        # ogni bot deve invece partire dalla propria prima candela
+        self.next()
+
+    def next(self):
+        # Solo i feed che hanno prodotto una nuova candela (timeframe diversi avanzano a ritmi diversi)
+        advanced = []
+        for bot in self.bots:
+            if len(bot.data) == bot.bars:
+                continue
+            bot.bars = len(bot.data)
+            bot.indicators.update(bot.data.close[0])
+            self.write_status(bot)
+            if bot.history is not None and bot.history.due(bot.bars):
+                bot.history.add_equity(
+                    bot.bars, bot.data.datetime.datetime(0).isoformat(),
+                    bot.value(self.getposition(bot.data).size), bot.cash
+                )
+            if bot.order is None:
+                advanced.append(bot)
+
+        if not advanced:
+            return
+
+        for bot, (decision, info) in zip(advanced, self.decide(advanced)):
+            position = self.getposition(bot.data)
+            if decision == 'BUY' and not position:
+                bot.log(f'BUY SIGNAL ({info.get("reason")}) - Price: {bot.data.close[0]}')
+                bot.order = self.buy(data=bot.data)
+                self.write_status(bot, f'Acquisto: {info.get("reason")}', force=bot.force_events)
+            elif decision == 'SELL' and position:
+                bot.log(f'SELL SIGNAL ({info.get("reason")}) - Price: {bot.data.close[0]}')
+                bot.order = self.sell(data=bot.data)
+                self.write_status(bot, f'Vendita: {info.get("reason")}', force=bot.force_events)
+
+    def decide(self, bots):
+        """Decisioni per i bot indicati: segnali precalcolati o una sola inference batch."""
+        if self.params.signals is not None:
+            return [self.params.signals[bot.bot_id][bot.bars - 1] for bot in bots]
+
+        agent = self.agent
+        rows = [
+            bot.indicators.vector(agent.feature_cols) if bot.bars >= agent.min_history else None
+            for bot in bots
+        ]
+        return agent.get_decisions(rows)
 
 
 def write_terminal_status(status_file, bot_id, status_label, event, error=None, extra_fields=None):
@@ -137,18 +437,241 @@ def write_terminal_status(status_file, bot_id, status_label, event, error=None,
         payload['error'] = error
     if extra_fields:
         payload.update(extra_fields)
-    with open(status_file, 'w') as f:
-        json.dump(payload, f, indent=4)
+    write_json_atomic(status_file, payload)
+
+
+def run_error(bot_id, bots=None):
+    """
+    Errore dell'ultima run (None se non fallita) dal file di stato finale: run_engine restituisce None
+    in caso di errore dopo averlo scritto li' (in modalita' portfolio nei file dei bot membri).
+    """
+    sessions_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'sessions')
+    for member_id in [bot['bot_id'] for bot in bots] if bots else [bot_id]:
+        try:
+            with open(os.path.join(sessions_dir, f'status_{member_id}.json'), 'r') as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if status.get('error') and str(status.get('status', '')).startswith('Errore'):
+            return status['error']
+    return None
+
+
+def feed_timeframe(bars):
+    """Timeframe e compressione Backtrader dall'intervallo delle candele (dedotto dai timestamp)."""
+    interval = bars.interval
+    if interval is None:
+        # Meno di due candele: nessuna distanza da misurare
+        return (bt.TimeFrame.Minutes, 1) if bars.intraday else (bt.TimeFrame.Days, 1)
+    if interval % bar_store.DAY == 0:
+        return bt.TimeFrame.Days, interval // bar_store.DAY
+    if interval % 60 == 0:
+        return bt.TimeFrame.Minutes, interval // 60
+    return bt.TimeFrame.Seconds, interval
+
+
+def make_feed(bars, name=None):
+    """Feed Backtrader per un BarSet, con timeframe dedotto dal tipo di dati."""
+    tf, compression = feed_timeframe(bars)
+    return BarStoreData(bars=bars, timeframe=tf, compression=compression, name=name)
+
+
+def make_live_feed(bars, host, port, queue_size=256, backpressure='block'):
+    """Feed live dal socket host:port, con lo stesso timeframe del CSV di riferimento."""
+    tf, compression = feed_timeframe(bars)
+    return LiveBarData(
+        host=host, port=port, queue_size=queue_size, backpressure=backpressure,
+        timeframe=tf, compression=compression
+    )
+
+
+def run_vector_engine(bot_id, data_file, datapath, status_file, mode='backtest',
+                      initial_capital=DEFAULT_INITIAL_CAPITAL, buy_threshold=0.6, sell_threshold=0.4,
+                      history_every=0, timeframe=None):
+    """
+    Backtest con il simulatore NumPy (vector_engine) invece di bt.Cerebro:
+    decisioni batch dell'agente e fill/equity calcolati con operazioni su array.
+    Scrive gli stessi campi finali (e lo stesso storico) del motore Backtrader.
+    """
+    try:
+        if mode == 'live':
+            raise ValueError("Il motore vettoriale supporta solo backtest e fast-backtest")
+        if not os.path.exists(datapath):
+            raise FileNotFoundError(f"File non trovato: {datapath}")
+
+        import pandas as pd
+
+        bars = bar_store.load_bars(datapath, timeframe=timeframe)
+        df = bars.to_dataframe()
+        print(f'[{bot_id}] Avvio engine=vector mode={mode} su {data_file}')
+        agent = TradingAgent(buy_threshold=buy_threshold, sell_threshold=sell_threshold)
+        # Handshake di avvio: dati e modello caricati (app.py attende il primo file di stato)
+        write_json_atomic(status_file, {
+            'bot_id': bot_id,
+            'timestamp': datetime.datetime.now().isoformat(),
+            'event': 'Avvio backtest vettoriale',
+            'status': 'In esecuzione'
+        })
+        features = feature_store.load_features(datapath, bars=bars)
+        signals = vector_engine.signals_from_decisions(agent.get_batch_decisions(df, features))
+        opens = df['Open'].to_numpy(dtype='float64')
+        result = vector_engine.simulate(signals, opens, df['Close'].to_numpy(dtype='float64'), initial_capital)
+        timestamps = [ts.isoformat() for ts in pd.to_datetime(df['Date'])]
+        trades = vector_engine.trade_list(result, opens, timestamps)
+    except Exception as e:
+        error_msg = f"ERRORE esecuzione: {str(e)}"
+        print(error_msg)
+        write_terminal_status(
+            status_file=status_file,
+            bot_id=bot_id,
+            status_label='Errore esecuzione',
+            event='Errore run',
+            error=error_msg
+        )
+        return
+
+    final_value = round(result['final_portfolio_value'], 2)
+    summary = {
+        'initial_capital': initial_capital,
+        'final_portfolio_value': final_value,
+        'final_pnl': round(final_value - initial_capital, 2)
+    }
+    if history_every:
+        write_vector_history(
+            history_path(os.path.dirname(status_file), bot_id), result, timestamps, trades, history_every,
+            info={'bot_id': bot_id, 'mode': mode, 'engine': 'vector', 'data_file': data_file,
+                  'timeframe': bar_store.timeframe_label(bars.interval) if bars.interval else None, 'initial_capital': initial_capital}
+        )
+    write_terminal_status(
+        status_file=status_file,
+        bot_id=bot_id,
+        status_label='Completato',
+        event='Backtest terminato',
+        extra_fields=summary
+    )
+    return dict(summary, trades=trades)
+
+
+def write_vector_history(path, result, timestamps, trades, every, info):
+    """Storico del motore vettoriale: stessi punti (candele 1-based ogni `every` + l'ultima) di AgentStrategy."""
+    equity, cash = result['equity'], result['cash']
+    n = len(equity)
+    if not n:
+        return
+    history = HistoryWriter(path, info=info, every=every)
+    bars = list(range(every, n + 1, every))
+    if bars[-1:] != [n]:
+        bars.append(n)
+    history.extend_equity((bar, timestamps[bar - 1], float(equity[bar - 1]), float(cash[bar - 1])) for bar in bars)
+    # trade_list segue l'ordine dei fill: la candela di ogni trade e' la posizione del fill
+    for idx, (ts, side, price, size) in zip(result['fills'].nonzero()[0], trades):
+        history.add_trade(int(idx) + 1, ts, side, price, size, float(equity[idx]))
+    history.close({'final_portfolio_value': round(result['final_portfolio_value'], 2)})
+
+
+def run_portfolio(bots, mode='backtest', safe_mode=False, initial_capital=DEFAULT_INITIAL_CAPITAL,
+                  buy_threshold=0.6, sell_threshold=0.4, status_interval=1.0, history_every=1):
+    """
+    Modalita' portfolio: tutti i bot (lista di dict con bot_id, symbol, data_file) in un solo
+    processo e un solo Cerebro, con un modello condiviso. initial_capital e' il capitale di
+    ciascun bot (il broker parte con la somma). Stati e risultati restano per bot_id.
+    Ogni bot puo' indicare un 'timeframe' a cui ricampionare il proprio dataset.
+    Restituisce {bot_id: riepilogo con trade} o None in caso di errore.
+    """
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    sessions_dir = os.path.join(basedir, 'sessions')
+    os.makedirs(sessions_dir, exist_ok=True)
+    bot_ids = [bot['bot_id'] for bot in bots]
+    status_files = {bot_id: os.path.join(sessions_dir, f'status_{bot_id}.json') for bot_id in bot_ids}
+
+    def fail(status_label, event, error_msg):
+        print(error_msg)
+        for bot_id in bot_ids:
+            write_terminal_status(status_files[bot_id], bot_id, status_label, event, error=error_msg)
+
+    if mode == 'live':
+        return fail('Errore esecuzione', 'Errore run', "ERRORE esecuzione: la modalita' portfolio supporta solo backtest e fast-backtest")
+    if len(set(bot_ids)) != len(bot_ids):
+        return fail('Errore dati', 'Errore caricamento dati', "ERRORE dati: bot_id duplicati nel portfolio")
+
+    cerebro = bt.Cerebro()
+    bar_sets = {}
+    try:
+        for bot in bots:
+            datapath = os.path.join(basedir, 'data', bot['data_file'])
+            if not os.path.exists(datapath):
+                raise FileNotFoundError(f"File non trovato: {datapath}")
+            bar_sets[bot['bot_id']] = (datapath, bar_store.load_bars(datapath, timeframe=bot.get('timeframe')))
+            cerebro.adddata(make_feed(bar_sets[bot['bot_id']][1], name=bot['bot_id']))
+    except Exception as e:
+        return fail('Errore dati', 'Errore caricamento dati', f"ERRORE dati (portfolio): {str(e)}")
+
+    try:
+        signals = None
+        if mode == 'fast-backtest':
+            # Un solo modello e una sola chiamata batch per ciascun dataset
+            agent = TradingAgent(buy_threshold=buy_threshold, sell_threshold=sell_threshold)
+            signals = {
+                bot_id: agent.get_batch_decisions(bars.to_dataframe(), feature_store.load_features(datapath, bars=bars))
+                for bot_id, (datapath, bars) in bar_sets.items()
+            }
+
+        cerebro.addstrategy(
+            PortfolioStrategy, bot_ids=bot_ids, capital=initial_capital, signals=signals,
+            safe_mode=safe_mode, buy_threshold=buy_threshold, sell_threshold=sell_threshold,
+            status_interval=status_interval, history_every=history_every, run_info={'mode': mode, 'portfolio': bot_ids}
+        )
+        cerebro.broker.setcash(initial_capital * len(bots))
+        print(f'[portfolio] Avvio mode={mode} con {len(bots)} bot')
+        strategy = cerebro.run()[0]
+    except Exception as e:
+        return fail('Errore esecuzione', 'Errore run', f"ERRORE esecuzione: {str(e)}")
+
+    results = {}
+    for bot in strategy.bots:
+        final_value = round(bot.value(strategy.getposition(bot.data).size), 2)
+        summary = {
+            'initial_capital': initial_capital,
+            'final_portfolio_value': final_value,
+            'final_pnl': round(final_value - initial_capital, 2)
+        }
+        write_terminal_status(
+            status_file=bot.status_file,
+            bot_id=bot.bot_id,
+            status_label='Completato',
+            event='Backtest terminato',
+            extra_fields=summary
+        )
+        results[bot.bot_id] = dict(summary, trades=bot.trades)
+    return results
 
 
-def run_engine(bot_id, symbol, data_file, mode='backtest'):
+def run_engine(bot_id, symbol, data_file, mode='backtest', safe_mode=False, engine='cerebro',
+               initial_capital=DEFAULT_INITIAL_CAPITAL, buy_threshold=0.6, sell_threshold=0.4,
+               model_server=None, status_interval=1.0, bots=None, live_address=None,
+               replay_speed=0.0, live_queue=256, backpressure='block', history_every=1, force=False,
+               timeframe=None):
     """
     Configura ed esegue il motore per un bot specifico.
     mode=backtest: termina al termine del dataset
-    mode=live: resta attivo finche' il feed live produce dati
+    mode=fast-backtest: come backtest, ma con decisioni calcolate in batch prima della run
+    mode=live: resta attivo finche' il feed live produce dati. Le candele arrivano dal socket
+      live_address ('host:porta'); senza indirizzo un ReplayServer locale trasmette data_file
+      a replay_speed (0 = massima velocita'). live_queue/backpressure: coda del feed (block o drop_oldest).
+    engine=cerebro usa Backtrader, engine=vector il simulatore NumPy (solo backtest).
+    model_server: True/indirizzo per delegare l'inference per candela al model server condiviso.
+    status_interval: secondi minimi tra due scritture del file di stato durante la run.
+    bots: lista di bot (bot_id, symbol, data_file) da eseguire insieme in modalita' portfolio.
+    timeframe: '5m', '1h', '1d', ... per ricampionare data_file (default: l'intervallo dei dati, dedotto dai timestamp).
+    history_every: punti di equity e fill in sessions/history_<bot_id>.db ogni N candele (0 = nessuno storico).
+    I backtest deterministici (vedi result_cache.is_deterministic) riusano il risultato salvato per lo
+    stesso dataset, modello e parametri senza eseguire la run (ne' aggiornare lo storico); force=True la riesegue.
+    Restituisce il riepilogo finale (con la lista dei trade) o None in caso di errore.
     """
-    cerebro = bt.Cerebro()
-    cerebro.addstrategy(AgentStrategy, bot_id=bot_id)
+    if bots:
+        return run_portfolio(
+            bots, mode, safe_mode, initial_capital, buy_threshold, sell_threshold, status_interval, history_every
+        )
 
     # --- SORGENTE DATI ---
     basedir = os.path.abspath(os.path.dirname(__file__))
@@ -156,34 +679,66 @@ def run_engine(bot_id, symbol, data_file, mode='backtest'):
     os.makedirs(sessions_dir, exist_ok=True)
     datapath = os.path.join(basedir, 'data', data_file)
     status_file = os.path.join(sessions_dir, f'status_{bot_id}.json')
-    
+
+    # --- CACHE RISULTATI ---
+    cache_key = None
+    if result_cache.is_deterministic(mode, engine, safe_mode) and os.path.exists(datapath):
+        cache_params = {
+            'mode': mode, 'engine': engine, 'initial_capital': initial_capital, 'timeframe': timeframe,
+            'buy_threshold': buy_threshold, 'sell_threshold': sell_threshold,
+            # Conta solo dove sostituisce il fallback casuale (decisioni per candela)
+            'safe_mode': bool(safe_mode) if mode == 'backtest' and engine == 'cerebro' else None
+        }
+        try:
+            cache_key = result_cache.result_key(datapath, cache_params)
+        except Exception as e:
+            print(f'[{bot_id}] Cache dei risultati non disponibile: {str(e)}')
+        cached = result_cache.load(cache_key) if cache_key is not None and not force else None
+        if cached is not None:
+            print(f'[{bot_id}] Risultato dalla cache ({cache_key[:12]}) per mode={mode} engine={engine} su {data_file}')
+            write_terminal_status(
+                status_file=status_file,
+                bot_id=bot_id,
+                status_label='Completato',
+                event='Backtest terminato (cache)',
+                extra_fields={key: value for key, value in cached.items() if key != 'trades'}
+            )
+            return cached
+
+    def save_result(result):
+        if cache_key is not None and result is not None:
+            try:
+                result_cache.store(cache_key, result, cache_params)
+            except Exception as e:
+                print(f'[{bot_id}] Impossibile salvare il risultato in cache: {str(e)}')
+        return result
+
+    if engine == 'vector':
+        return save_result(run_vector_engine(
+            bot_id, data_file, datapath, status_file, mode,
+            initial_capital, buy_threshold, sell_threshold, history_every, timeframe
+        ))
+
+    cerebro = bt.Cerebro()
+    replay = None
+
     try:
         if not os.path.exists(datapath):
             raise FileNotFoundError(f"File non trovato: {datapath}")
             
-        # Rileva se il file contiene orari (intraday) o solo date
-        with open(datapath, 'r') as f:
-            first_line = f.readlines()[1] # Salta header
-            is_intraday = ' ' in first_line.split(',')[0]
-
-        if is_intraday:
-            dt_format = '%Y-%m-%d %H:%M:%S'
-            tf = bt.TimeFrame.Minutes
-            compression = 15 # Assumiamo 15m come da tua richiesta, potremmo renderlo dinamico
+        # Candele dalla cache colonnare (conversione dal CSV solo se il sorgente e' cambiato)
+        bars = bar_store.load_bars(datapath, timeframe=timeframe)
+        if mode == 'live':
+            if live_address:
+                host, port = parse_address(live_address)
+            else:
+                replay = ReplayServer(datapath, speed=replay_speed, timeframe=timeframe).start()
+                host, port = replay.address
+            print(f'[{bot_id}] Feed live da {host}:{port}')
+            live_data = make_live_feed(bars, host, port, live_queue, backpressure)
+            cerebro.adddata(live_data)
         else:
-            dt_format = '%Y-%m-%d'
-            tf = bt.TimeFrame.Days
-            compression = 1
-
-        data = bt.feeds.GenericCSVData(
-            dataname=datapath,
-            dtformat=(dt_format),
-            datetime=0, open=1, high=2, low=3, close=4, volume=5, openinterest=-1,
-            headers=True,
-            timeframe=tf,
-            compression=compression
-        )
-        cerebro.adddata(data)
+            cerebro.adddata(make_feed(bars))
     except Exception as e:
         error_msg = f"ERRORE dati ({data_file}): {str(e)}"
         print(error_msg)
@@ -196,11 +751,30 @@ def run_engine(bot_id, symbol, data_file, mode='backtest'):
         )
         return
 
+    history = {
+        'history_every': history_every,
+        'run_info': {
+            'mode': mode, 'engine': engine, 'symbol': symbol, 'data_file': data_file,
+            'timeframe': bar_store.timeframe_label(bars.interval) if bars.interval else None, 'initial_capital': initial_capital
+        }
+    }
     try:
-        initial_capital = 10000.0
+        if mode == 'fast-backtest':
+            # Feature e predizioni su tutto il dataset in un solo passaggio, poi replay dei segnali
+            agent = TradingAgent(buy_threshold=buy_threshold, sell_threshold=sell_threshold)
+            features = feature_store.load_features(datapath, bars=bars)
+            signals = agent.get_batch_decisions(bars.to_dataframe(), features)
+            cerebro.addstrategy(AgentStrategy, bot_id=bot_id, signals=signals, status_interval=status_interval, **history)
+        else:
+            cerebro.addstrategy(
+                AgentStrategy, bot_id=bot_id, safe_mode=safe_mode,
+                buy_threshold=buy_threshold, sell_threshold=sell_threshold,
+                model_server=model_server, status_interval=status_interval, **history
+            )
+
         cerebro.broker.setcash(initial_capital)
         print(f'[{bot_id}] Avvio mode={mode} su {data_file}')
-        cerebro.run()
+        strategy = cerebro.run()[0]
     except Exception as e:
         error_msg = f"ERRORE esecuzione: {str(e)}"
         print(error_msg)
@@ -212,44 +786,107 @@ def run_engine(bot_id, symbol, data_file, mode='backtest'):
             error=error_msg
         )
         return
+    finally:
+        if replay is not None:
+            replay.close()
+
+    final_value = round(cerebro.broker.getvalue(), 2)
+    final_pnl = round(final_value - initial_capital, 2)
+    summary = {
+        'initial_capital': initial_capital,
+        'final_portfolio_value': final_value,
+        'final_pnl': final_pnl
+    }
 
-    if mode == 'backtest':
-        final_value = round(cerebro.broker.getvalue(), 2)
-        final_pnl = round(final_value - initial_capital, 2)
+    if mode in ('backtest', 'fast-backtest'):
         write_terminal_status(
             status_file=status_file,
             bot_id=bot_id,
             status_label='Completato',
             event='Backtest terminato',
-            extra_fields={
-                'initial_capital': initial_capital,
-                'final_portfolio_value': final_value,
-                'final_pnl': final_pnl
-            }
+            extra_fields=summary
         )
+        save_result(dict(summary, trades=strategy.trades))
     else:
         # In live reale il processo resta attivo durante cerebro.run().
         # Se arriviamo qui, il feed live si e' chiuso o la run e' terminata.
-        final_value = round(cerebro.broker.getvalue(), 2)
-        final_pnl = round(final_value - initial_capital, 2)
+        summary['latency_ms'] = {
+            'tick_to_decision': strategy.decision_latency.summary(),
+            'ingest': live_data.ingest_latency.summary()
+        }
+        summary['dropped_bars'] = live_data.dropped
         write_terminal_status(
             status_file=status_file,
             bot_id=bot_id,
             status_label='Terminato',
             event='Feed live terminato',
-            extra_fields={
-                'initial_capital': initial_capital,
-                'final_portfolio_value': final_value,
-                'final_pnl': final_pnl
-            }
+            extra_fields=summary
         )
 
+    return dict(summary, trades=strategy.trades)
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Backtrader Bot Instance')
     parser.add_argument('--bot_id', type=str, required=True, help='ID univoco del bot')
     parser.add_argument('--symbol', type=str, default='EURUSD', help='Simbolo')
     parser.add_argument('--data_file', type=str, default='dati_esempio.csv', help='File CSV in backend/data/')
-    parser.add_argument('--mode', type=str, choices=['backtest', 'live'], default='backtest', help='Modalita esecuzione')
+    parser.add_argument('--mode', type=str, choices=['backtest', 'fast-backtest', 'live'], default='backtest', help='Modalita esecuzione')
+    parser.add_argument('--safe_mode', action='store_true', help='Fallback AI sempre HOLD (nessuna decisione casuale)')
+    parser.add_argument('--engine', type=str, choices=['cerebro', 'vector'], default='cerebro', help='Motore di simulazione')
+    parser.add_argument('--timeframe', type=str, default=None,
+                        help='Ricampiona i dati a questo timeframe (es. 1h, 4h, 1d; default: quello del file)')
+    parser.add_argument('--capital', type=float, default=DEFAULT_INITIAL_CAPITAL, help='Capitale iniziale')
+    parser.add_argument('--buy_threshold', type=float, default=0.6, help='Soglia probabilita per BUY')
+    parser.add_argument('--sell_threshold', type=float, default=0.4, help='Soglia probabilita per SELL')
+    parser.add_argument('--model_server', nargs='?', const=True, default=None,
+                        help='Usa il model server condiviso (indirizzo opzionale)')
+    parser.add_argument('--status_interval', type=float, default=1.0,
+                        help='Secondi minimi tra due scritture del file di stato (0 = ogni candela)')
+    
+    parser.add_argument('--live_address', type=str, default=None, metavar='HOST:PORTA',
+                        help='Sorgente live (default: replay locale di data_file)')
+    parser.add_argument('--replay_speed', type=float, default=0.0,
+                        help='Accelerazione del replay locale in live (0 = massima velocita)')
+    parser.add_argument('--live_queue', type=int, default=256, help='Candele massime in coda nel feed live')
+    parser.add_argument('--backpressure', type=str, choices=['block', 'drop_oldest'], default='block',
+                        help='Coda live piena: blocca la sorgente o scarta le candele piu vecchie')
+
+    parser.add_argument('--history_every', type=int, default=1,
+                        help='Storico SQLite di equity e fill: un punto ogni N candele (0 = disattivo)')
+
+    parser.add_argument('--force', action='store_true', help='Riesegue il backtest anche se il risultato e in cache')
+
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='FILE.prof',
+                        help='Esegue la run sotto cProfile (default: sessions/profile_<bot_id>.prof)')
+
+    parser.add_argument('--portfolio', type=str, nargs='+', default=None, metavar='BOT_ID:DATA_FILE[:TIMEFRAME]',
+                        help='Esegue piu bot in un solo Cerebro con un modello condiviso')
     
     args = parser.parse_args()
-    run_engine(args.bot_id, args.symbol, args.data_file, args.mode)
+    bots = None
+    if args.portfolio:
+        bots = []
+        for item in args.portfolio:
+            member_id, data_file, *member_timeframe = item.split(':', 2)
+            bots.append({
+                'bot_id': member_id, 'symbol': os.path.splitext(data_file)[0], 'data_file': data_file,
+                'timeframe': member_timeframe[0] if member_timeframe else None
+            })
+    engine_args = dict(
+        bot_id=args.bot_id, symbol=args.symbol, data_file=args.data_file, mode=args.mode,
+        safe_mode=args.safe_mode, engine=args.engine, initial_capital=args.capital,
+        buy_threshold=args.buy_threshold, sell_threshold=args.sell_threshold,
+        model_server=args.model_server, status_interval=args.status_interval, bots=bots,
+        live_address=args.live_address, replay_speed=args.replay_speed, live_queue=args.live_queue,
+        backpressure=args.backpressure, history_every=args.history_every, force=args.force,
+        timeframe=args.timeframe
+    )
+    if args.profile is not None:
+        sessions_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions')
+        os.makedirs(sessions_dir, exist_ok=True)
+        result = run_profiled(run_engine, args.profile or os.path.join(sessions_dir, f'profile_{args.bot_id}.prof'), **engine_args)
+    else:
+        result = run_engine(**engine_args)
+    # Errori di dati o di run sono gia' nel file di stato: l'exit code li segnala al supervisor
+    if result is None:
+        sys.exit(1)
@@ -1,14 +1,40 @@
 import pandas as pd
-import pandas_ta as ta
+import numpy as np
 import lightgbm as lgb
 import joblib
 import os
+import sys
+import json
+import time
+import shutil
 import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import bar_store
+import feature_store
+import compiled_model
+
+# Iperparametri del classificatore, condivisi con il walk-forward (walk_forward.py)
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'learning_rate': 0.05,
+    'num_leaves': 31,
+    'random_state': 42,
+    'verbose': -1,
+}
+
+# I modelli pooled usano feature (symbol, *_xs) che l'agente non calcola: cartella separata,
+# fuori dai modelli elencati da sweep e caricati dai bot
+POOLED_MODELS_DIR = os.path.join('backend', 'models', 'pooled')
 
 def prepare_data(df):
     """
     Calcola gli indicatori tecnici e prepara le feature per il modello.
+    Implementazione di riferimento con pandas_ta (importato solo qui): training e
+    inference usano il feature store, che produce gli stessi valori.
     """
+    import pandas_ta as ta
+
     # Assicurati che le colonne siano minuscole per pandas_ta
     df.columns = [col.lower() for col in df.columns]
     
@@ -28,6 +54,18 @@ def prepare_data(df):
     
     return df
 
+def save_model(model, feature_cols, model_path):
+    """Salva modello, lista feature ed esportazione compilata con la convenzione di backend/models."""
+    joblib.dump(model, model_path)
+    print(f"Modello salvato in: {model_path}")
+    
+    # Salva anche la lista delle feature per coerenza in fase di inference
+    joblib.dump(feature_cols, f"{model_path}_features.pkl")
+
+    # Esportazione compilata (array NumPy) usata dall'agente per l'inference
+    compiled = compiled_model.export_model(model_path, model)
+    print(f"Modello compilato salvato in: {compiled_model.compiled_path(model_path)} ({compiled.num_trees} alberi)")
+
 def train_model(data_path, model_name="trading_model.pkl"):
     """
     Addestra un modello LightGBM sui dati forniti.
@@ -37,43 +75,227 @@ def train_model(data_path, model_name="trading_model.pkl"):
         return
 
     print(f"Caricamento dati da {data_path}...")
-    df = pd.read_csv(data_path)
-    
-    df = prepare_data(df)
+    # Feature dal feature store: stesse righe di prepare_data, calcolate una sola volta per dataset
+    df = feature_store.training_frame(data_path)
     
     # Definizione delle feature
-    feature_cols = ['rsi', 'ema_20', 'ema_50', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+    feature_cols = list(feature_store.FEATURE_COLUMNS)
     X = df[feature_cols]
     y = df['target']
     
-    # Split semplice (80% train, 20% test) - In produzione andrebbe usato un TimeSeriesSplit
+    # Split semplice (80% train, 20% test) - per la validazione a finestre temporali vedi walk_forward.py
     split = int(len(df) * 0.8)
     X_train, X_test = X.iloc[:split], X.iloc[split:]
     y_train, y_test = y.iloc[:split], y.iloc[split:]
     
     print("Addestramento modello LightGBM...")
-    model = lgb.LGBMClassifier(
-        n_estimators=100,
-        learning_rate=0.05,
-        num_leaves=31,
-        random_state=42,
-        verbose=-1
-    )
+    model = lgb.LGBMClassifier(**MODEL_PARAMS)
     
     model.fit(X_train, y_train, eval_set=[(X_test, y_test)])
     
     # Salvataggio
-    model_path = os.path.join('backend', 'models', model_name)
-    joblib.dump(model, model_path)
-    print(f"Modello salvato in: {model_path}")
-    
-    # Salva anche la lista delle feature per coerenza in fase di inference
-    joblib.dump(feature_cols, os.path.join('backend', 'models', f"{model_name}_features.pkl"))
+    save_model(model, feature_cols, os.path.join('backend', 'models', model_name))
+
+# Feature aggiunte dal training multi-simbolo: codice del simbolo e z-score cross-sectional
+# (rispetto agli altri simboli sulla stessa candela) di versioni adimensionali delle feature base
+SYMBOL_COLUMN = 'symbol'
+CROSS_SECTIONAL_COLUMNS = [f"{col}_xs" for col in feature_store.FEATURE_COLUMNS]
+# Feature espresse in prezzo: divise per la close per renderle confrontabili tra simboli
+PRICE_SCALED = {'ema_20', 'ema_50', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9'}
+
+def cross_sectional_zscore(x, starts, counts, out):
+    """
+    Z-score di x all'interno di ogni gruppo di righe contigue (una candela, piu' simboli),
+    scritto in out. Gruppi con un solo simbolo o dispersione nulla valgono 0.
+    """
+    mean = np.repeat(np.add.reduceat(x, starts) / counts, counts)
+    np.subtract(x, mean, out=out)
+    std = np.repeat(np.sqrt(np.add.reduceat(out * out, starts) / counts), counts)
+    np.divide(out, std, out=out, where=std > 0)
+    out[std == 0] = 0.0
+
+def train_model_pooled(data_dir, model_name="pooled_model.pkl", workers=None):
+    """
+    Un solo modello su tutti i CSV di data_dir. Le feature di ogni simbolo vengono estratte in
+    parallelo su un pool di processi (nel feature store su disco, nessun array passa tra i
+    processi), poi copiate una sola volta nella matrice finale gia' ordinata per timestamp,
+    cosi' lo split 80/20 resta cronologico su tutto l'universo. Il fit usa tutti i core.
+    Il modello viene salvato in POOLED_MODELS_DIR.
+    Restituisce i tempi delle fasi in secondi.
+    """
+    paths = sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.csv')) if os.path.isdir(data_dir) else []
+    if not paths:
+        print(f"Errore: nessun CSV in {data_dir}.")
+        return
+
+    symbols = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    timings = {}
+    wall_start = time.perf_counter()
+
+    # 1. Estrazione: matrici delle feature costruite (o riusate) in parallelo nel feature store
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    print(f"Estrazione feature di {len(paths)} simboli su {workers} processi...")
+    start = time.perf_counter()
+    if workers == 1:
+        results = [feature_store.build_features(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(feature_store.build_features, paths))
+    timings['estrazione'] = time.perf_counter() - start
+    for symbol, (_, bars, status, seconds) in zip(symbols, results):
+        print(f"  {symbol:<20} {bars:>9} candele  {status:<6} {seconds:7.2f}s")
+
+    # 2. Assemblaggio: righe valide di ogni simbolo (senza l'ultima candela, target ignoto)
+    # copiate direttamente nella posizione finale ordinata per timestamp
+    start = time.perf_counter()
+    blocks = []
+    for code, path in enumerate(paths):
+        bars = bar_store.load_bars(path)
+        features = feature_store.load_features(path, bars=bars)
+        keep = features.valid_mask()
+        keep[-1:] = False
+        close = np.asarray(bars.close)
+        target = np.zeros(len(close), dtype=np.int8)
+        target[:-1] = close[1:] > close[:-1]
+        blocks.append((code, features, np.flatnonzero(keep), bars, target))
+
+    timestamps = np.concatenate([np.asarray(bars.timestamps)[rows] for _, _, rows, bars, _ in blocks])
+    order = np.argsort(timestamps, kind='stable')
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    timestamps = timestamps[order]
+
+    feature_cols = list(feature_store.FEATURE_COLUMNS) + [SYMBOL_COLUMN] + CROSS_SECTIONAL_COLUMNS
+    X = np.empty((len(order), len(feature_cols)), dtype=np.float64)
+    y = np.empty(len(order), dtype=np.int8)
+    close = np.empty(len(order), dtype=np.float64)
+    offset = 0
+    for code, features, rows, bars, target in blocks:
+        dest = position[offset:offset + len(rows)]
+        for j in range(len(feature_store.FEATURE_COLUMNS)):
+            X[dest, j] = features.values[j][rows]
+        X[dest, len(feature_store.FEATURE_COLUMNS)] = code
+        y[dest] = target[rows]
+        close[dest] = np.asarray(bars.close)[rows]
+        offset += len(rows)
+    del blocks, position, order
+    timings['assemblaggio'] = time.perf_counter() - start
+
+    # 3. Feature cross-sectional: le righe della stessa candela sono contigue
+    start = time.perf_counter()
+    starts = np.flatnonzero(np.concatenate([[True], timestamps[1:] != timestamps[:-1]]))
+    counts = np.diff(np.append(starts, len(timestamps)))
+    base = len(feature_store.FEATURE_COLUMNS) + 1
+    for j, col in enumerate(feature_store.FEATURE_COLUMNS):
+        x = X[:, j] / close if col in PRICE_SCALED else np.ascontiguousarray(X[:, j])
+        out = np.empty_like(x)
+        cross_sectional_zscore(x, starts, counts, out)
+        X[:, base + j] = out
+    timings['cross_section'] = time.perf_counter() - start
+    print(f"Matrice di training: {X.shape[0]} righe x {X.shape[1]} feature, {len(starts)} candele distinte ({X.nbytes / 1e6:.1f} MB)")
+
+    # 4. Fit su tutti i core; lo split cade al confine tra due candele
+    split = int(np.searchsorted(timestamps, timestamps[int(len(y) * 0.8)], side='left'))
+    n_jobs = os.cpu_count() or 1
+    print(f"Addestramento modello LightGBM (n_jobs={n_jobs})...")
+    start = time.perf_counter()
+    model = lgb.LGBMClassifier(**dict(MODEL_PARAMS, n_jobs=n_jobs))
+    model.fit(X[:split], y[:split], eval_set=[(X[split:], y[split:])], feature_name=feature_cols)
+    timings['fit'] = time.perf_counter() - start
+
+    # 5. Salvataggio: il codice della colonna symbol e' l'indice nella lista dei simboli
+    start = time.perf_counter()
+    os.makedirs(POOLED_MODELS_DIR, exist_ok=True)
+    model_path = os.path.join(POOLED_MODELS_DIR, model_name)
+    save_model(model, feature_cols, model_path)
+    with open(f"{model_path}_symbols.json", 'w') as f:
+        json.dump(symbols, f, indent=4)
+    timings['salvataggio'] = time.perf_counter() - start
+    timings['totale'] = time.perf_counter() - wall_start
+
+    print("Tempi per fase:")
+    for stage, seconds in timings.items():
+        print(f"  {stage + ':':<15} {seconds:8.2f}s")
+    bottleneck = max(('estrazione', 'assemblaggio', 'cross_section', 'fit'), key=timings.get)
+    print(f"Fase piu' lenta: {bottleneck}")
+    return timings
+
+def peak_memory_mb():
+    """Picco di memoria residente del processo in MB (None dove resource non e' disponibile, es. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss e' in KB su Linux, in byte su macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def train_model_chunked(data_path, model_name="trading_model.pkl", chunk_rows=100000):
+    """
+    Addestramento out-of-core per dataset piu' grandi della RAM: il CSV viene letto a blocchi
+    (feature_store.training_chunks), le righe di training vengono accodate a un file binario
+    su disco e LightGBM costruisce il Dataset leggendo la matrice memory-mapped.
+    In memoria restano un blocco alla volta piu' il Dataset binarizzato di LightGBM
+    (circa un byte per feature per riga), non il CSV ne' la matrice delle feature.
+    Stesse righe, stesso split e stessi parametri di train_model: il modello e' identico.
+    """
+    if not os.path.exists(data_path):
+        print(f"Errore: File {data_path} non trovato.")
+        return
+
+    feature_cols = list(feature_store.FEATURE_COLUMNS)
+    # File temporanei accanto ai dati e non in /tmp, che puo' essere in RAM (tmpfs)
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(data_path)), '.cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='training_', dir=cache_dir)
+    try:
+        features_path = os.path.join(workdir, 'features.f64')
+        target_path = os.path.join(workdir, 'target.i8')
+
+        print(f"Lettura a blocchi di {chunk_rows} candele da {data_path}...")
+        rows = 0
+        with open(features_path, 'wb') as features_file, open(target_path, 'wb') as target_file:
+            for X_chunk, y_chunk in feature_store.training_chunks(data_path, chunk_rows):
+                X_chunk.tofile(features_file)
+                y_chunk.tofile(target_file)
+                rows += len(y_chunk)
+        if rows < 2:
+            print(f"Errore: righe di training insufficienti in {data_path} ({rows}).")
+            return
+        print(f"Righe di training: {rows} ({rows * len(feature_cols) * 8 / 1e6:.1f} MB su disco)")
+
+        X = np.memmap(features_path, dtype=np.float64, mode='r', shape=(rows, len(feature_cols)))
+        y = np.memmap(target_path, dtype=np.int8, mode='r', shape=(rows,))
+
+        # Split cronologico 80/20 come train_model: slice del memmap, nessuna copia
+        split = int(rows * 0.8)
+        print("Addestramento modello LightGBM...")
+        model = lgb.LGBMClassifier(**MODEL_PARAMS)
+        model.fit(X[:split], y[:split], eval_set=[(X[split:], y[split:])], feature_name=feature_cols)
+        del X, y # Chiude le mappature prima di eliminare i file (necessario su Windows)
+
+        save_model(model, feature_cols, os.path.join('backend', 'models', model_name))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    peak = peak_memory_mb()
+    print(f"Memoria di picco: {peak:.1f} MB" if peak is not None else "Memoria di picco: non disponibile su questa piattaforma")
+    return model
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Train LightGBM Trading Model')
     parser.add_argument('--data', type=str, default='backend/data/dati_esempio.csv', help='Percorso file CSV')
-    parser.add_argument('--name', type=str, default='trading_model.pkl', help='Nome del modello da salvare')
+    parser.add_argument('--name', type=str, default=None, help='Nome del modello da salvare (default trading_model.pkl, pooled_model.pkl in backend/models/pooled con --pooled)')
+    parser.add_argument('--chunked', action='store_true', help='Addestramento out-of-core a blocchi (dataset piu grandi della RAM)')
+    parser.add_argument('--chunk_rows', type=int, default=100000, help='Candele lette per blocco con --chunked')
+    parser.add_argument('--pooled', action='store_true', help='Un solo modello su tutti i CSV di --data_dir')
+    parser.add_argument('--data_dir', type=str, default='backend/data', help='Cartella dei CSV con --pooled')
+    parser.add_argument('--workers', type=int, default=None, help='Processi per l\'estrazione delle feature con --pooled (default: tutti i core)')
     
     args = parser.parse_args()
-    train_model(args.data, args.name)
+    if args.pooled:
+        train_model_pooled(args.data_dir, args.name or 'pooled_model.pkl', args.workers)
+    elif args.chunked:
+        train_model_chunked(args.data, args.name or 'trading_model.pkl', args.chunk_rows)
+    else:
+        train_model(args.data, args.name or 'trading_model.pkl')
@@ -0,0 +1,77 @@
+import numpy as np
+
+# Codifica numerica delle decisioni dell'agente
+SIGNAL_CODES = {'BUY': 1, 'SELL': -1, 'HOLD': 0}
+
+
+def signals_from_decisions(decisions):
+    """Converte una lista (decisione, info) in un array di segnali +1/-1/0."""
+    return np.fromiter((SIGNAL_CODES.get(decision, 0) for decision, _ in decisions), dtype=np.int8, count=len(decisions))
+
+
+def signals_from_probabilities(probs, buy_threshold=0.6, sell_threshold=0.4):
+    """Applica le soglie dell'agente a un array di probabilità (NaN = HOLD) in modo vettoriale."""
+    probs = np.asarray(probs, dtype=np.float64)
+    signals = np.zeros(len(probs), dtype=np.int8)
+    signals[probs < sell_threshold] = -1
+    signals[probs > buy_threshold] = 1
+    return signals
+
+
+def max_drawdown(equity):
+    """Massimo drawdown percentuale della curva di equity."""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / peaks) * 100)
+
+
+def simulate(signals, opens, closes, initial_capital=10000.0, size=1):
+    """
+    Simulatore vettoriale long/flat equivalente ad AgentStrategy su Backtrader:
+    - BUY da flat apre una posizione di `size`, SELL da long la chiude, altrimenti si ignora
+    - gli ordini a mercato emessi sulla candela t vengono eseguiti all'open di t+1
+    - un segnale sull'ultima candela resta pendente e non viene eseguito
+    Restituisce posizioni, fill, cash ed equity per candela piu' il valore finale.
+    """
+    signals = np.asarray(signals)
+    opens = np.asarray(opens, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    n = len(signals)
+    if not (len(opens) == len(closes) == n):
+        raise ValueError("signals, opens e closes devono avere la stessa lunghezza")
+
+    # Stato desiderato dopo ogni candela: ultimo segnale non-HOLD (1 = long, 0 = flat), forward fill
+    has_signal = signals != 0
+    last_idx = np.where(has_signal, np.arange(n), -1)
+    np.maximum.accumulate(last_idx, out=last_idx)
+    target = np.where(last_idx >= 0, signals[np.maximum(last_idx, 0)] > 0, False).astype(np.int8)
+
+    # La posizione cambia all'open della candela successiva al segnale
+    position = np.zeros(n, dtype=np.int8)
+    position[1:] = target[:-1]
+    fills = np.diff(position, prepend=np.int8(0)).astype(np.int8) # +1 acquisto, -1 vendita
+
+    cash = initial_capital - np.cumsum(fills * opens * size)
+    equity = cash + position * size * closes
+
+    final_value = float(equity[-1]) if n else float(initial_capital)
+    return {
+        'position': position * size,
+        'fills': fills,
+        'cash': cash,
+        'equity': equity,
+        'final_portfolio_value': final_value,
+        'final_pnl': final_value - initial_capital,
+    }
+
+
+def trade_list(result, opens, timestamps, size=1):
+    """Lista dei trade (timestamp ISO, lato, prezzo, size) nello stesso formato di AgentStrategy.trades."""
+    fills = result['fills']
+    trades = []
+    for idx in np.flatnonzero(fills):
+        side = 'BUY' if fills[idx] > 0 else 'SELL'
+        trades.append((timestamps[idx], side, float(opens[idx]), size if side == 'BUY' else -size))
+    return trades
@@ -0,0 +1,275 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bar_store
+import feature_store
+import model_registry
+
+# Cache per processo worker: percorso dataset -> (feature, target, indici delle candele)
+_worker_frames = {}
+
+
+def make_folds(n_rows, n_folds=5, mode='expanding', train_size=None, test_size=None, gap=0):
+    """
+    Fold temporali (train_start, train_end, test_start, test_end), estremi finali esclusi.
+    Le finestre di test sono consecutive e coprono la parte finale della serie;
+    expanding: il train parte sempre da 0, rolling: il train ha lunghezza fissa train_size.
+    gap: righe scartate tra train e test (evita che il target del train "veda" il test).
+    """
+    if mode not in ('expanding', 'rolling'):
+        raise ValueError(f"Modalita' fold non supportata: {mode}")
+    test_size = test_size or n_rows // (n_folds + 1)
+    first_test = n_rows - n_folds * test_size
+    train_size = train_size or first_test - gap
+    if test_size <= 0 or first_test - gap <= 0 or train_size <= 0:
+        raise ValueError(f"Dati insufficienti per {n_folds} fold ({n_rows} righe)")
+
+    folds = []
+    for k in range(n_folds):
+        test_start = first_test + k * test_size
+        train_end = test_start - gap
+        train_start = 0 if mode == 'expanding' else max(0, train_end - train_size)
+        folds.append((train_start, train_end, test_start, test_start + test_size))
+    return folds
+
+
+def load_frame(data_path):
+    """
+    Feature e target dal feature store. L'ultima candela viene esclusa:
+    il suo target dipende da una chiusura che non esiste ancora.
+    """
+    if data_path not in _worker_frames:
+        frame = feature_store.training_frame(data_path).iloc[:-1]
+        _worker_frames[data_path] = (
+            frame[list(feature_store.FEATURE_COLUMNS)],
+            frame['target'].to_numpy(),
+            frame.index.to_numpy(),
+        )
+    return _worker_frames[data_path]
+
+
+def _fit(X, y, n_jobs, init_model=None, **overrides):
+    import lightgbm as lgb
+    from train_model import MODEL_PARAMS
+
+    model = lgb.LGBMClassifier(**dict(MODEL_PARAMS, n_jobs=n_jobs, **overrides))
+    model.fit(X, y, init_model=init_model)
+    return model
+
+
+def evaluate(model, X, y):
+    """Accuratezza, AUC e log loss sulla finestra di test."""
+    from sklearn.metrics import accuracy_score, roc_auc_score, log_loss
+
+    probs = model.predict_proba(X)[:, 1]
+    metrics = {
+        'accuracy': float(accuracy_score(y, probs > 0.5)),
+        'logloss': float(log_loss(y, probs, labels=[0, 1])),
+        'auc': float(roc_auc_score(y, probs)) if len(set(y)) > 1 else None,
+    }
+    return metrics
+
+
+def train_fold(task):
+    """Addestra e valuta un singolo fold (eseguito in un processo worker)."""
+    import joblib
+
+    X, y, _ = load_frame(task['data_path'])
+    train_start, train_end, test_start, test_end = task['bounds']
+    row = {'fold': task['fold'], 'train': [train_start, train_end], 'test': [test_start, test_end]}
+    try:
+        start = time.perf_counter()
+        model = _fit(X.iloc[train_start:train_end], y[train_start:train_end], task['n_jobs'])
+        row['fit_seconds'] = round(time.perf_counter() - start, 4)
+
+        start = time.perf_counter()
+        row.update(evaluate(model, X.iloc[test_start:test_end], y[test_start:test_end]))
+        row['predict_seconds'] = round(time.perf_counter() - start, 4)
+
+        row['model_file'] = f"fold_{task['fold']}.pkl"
+        joblib.dump(model, os.path.join(task['out_dir'], row['model_file']))
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def mean_metrics(rows):
+    """Media delle metriche sui fold riusciti."""
+    metrics = {}
+    for key in ('accuracy', 'auc', 'logloss'):
+        values = [row[key] for row in rows if row.get(key) is not None]
+        metrics[key] = round(float(np.mean(values)), 6) if values else None
+    return metrics
+
+
+def dataset_record(data_path):
+    """Campi che legano un run al contenuto del dataset e alla specifica delle feature."""
+    bars = bar_store.load_bars(data_path)
+    return {
+        'dataset': os.path.basename(data_path),
+        'data_path': os.path.abspath(data_path),
+        'trained_bars': len(bars),
+        'dataset_hash': feature_store.dataset_hash(bars),
+        'feature_spec': feature_store.spec_hash(),
+    }
+
+
+def run_walk_forward(data_path, n_folds=5, mode='expanding', train_size=None, test_size=None, gap=0,
+                     workers=None, train_final=True):
+    """
+    Walk-forward: addestra i fold in parallelo su un pool di processi, poi (train_final)
+    il modello finale sulla finestra piu' recente. Modelli, metriche e tempi finiscono
+    in backend/models/registry/<run_id>/. Restituisce il record del run.
+    """
+    from train_model import save_model
+
+    wall_start = time.perf_counter()
+    X, y, _ = load_frame(data_path) # Costruisce/aggiorna il feature store prima dei worker
+    folds = make_folds(len(X), n_folds, mode, train_size, test_size, gap)
+
+    record = dict(dataset_record(data_path), kind='walk_forward', parent=None)
+    record['run_id'] = model_registry.create_run(data_path, record['kind'])
+    out_dir = model_registry.run_dir(record['run_id'])
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(folds)))
+    # I thread di LightGBM vengono divisi tra i fold per non sovraccaricare i core
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    tasks = [
+        {'data_path': data_path, 'fold': k, 'bounds': bounds, 'n_jobs': n_jobs, 'out_dir': out_dir}
+        for k, bounds in enumerate(folds)
+    ]
+    start = time.perf_counter()
+    if workers == 1:
+        rows = [train_fold(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(train_fold, tasks))
+    folds_seconds = time.perf_counter() - start
+
+    record.update({
+        'mode': mode,
+        'gap': gap,
+        'folds': rows,
+        'metrics': mean_metrics(rows),
+        'timings': {
+            'workers': workers,
+            'folds_wall_seconds': round(folds_seconds, 4),
+            'folds_fit_seconds_sum': round(sum(row.get('fit_seconds', 0.0) for row in rows), 4),
+        },
+    })
+
+    if train_final:
+        final_start = 0 if mode == 'expanding' else max(0, len(X) - (folds[0][1] - folds[0][0]))
+        start = time.perf_counter()
+        model = _fit(X.iloc[final_start:], y[final_start:], -1)
+        record['timings']['final_fit_seconds'] = round(time.perf_counter() - start, 4)
+        record['final'] = {'model_file': 'final.pkl', 'rows': [final_start, len(X)], 'trees': model.booster_.num_trees()}
+        save_model(model, list(X.columns), model_registry.model_path(record['run_id']))
+
+    record['timings']['total_seconds'] = round(time.perf_counter() - wall_start, 4)
+    return model_registry.save_run(record)
+
+
+def continue_training(run_id, data_path=None, new_trees=20, window=0):
+    """
+    Continuazione warm-start: parte dal modello finale del run `run_id` (init_model) e aggiunge
+    `new_trees` alberi addestrati solo sulle candele arrivate dopo quel run (piu' `window`
+    righe precedenti). Il dataset deve estendere quello del run: stesso contenuto sulle
+    candele gia' viste e stessa specifica delle feature.
+    Le metriche registrate sono quelle del modello di partenza sulle nuove candele.
+    """
+    import joblib
+    from train_model import save_model
+
+    base = model_registry.load_run(run_id)
+    if 'final' not in base:
+        raise ValueError(f"Il run {run_id} non ha un modello finale da cui ripartire")
+    data_path = data_path or base['data_path']
+
+    bars = bar_store.load_bars(data_path)
+    if base.get('feature_spec') != feature_store.spec_hash():
+        raise ValueError("Specifica delle feature cambiata: serve un nuovo walk-forward completo")
+    if len(bars) < base['trained_bars'] or feature_store.dataset_hash(bars, base['trained_bars']) != base['dataset_hash']:
+        raise ValueError("Il dataset non estende quello usato dal run: serve un nuovo walk-forward completo")
+
+    X, y, bar_index = load_frame(data_path)
+    # L'ultima riga del run precedente non aveva ancora il target: ora e' disponibile
+    selected = bar_index >= base['trained_bars'] - 1 - window
+    if not selected.any():
+        raise ValueError("Nessuna nuova candela da cui continuare l'addestramento")
+
+    base_model = joblib.load(model_registry.model_path(run_id))
+    # Le nuove candele non sono mai state viste dal modello di partenza: test fuori campione gratuito
+    new_rows = bar_index >= base['trained_bars'] - 1
+    forward_metrics = evaluate(base_model, X[new_rows], y[new_rows])
+
+    wall_start = time.perf_counter()
+    model = _fit(X[selected], y[selected], -1, init_model=base_model.booster_, n_estimators=new_trees)
+    fit_seconds = time.perf_counter() - wall_start
+
+    record = dict(dataset_record(data_path), kind='warm_start', parent=run_id)
+    record['run_id'] = model_registry.create_run(data_path, record['kind'])
+    record.update({
+        'new_rows': int(selected.sum()),
+        'new_trees': new_trees,
+        'window': window,
+        'metrics': forward_metrics,
+        'final': {'model_file': 'final.pkl', 'trees': model.booster_.num_trees()},
+        'timings': {'fit_seconds': round(fit_seconds, 4)},
+    })
+    save_model(model, list(X.columns), model_registry.model_path(record['run_id']))
+    return model_registry.save_run(record)
+
+
+def format_run(record):
+    """Tabella testuale di un run per la CLI."""
+    lines = [f"Run {record['run_id']} ({record['kind']}, {record['dataset']})"]
+    for row in record.get('folds', []):
+        if 'error' in row:
+            lines.append(f"  fold {row['fold']}: ERRORE {row['error']}")
+            continue
+        auc = f"{row['auc']:.4f}" if row['auc'] is not None else '--'
+        lines.append(
+            f"  fold {row['fold']}: train {row['train'][0]:>6}-{row['train'][1]:<6} test {row['test'][0]:>6}-{row['test'][1]:<6}"
+            f" acc={row['accuracy']:.4f} auc={auc} logloss={row['logloss']:.4f} fit={row['fit_seconds']:.2f}s"
+        )
+    lines.append(f"  metriche medie: {record.get('metrics')}")
+    lines.append(f"  tempi: {record.get('timings')}")
+    if 'final' in record:
+        lines.append(f"  modello finale: {model_registry.model_path(record['run_id'])} ({record['final']['trees']} alberi)")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Training walk-forward con fold paralleli e registry dei modelli')
+    parser.add_argument('--data', type=str, default='backend/data/EURUSD_X.csv', help='Percorso file CSV')
+    parser.add_argument('--folds', type=int, default=5, help='Numero di fold')
+    parser.add_argument('--mode', type=str, default='expanding', choices=['expanding', 'rolling'], help='Finestra di train')
+    parser.add_argument('--train_size', type=int, default=None, help='Righe di train per fold (rolling)')
+    parser.add_argument('--test_size', type=int, default=None, help='Righe di test per fold')
+    parser.add_argument('--gap', type=int, default=0, help='Righe escluse tra train e test')
+    parser.add_argument('--workers', type=int, default=None, help='Fold addestrati in parallelo (default: tutti i core)')
+    parser.add_argument('--continue_run', type=str, default=None, help='Run da cui continuare con init_model (warm start)')
+    parser.add_argument('--new_trees', type=int, default=20, help='Alberi aggiunti nella continuazione')
+    parser.add_argument('--window', type=int, default=0, help='Righe gia viste incluse nella continuazione')
+    parser.add_argument('--promote', type=str, default=None, help='Copia il modello finale in backend/models/<nome>')
+    parser.add_argument('--list', action='store_true', help='Elenca i run nel registry')
+
+    args = parser.parse_args()
+    if args.list:
+        for entry in model_registry.list_runs():
+            print(f"{entry['run_id']:<50} parent={entry['parent']} barre={entry['trained_bars']} metriche={entry['metrics']}")
+    else:
+        if args.continue_run:
+            record = continue_training(args.continue_run, args.data, args.new_trees, args.window)
+        else:
+            record = run_walk_forward(
+                args.data, args.folds, args.mode, args.train_size, args.test_size, args.gap, args.workers
+            )
+        print(format_run(record))
+        if args.promote:
+            print(f"Modello promosso in: {model_registry.promote(record['run_id'], args.promote)}")
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import backtrader as bt
+import pandas as pd
+
+import bar_store
+from feeds import BarStoreData
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data')
+
+
+class RecordStrategy(bt.Strategy):
+    """Strategia vuota che registra datetime e close per confrontare i feed."""
+
+    def __init__(self):
+        self.rows = []
+
+    def next(self):
+        self.rows.append((self.data.datetime[0], self.data.close[0]))
+
+
+def run_feed(data):
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(data)
+    cerebro.addstrategy(RecordStrategy)
+    return cerebro.run()[0].rows
+
+
+def csv_feed(datapath, intraday):
+    """Percorso attuale: GenericCSVData con parsing strptime riga per riga."""
+    return bt.feeds.GenericCSVData(
+        dataname=datapath,
+        dtformat='%Y-%m-%d %H:%M:%S' if intraday else '%Y-%m-%d',
+        datetime=0, open=1, high=2, low=3, close=4, volume=5, openinterest=-1,
+        headers=True,
+        timeframe=bt.TimeFrame.Minutes if intraday else bt.TimeFrame.Days,
+        compression=15 if intraday else 1
+    )
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(data_file):
+    datapath = os.path.join(DATA_DIR, data_file)
+
+    read_csv_time, _ = timed(pd.read_csv, datapath)
+    convert_time, meta = timed(bar_store.convert_csv, datapath)
+    load_time, bars = timed(bar_store.load_bars, datapath)
+
+    tf = bt.TimeFrame.Minutes if bars.intraday else bt.TimeFrame.Days
+    csv_run_time, csv_rows = timed(run_feed, csv_feed(datapath, bars.intraday))
+    store_run_time, store_rows = timed(
+        run_feed, BarStoreData(bars=bars, timeframe=tf, compression=15 if bars.intraday else 1)
+    )
+
+    print(f"Dataset:                   {data_file} ({meta['rows']} righe)")
+    print(f"pd.read_csv:               {read_csv_time * 1000:10.2f} ms")
+    print(f"bar_store conversione:     {convert_time * 1000:10.2f} ms (una tantum)")
+    print(f"bar_store load (mmap):     {load_time * 1000:10.2f} ms")
+    print(f"Cerebro GenericCSVData:    {csv_run_time * 1000:10.2f} ms")
+    print(f"Cerebro BarStoreData:      {store_run_time * 1000:10.2f} ms")
+    print(f"Candele identiche:         {'SI' if csv_rows == store_rows else 'NO'}")
+    return 0 if csv_rows == store_rows else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark caricamento CSV vs bar store colonnare')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file))
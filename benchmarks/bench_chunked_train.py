@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import hashlib
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODELS_DIR = os.path.join(ROOT, 'backend', 'models')
+
+
+def child(path, mode, model_name, chunk_rows):
+    """Eseguito in un processo separato: ru_maxrss misura solo questo addestramento."""
+    import joblib
+    import train_model
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        if mode == 'chunked':
+            train_model.train_model_chunked(path, model_name, chunk_rows)
+        else:
+            train_model.train_model(path, model_name)
+    seconds, peak_mb = time.perf_counter() - start, train_model.peak_memory_mb()
+
+    # Alberi del modello salvato, senza i metadati pandas che dipendono solo dal tipo di input
+    booster = joblib.load(os.path.join(MODELS_DIR, model_name)).booster_
+    trees = [line for line in booster.model_to_string().splitlines() if not line.startswith('pandas_categorical')]
+    digest = hashlib.sha1('\n'.join(trees).encode()).hexdigest()
+    print(json.dumps({'seconds': seconds, 'peak_mb': peak_mb, 'trees': digest}))
+
+
+def generate(path, bars):
+    """
+    Dataset sintetico creato in un processo separato: su Linux ru_maxrss passa dal padre ai figli
+    attraverso fork ed exec, quindi il benchmark deve restare piccolo per non falsare le misure.
+    """
+    code = f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); " \
+           f"from synthetic import synthetic_csv; synthetic_csv({path!r}, {bars}, seed={bars}, freq='1min')"
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def measure(path, mode, model_name, chunk_rows):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', path, mode, model_name, '--chunk_rows', str(chunk_rows)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def remove_model(model_name):
+    for suffix in ('', '_features.pkl', '_compiled.npz'):
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(MODELS_DIR, model_name + suffix))
+
+
+def main(sizes, chunk_rows):
+    workdir = tempfile.mkdtemp(prefix='bench_chunked_train_')
+    failures = 0
+    try:
+        print(f"{'candele':>9} {'CSV':>8} {'in memoria':>20} {'a blocchi':>20}  stesso modello")
+        for bars in sizes:
+            path = os.path.join(workdir, f'synthetic_{bars}.csv')
+            generate(path, bars)
+            csv_mb = os.path.getsize(path) / 1e6
+            names = {mode: f'bench_chunked_{mode}.pkl' for mode in ('memory', 'chunked')}
+            try:
+                stats = {mode: measure(path, mode, name, chunk_rows) for mode, name in names.items()}
+                identical = stats['memory']['trees'] == stats['chunked']['trees']
+            finally:
+                for name in names.values():
+                    remove_model(name)
+            failures += not identical
+            row = '  '.join(f"{stats[mode]['seconds']:7.1f}s {stats[mode]['peak_mb']:7.0f} MB" for mode in names)
+            print(f"{bars:>9} {csv_mb:6.0f}MB   {row}  {'SI' if identical else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Picco di memoria e tempi: training in memoria vs out-of-core a blocchi')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250000, 1000000], help='Candele da 1 minuto dei dataset sintetici')
+    parser.add_argument('--chunk_rows', type=int, default=100000, help='Candele per blocco del training a blocchi')
+    parser.add_argument('--child', nargs=3, metavar=('CSV', 'MODE', 'MODEL'), help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child, args.chunk_rows)
+        sys.exit(0)
+    sys.exit(main(args.sizes, args.chunk_rows))
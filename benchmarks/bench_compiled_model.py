@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import argparse
+import warnings
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import feature_store
+from compiled_model import compile_model
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data')
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'models')
+
+
+def per_row_us(func, rows, repeat):
+    """Latenza media in microsecondi di func(riga) su `repeat` passate delle righe."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            func(row)
+    return (time.perf_counter() - start) / (repeat * len(rows)) * 1e6
+
+
+def main(model_name, data_file, rows, repeat):
+    warnings.filterwarnings('ignore')
+    model = joblib.load(os.path.join(MODELS_DIR, model_name))
+    compiled = compile_model(model)
+    booster = model.booster_
+    cols = compiled.feature_names
+
+    features = feature_store.load_features(os.path.join(DATA_DIR, data_file))
+    X = features.matrix(cols)[features.valid_mask(cols)]
+    sample = X[:rows]
+    sample_lists = sample.tolist()
+
+    sklearn_us = per_row_us(lambda row: model.predict_proba(pd.DataFrame([row], columns=cols))[0][1], sample_lists, 1)
+    booster_us = per_row_us(lambda row: booster.predict(np.array([row]))[0], sample_lists, repeat)
+    compiled_us = per_row_us(compiled.predict_one, sample_lists, repeat)
+
+    start = time.perf_counter()
+    expected = model.predict_proba(pd.DataFrame(X, columns=cols))[:, 1]
+    sklearn_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = compiled.predict_proba(X)[:, 1]
+    compiled_batch = time.perf_counter() - start
+
+    row_diff = max(abs(compiled.predict_one(row) - prob) for row, prob in zip(X.tolist(), expected))
+    batch_diff = float(np.abs(batch - expected).max())
+
+    print(f"Modello:                        {model_name} ({compiled.num_trees} alberi, {len(compiled.threshold)} nodi)")
+    print(f"Riga singola predict_proba:     {sklearn_us:10.1f} us")
+    print(f"Riga singola Booster.predict:   {booster_us:10.1f} us")
+    print(f"Riga singola compilato:         {compiled_us:10.1f} us ({sklearn_us / compiled_us:.0f}x)")
+    print(f"Batch {len(X)} predict_proba:    {sklearn_batch * 1000:10.2f} ms")
+    print(f"Batch {len(X)} compilato:        {compiled_batch * 1000:10.2f} ms")
+    print(f"Scarto max riga / batch:        {row_diff:.1e} / {batch_diff:.1e}")
+    return 0 if max(row_diff, batch_diff) <= 1e-12 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Latenza per riga: LGBMClassifier vs modello compilato NumPy')
+    parser.add_argument('--model', type=str, default='trading_model.pkl', help='Modello in backend/models/')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+    parser.add_argument('--rows', type=int, default=500, help='Righe usate per la misura della latenza')
+    parser.add_argument('--repeat', type=int, default=5, help='Ripetizioni (non per predict_proba, troppo lento)')
+
+    args = parser.parse_args()
+    sys.exit(main(args.model, args.data_file, args.rows, args.repeat))
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from download_data import download_many, output_path
+
+
+class StubDownloader:
+    """
+    Sostituto offline di yf.download: serie giornaliere deterministiche per ticker,
+    latenza di rete simulata e un errore transitorio ogni `fail_every` richieste.
+    """
+
+    def __init__(self, latency, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self.rows_served = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, ticker, start, end, interval):
+        with self.lock:
+            self.calls += 1
+            fail = self.fail_every and self.calls % self.fail_every == 0
+        time.sleep(self.latency)
+        if fail:
+            raise ConnectionError(f"errore simulato per {ticker}")
+
+        # Stessa serie per un ticker qualunque sia l'intervallo richiesto
+        # Giorni lavorativi filtrati a mano: freq='B' di pandas costa piu' della latenza simulata
+        dates = pd.date_range('2000-01-03', end, freq='D', inclusive='left')
+        dates = dates[dates.dayofweek < 5]
+        close = 100 + np.cumsum(np.random.default_rng(sum(ord(c) for c in ticker)).normal(0, 1, len(dates)))
+        mask = dates >= pd.Timestamp(start)
+        dates, close = dates[mask], close[mask]
+        with self.lock:
+            self.rows_served += len(dates)
+
+        # Formato di yfinance recente: colonne MultiIndex (Price, Ticker), indice 'Date' con fuso
+        columns = pd.MultiIndex.from_product([['Close', 'High', 'Low', 'Open', 'Volume'], [ticker]], names=['Price', 'Ticker'])
+        values = np.column_stack([close, close + 1, close - 1, close, np.full(len(close), 1000)])
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates.tz_localize('UTC'), name='Date'), columns=columns)
+
+
+def run(label, stub, tickers, start, end, data_dir, workers, full):
+    began = time.perf_counter()
+    results = download_many(tickers, start, end, data_dir=data_dir, downloader=stub,
+                            workers=workers, retries=3, backoff=0.01, full=full)
+    elapsed = time.perf_counter() - began
+    errors = [r for r in results if r['status'] == 'error']
+    rows = sum(r['rows_added'] for r in results)
+    print(f"{label:<34} {elapsed:7.2f}s  righe={rows:<8} richieste={stub.calls:<4} errori={len(errors)}")
+    return elapsed, errors
+
+
+def main(tickers, workers, latency):
+    names = [f"SYN{i}-USD" for i in range(tickers)]
+    start, middle, end = '2000-01-01', '2024-01-01', '2024-03-01'
+    workdir = tempfile.mkdtemp(prefix='downloader_')
+    try:
+        sequential_dir = os.path.join(workdir, 'sequential')
+        parallel_dir = os.path.join(workdir, 'parallel')
+
+        print(f"Ticker: {tickers}, latenza simulata {latency * 1000:.0f} ms, un errore ogni 7 richieste\n")
+        seq_time, seq_errors = run('Completo sequenziale (1 worker)', StubDownloader(latency, 7),
+                                   names, start, end, sequential_dir, 1, True)
+        run(f'Completo concorrente ({workers} worker)', StubDownloader(latency, 7),
+            names, start, middle, parallel_dir, workers, True)
+        inc_stub = StubDownloader(latency, 7)
+        inc_time, inc_errors = run(f'Incrementale concorrente ({workers} w)', inc_stub,
+                                   names, start, end, parallel_dir, workers, False)
+        noop_stub = StubDownloader(latency, 0)
+        run('Gia aggiornato (nessuna richiesta)', noop_stub, names, start, end, parallel_dir, workers, False)
+
+        identical = all(
+            open(output_path(name, sequential_dir), 'rb').read() == open(output_path(name, parallel_dir), 'rb').read()
+            for name in names
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\nSpeedup incrementale concorrente vs completo sequenziale: {seq_time / inc_time:.1f}x")
+    print(f"Righe richieste in incrementale: {inc_stub.rows_served}, richieste a file aggiornati: {noop_stub.calls}")
+    print(f"CSV identici al download completo: {'SI' if identical else 'NO'}")
+    return 0 if identical and not seq_errors and not inc_errors and noop_stub.calls == 0 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Downloader bulk: completo sequenziale vs incrementale concorrente (offline, stub di yfinance)')
+    parser.add_argument('--tickers', type=int, default=40, help='Numero di ticker sintetici')
+    parser.add_argument('--workers', type=int, default=8, help='Download contemporanei')
+    parser.add_argument('--latency', type=float, default=0.1, help='Latenza simulata per richiesta (secondi)')
+
+    args = parser.parse_args()
+    sys.exit(main(args.tickers, args.workers, args.latency))
@@ -0,0 +1,44 @@
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from trading_engine import run_engine
+
+
+def timed_run(bot_id, data_file, mode):
+    """Esegue run_engine silenziando i log per candela e restituisce (secondi, riepilogo)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = run_engine(bot_id, 'BENCH', data_file, mode=mode, safe_mode=True, force=True)
+    return time.perf_counter() - start, summary
+
+
+def main(data_file):
+    per_bar_time, per_bar = timed_run('bench_per_bar', data_file, 'backtest')
+    fast_time, fast = timed_run('bench_fast', data_file, 'fast-backtest')
+
+    if per_bar is None or fast is None:
+        print("Benchmark fallito: controlla i file di stato in backend/sessions/")
+        return 1
+
+    same_trades = per_bar['trades'] == fast['trades']
+    print(f"Dataset:         {data_file}")
+    print(f"backtest:        {per_bar_time:8.2f}s  trade={len(per_bar['trades'])}  pnl={per_bar['final_pnl']}")
+    print(f"fast-backtest:   {fast_time:8.2f}s  trade={len(fast['trades'])}  pnl={fast['final_pnl']}")
+    print(f"Speedup:         {per_bar_time / fast_time:8.2f}x")
+    print(f"Trade identici:  {'SI' if same_trades else 'NO'}")
+    return 0 if same_trades else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark backtest per candela vs fast-backtest batch')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file))
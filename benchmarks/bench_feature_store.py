@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import feature_store
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data')
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def pandas_ta_reference(datapath):
+    """Feature calcolate da train_model.prepare_data (pandas_ta), se disponibile."""
+    try:
+        from train_model import prepare_data
+    except ImportError:
+        return None, None
+    raw = pd.read_csv(datapath)
+    return timed(prepare_data, raw)
+
+
+def main(data_file, append_rows):
+    datapath = os.path.join(DATA_DIR, data_file)
+    workdir = tempfile.mkdtemp(prefix='feature_store_')
+    try:
+        # Copia del dataset senza le ultime candele, per simulare l'arrivo di nuovi dati
+        csv_copy = os.path.join(workdir, data_file)
+        raw = pd.read_csv(datapath)
+        raw.iloc[:-append_rows].to_csv(csv_copy, index=False)
+        cache_dir = os.path.join(workdir, 'features')
+
+        # La conversione del CSV nel bar store resta fuori dai tempi misurati
+        bar_store.load_bars(csv_copy)
+        build_time, built = timed(feature_store.load_features, csv_copy, cache_dir)
+        hit_time, hit = timed(feature_store.load_features, csv_copy, cache_dir)
+
+        raw.to_csv(csv_copy, index=False)
+        bar_store.load_bars(csv_copy)
+        append_time, appended = timed(feature_store.load_features, csv_copy, cache_dir)
+        shutil.rmtree(cache_dir)
+        full_time, full = timed(feature_store.load_features, csv_copy, cache_dir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    same = np.array_equal(np.asarray(appended.values), np.asarray(full.values), equal_nan=True)
+
+    print(f"Dataset:                 {data_file} ({len(full)} righe, specifica {feature_store.spec_hash()})")
+    print(f"build ({built.status}):          {build_time * 1000:10.2f} ms")
+    print(f"riuso ({hit.status}):            {hit_time * 1000:10.2f} ms")
+    print(f"append +{append_rows} ({appended.status}):  {append_time * 1000:10.2f} ms")
+    print(f"build completo:          {full_time * 1000:10.2f} ms")
+    print(f"Append == build:         {'SI' if same else 'NO'}")
+
+    ref_time, reference = pandas_ta_reference(datapath)
+    if reference is None:
+        print("prepare_data (pandas_ta): non disponibile, confronto saltato")
+        return 0 if same else 1
+
+    stored = full.to_dataframe().loc[reference.index]
+    max_diff = float((stored - reference[feature_store.FEATURE_COLUMNS]).abs().max().max())
+    print(f"prepare_data (pandas_ta):{ref_time * 1000:10.2f} ms")
+    print(f"Scarto max vs pandas_ta: {max_diff:.3e}")
+    return 0 if same and max_diff <= 1e-9 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark feature store: build, riuso e append incrementale')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+    parser.add_argument('--append_rows', type=int, default=100, help='Candele aggiunte nel test di append')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file, args.append_rows))
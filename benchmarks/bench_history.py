@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import datetime
+import tempfile
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from history_store import HistoryWriter, read_history
+
+
+def write_run(path, bars, trade_every=50):
+    """Run sintetica di `bars` candele da 15m: un punto di equity per candela e un fill ogni trade_every."""
+    history = HistoryWriter(path, info={'bot_id': 'bench_history'})
+    start = datetime.datetime(2020, 1, 1)
+    step = datetime.timedelta(minutes=15)
+    value = 10000.0
+    begin = time.perf_counter()
+    for bar in range(1, bars + 1):
+        ts = (start + step * bar).isoformat()
+        value += ((bar * 7919) % 13 - 6) * 0.01
+        if bar % trade_every == 0:
+            history.add_trade(bar, ts, 'BUY' if bar % (2 * trade_every) else 'SELL', 1.1, 1, value)
+        history.add_equity(bar, ts, value, value)
+    history.close()
+    return time.perf_counter() - begin, (start + step * (bars // 2)).isoformat(), (start + step * (bars // 2 + bars // 10)).isoformat()
+
+
+def timed(func, repeat=5):
+    best, result = None, None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def load_all(path):
+    """Riferimento: tutta la curva in memoria e serializzata, come senza query per finestra."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute('SELECT bar, ts, value, cash FROM equity ORDER BY bar').fetchall()
+    finally:
+        conn.close()
+    return json.dumps([{'bar': bar, 'ts': ts, 'value': value, 'cash': cash} for bar, ts, value, cash in rows])
+
+
+def main(bars, points):
+    workdir = tempfile.mkdtemp(prefix='bench_history_')
+    path = os.path.join(workdir, 'history_bench.db')
+    try:
+        write_time, window_start, window_end = write_run(path, bars)
+        size_mb = sum(os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir)) / 1e6
+        print(f"{'Scrittura:':<28} {bars} punti in {write_time:6.2f}s  ({write_time / bars * 1e6:.2f} us/candela, {size_mb:.1f} MB)")
+
+        full_time, payload = timed(lambda: load_all(path), repeat=1)
+        print(f"{'Curva completa (JSON):':<28} {full_time * 1000:8.1f}ms  {len(payload) / 1e6:.1f} MB")
+
+        whole_time, whole = timed(lambda: json.dumps(read_history(path, points=points)))
+        print(f"{f'Run intera, {points} punti:':<28} {whole_time * 1000:8.1f}ms  {len(whole) / 1e3:.0f} kB")
+
+        window_time, window = timed(lambda: read_history(path, start=window_start, end=window_end, points=points))
+        print(f"{'Finestra 10%:':<28} {window_time * 1000:8.1f}ms  {len(window['equity'])} punti, {len(window['trades'])} trade (stride {window['stride']})")
+        print(f"{'Speedup (run intera):':<28} {full_time / whole_time:8.1f}x")
+    finally:
+        for f in os.listdir(workdir):
+            os.remove(os.path.join(workdir, f))
+        os.rmdir(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrittura e query per finestra dello storico SQLite di equity e trade')
+    parser.add_argument('--bars', type=int, default=1000000, help='Candele della run sintetica')
+    parser.add_argument('--points', type=int, default=1000, help='Punti richiesti per il grafico')
+
+    args = parser.parse_args()
+    sys.exit(main(args.bars, args.points))
@@ -0,0 +1,62 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+
+import bar_store
+from trading_engine import run_engine
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data')
+
+
+def quiet(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def format_latency(stats):
+    return (f"p50 {stats['p50_ms']:7.3f} ms  p90 {stats['p90_ms']:7.3f} ms  "
+            f"p99 {stats['p99_ms']:7.3f} ms  max {stats['max_ms']:7.3f} ms")
+
+
+def main(data_file, rate):
+    bars = bar_store.load_bars(os.path.join(DATA_DIR, data_file))
+    spacing = float(np.median(np.diff(bars.timestamps)))
+    common = dict(safe_mode=True, status_interval=1.0)
+
+    backtest_time, backtest = quiet(run_engine, 'bench_live', 'BENCH', data_file, mode='backtest', **common)
+    burst_time, burst = quiet(run_engine, 'bench_live', 'BENCH', data_file, mode='live', **common)
+    # Replay cadenzato: `rate` candele al secondo, sotto la capacita' di decisione della strategia
+    paced_time, paced = quiet(
+        run_engine, 'bench_live', 'BENCH', data_file, mode='live', replay_speed=spacing * rate, **common
+    )
+
+    same_trades = backtest['trades'] == burst['trades'] == paced['trades']
+    print(f"Dataset:                     {data_file} ({len(bars)} candele)")
+    print(f"Backtest (BarStoreData):     {backtest_time:7.2f}s")
+    print(f"Live replay max velocita':   {burst_time:7.2f}s  ({len(bars) / burst_time:,.0f} candele/s)")
+    print(f"  tick->decisione (in coda): {format_latency(burst['latency_ms']['tick_to_decision'])}")
+    print(f"Live replay {rate:g} candele/s:  {paced_time:7.2f}s")
+    print(f"  ingestione:                {format_latency(paced['latency_ms']['ingest'])}")
+    print(f"  tick->decisione:           {format_latency(paced['latency_ms']['tick_to_decision'])}")
+    print(f"Candele scartate:            {burst['dropped_bars'] + paced['dropped_bars']}")
+    print(f"Trade identici al backtest:  {'SI' if same_trades else 'NO'}")
+    return 0 if same_trades else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Feed live: parita con il backtest e latenza tick->decisione')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+    parser.add_argument('--rate', type=float, default=500.0, help='Candele al secondo del replay cadenzato')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file, args.rate))
@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from trading_engine import run_engine, run_portfolio
+from synthetic import synthetic_csv
+
+
+def quiet(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(symbols, bars, mode):
+    workdir = tempfile.mkdtemp(prefix='portfolio_')
+    try:
+        bots = []
+        for i in range(symbols):
+            # Un simbolo su quattro in daily: timeframe misti nello stesso Cerebro
+            freq = 'D' if i % 4 == 3 else '15min'
+            path = os.path.join(workdir, f'SYN{i}.csv')
+            synthetic_csv(path, bars, seed=i, freq=freq)
+            bots.append({'bot_id': f'bench_portfolio_{i}', 'symbol': f'SYN{i}', 'data_file': path})
+
+        single_time = 0.0
+        single = {}
+        for bot in bots:
+            elapsed, result = quiet(
+                run_engine, bot['bot_id'], bot['symbol'], bot['data_file'], mode=mode, safe_mode=True, status_interval=1.0, force=True
+            )
+            single_time += elapsed
+            single[bot['bot_id']] = result
+
+        portfolio_time, portfolio = quiet(run_portfolio, bots, mode=mode, safe_mode=True, status_interval=1.0)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    same_trades = all(portfolio[bot_id]['trades'] == single[bot_id]['trades'] for bot_id in single)
+    same_pnl = all(portfolio[bot_id]['final_pnl'] == single[bot_id]['final_pnl'] for bot_id in single)
+    trades = sum(len(result['trades']) for result in portfolio.values())
+
+    print(f"Simboli x candele:      {symbols} x {bars} (mode={mode})")
+    print(f"{symbols} run separate:       {single_time:8.2f}s")
+    print(f"portfolio (1 Cerebro):  {portfolio_time:8.2f}s  trade={trades}")
+    print(f"Speedup:                {single_time / portfolio_time:8.2f}x")
+    print(f"Trade identici:         {'SI' if same_trades else 'NO'}")
+    print(f"PnL identici:           {'SI' if same_pnl else 'NO'}")
+    return 0 if same_trades and same_pnl else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark N run separate vs modalita portfolio (un solo Cerebro)')
+    parser.add_argument('--symbols', type=int, default=8, help='Numero di simboli sintetici')
+    parser.add_argument('--bars', type=int, default=2000, help='Candele per simbolo')
+    parser.add_argument('--mode', type=str, default='backtest', choices=['backtest', 'fast-backtest'], help='Modalita')
+
+    args = parser.parse_args()
+    sys.exit(main(args.symbols, args.bars, args.mode))
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import bar_store
+from synthetic import synthetic_csv
+
+PANDAS_RULES = {'5m': '5min', '15m': '15min', '1h': '1h', '4h': '4h', '1d': '1D'}
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def same_bars(frame, bars):
+    """Confronta il risultato di pandas.resample con il BarSet ricampionato."""
+    if not np.array_equal(frame.index.values.astype('datetime64[s]').astype(np.int64), np.asarray(bars.timestamps)):
+        return False
+    return all(
+        np.allclose(frame[col].to_numpy(), np.asarray(getattr(bars, col.lower())), rtol=0, atol=1e-9)
+        for col in AGGREGATION
+    )
+
+
+def main(bars, timeframes):
+    workdir = tempfile.mkdtemp(prefix='bench_resample_')
+    try:
+        path = os.path.join(workdir, 'synthetic_1m.csv')
+        synthetic_csv(path, bars, seed=bars, freq='1min')
+        convert_time, base = timed(bar_store.load_bars, path)
+        frame = pd.read_csv(path, parse_dates=['Date']).set_index('Date')
+        print(f"{'Serie 1m:':<12} {len(base)} candele (intervallo dedotto: {bar_store.timeframe_label(base.interval)}), conversione {convert_time:.2f}s")
+        print(f"{'timeframe':<12} {'candele':>9} {'ricampiona':>11} {'da cache':>10} {'pandas':>10}  identico")
+
+        failures = 0
+        for timeframe in timeframes:
+            first_time, resampled = timed(bar_store.load_bars, path, timeframe=timeframe)
+            cached_time, _ = timed(bar_store.load_bars, path, timeframe=timeframe)
+            pandas_time, expected = timed(lambda: frame.resample(PANDAS_RULES[timeframe]).agg(AGGREGATION).dropna())
+            identical = same_bars(expected, resampled)
+            failures += not identical
+            print(f"{timeframe:<12} {len(resampled):>9} {first_time * 1000:9.1f}ms {cached_time * 1000:8.2f}ms "
+                  f"{pandas_time * 1000:8.1f}ms  {'SI' if identical else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ricampionamento vettoriale del bar store vs pandas.resample')
+    parser.add_argument('--bars', type=int, default=1000000, help='Candele da 1 minuto della serie sintetica')
+    parser.add_argument('--timeframes', type=str, nargs='+', choices=list(PANDAS_RULES), default=list(PANDAS_RULES),
+                        help='Timeframe da confrontare')
+
+    args = parser.parse_args()
+    sys.exit(main(args.bars, args.timeframes))
@@ -0,0 +1,45 @@
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from trading_engine import run_engine
+
+
+def timed_run(data_file, mode, engine, force):
+    """Esegue run_engine silenziando i log per candela e restituisce (secondi, riepilogo)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = run_engine('bench_result_cache', 'BENCH', data_file, mode=mode, engine=engine, safe_mode=True, force=force)
+    return time.perf_counter() - start, summary
+
+
+def main(data_file, mode, engine):
+    run_time, fresh = timed_run(data_file, mode, engine, force=True)
+    hit_time, cached = timed_run(data_file, mode, engine, force=False)
+    if fresh is None or cached is None:
+        print("Run fallita: vedi backend/sessions/status_bench_result_cache.json")
+        return 1
+
+    identical = fresh == cached
+    print(f"{'Dataset:':<24} {data_file} (mode={mode}, engine={engine})")
+    print(f"{'Run completa (--force):':<24} {run_time:8.3f}s  trade={len(fresh['trades'])}")
+    print(f"{'Risultato dalla cache:':<24} {hit_time:8.3f}s  trade={len(cached['trades'])}")
+    print(f"{'Speedup:':<24} {run_time / hit_time:8.0f}x")
+    print(f"{'Risultati identici:':<24} {'SI' if identical else 'NO'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backtest rieseguito vs risultato dalla cache')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+    parser.add_argument('--mode', type=str, choices=['backtest', 'fast-backtest'], default='backtest', help='Modalita esecuzione')
+    parser.add_argument('--engine', type=str, choices=['cerebro', 'vector'], default='cerebro', help='Motore di simulazione')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file, args.mode, args.engine))
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+
+# Moduli che non devono essere importati all'avvio: percorso di inference e motore
+HEAVY_MODULES = ('pandas', 'pandas_ta', 'lightgbm', 'joblib', 'sklearn', 'backtrader')
+FORBIDDEN = {
+    'ai_agent': HEAVY_MODULES,
+    'model_server': HEAVY_MODULES,
+    'trading_engine': ('pandas', 'pandas_ta', 'lightgbm', 'joblib', 'sklearn'),
+}
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def import_time(module, repeat):
+    """Tempo di import (minimo su `repeat` interpreti nuovi) e moduli pesanti caricati."""
+    best, loaded = None, []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', PROBE.format(backend=BACKEND_DIR, module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = result['seconds'] if best is None else min(best, result['seconds'])
+        loaded = result['modules']
+    return best, loaded
+
+
+def time_to_ready(data_file, engine, timeout=60):
+    """
+    Con il pool disabilitato: latenza della risposta di POST /start_bot (non bloccante) e tempo
+    fino a quando il supervisor porta il job da 'starting' a 'running' (o 'failed').
+    """
+    os.environ['BOT_POOL_WORKERS'] = '0'
+    os.chdir(REPO_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    import app as flask_app
+
+    client = flask_app.app.test_client()
+    supervisor = flask_app.get_bot_supervisor()
+    payload = {'bot_id': 'bench_startup', 'data_file': data_file, 'mode': 'backtest', 'engine': engine, 'force': True}
+    start = time.perf_counter()
+    response = client.post('/start_bot', json=payload)
+    responded = time.perf_counter() - start
+    job = supervisor.job('bench_startup') or {'state': 'failed', 'error': response.get_json()['message']}
+    while job['state'] == 'starting' and time.perf_counter() - start < timeout:
+        time.sleep(0.01)
+        job = supervisor.job('bench_startup')
+    ready = time.perf_counter() - start
+    client.post('/stop_bot', json={'bot_id': 'bench_startup'})
+    while supervisor.job('bench_startup') is not None and time.perf_counter() - start < timeout:
+        time.sleep(0.01) # Arresto in background: attende la pulizia prima del caso successivo
+    return responded, ready, response.status_code, job
+
+def main(repeat, data_file, max_ms):
+    failures = 0
+    print(f"{'modulo':<16} {'import':>10}  moduli pesanti caricati")
+    for module, forbidden in FORBIDDEN.items():
+        seconds, loaded = import_time(module, repeat)
+        leaked = [m for m in loaded if m in forbidden]
+        over_budget = max_ms is not None and seconds * 1000 > max_ms
+        failures += bool(leaked) + over_budget
+        flag = '  NON AMMESSI' if leaked else ''
+        flag += f'  oltre {max_ms:g} ms' if over_budget else ''
+        print(f"{module:<16} {seconds * 1000:8.1f}ms  {', '.join(loaded) or '-'}{flag}")
+
+    for engine in ('cerebro', 'vector'):
+        responded, ready, code, job = time_to_ready(data_file, engine)
+        detail = f"  ({job['error']})" if job['error'] else ''
+        print(f"start_bot engine={engine:<8} risposta {responded * 1000:7.1f}ms  HTTP {code}  "
+              f"{job['state']} dopo {ready:6.2f}s{detail}")
+        failures += code >= 400 or job['state'] not in ('running', 'finished')
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Tempi di import a freddo e handshake di avvio dei bot')
+    parser.add_argument('--repeat', type=int, default=5, help='Interpreti nuovi per modulo (si tiene il minimo)')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+    parser.add_argument('--max_ms', type=float, default=None, help='Budget massimo di import per modulo (ms)')
+
+    args = parser.parse_args()
+    sys.exit(main(args.repeat, args.data_file, args.max_ms))
@@ -0,0 +1,67 @@
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import backtrader as bt
+
+import bar_store
+from feeds import BarStoreData
+from trading_engine import AgentStrategy
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data')
+
+
+def synthetic_signals(n, period=12):
+    """Segnali BUY/SELL alternati ogni `period` candele: ordini reali senza dipendere dal modello."""
+    signals = []
+    for i in range(n):
+        if i % period == 0:
+            decision = 'BUY' if (i // period) % 2 == 0 else 'SELL'
+        else:
+            decision = 'HOLD'
+        signals.append((decision, {"reason": "benchmark"}))
+    return signals
+
+
+def run_once(bars, status_interval):
+    """Esegue AgentStrategy con segnali sintetici e restituisce (secondi, scritture, coalescati)."""
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(BarStoreData(bars=bars, timeframe=bt.TimeFrame.Minutes, compression=15))
+    cerebro.addstrategy(
+        AgentStrategy, bot_id='bench_status', signals=synthetic_signals(len(bars)),
+        status_interval=status_interval
+    )
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy = cerebro.run()[0]
+    elapsed = time.perf_counter() - start
+    return elapsed, strategy.status_channel.writes, strategy.status_channel.coalesced
+
+
+def main(data_file, status_interval):
+    bars = bar_store.load_bars(os.path.join(DATA_DIR, data_file))
+
+    before_time, before_writes, _ = run_once(bars, 0)
+    after_time, after_writes, coalesced = run_once(bars, status_interval)
+
+    print(f"{'Dataset:':<30} {data_file} ({len(bars)} candele)")
+    print(f"{'Prima (scrittura per update):':<30} {len(bars) / before_time:10.0f} candele/s  scritture={before_writes}")
+    print(f"{f'Dopo (interval={status_interval}s):':<30} {len(bars) / after_time:10.0f} candele/s  scritture={after_writes}  coalescati={coalesced}")
+    print(f"{'Speedup:':<30} {before_time / after_time:10.2f}x")
+    print(f"{'Riduzione scritture:':<30} {before_writes / max(after_writes, 1):10.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark candele/s con file di stato per candela vs canale coalescato')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+    parser.add_argument('--status_interval', type=float, default=1.0, help='Intervallo di pubblicazione (s)')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file, args.status_interval))
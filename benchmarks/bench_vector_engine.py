@@ -0,0 +1,51 @@
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from trading_engine import run_engine
+
+
+def timed_run(bot_id, data_file, engine):
+    """Esegue run_engine in fast-backtest con il motore indicato e restituisce (secondi, riepilogo)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = run_engine(bot_id, 'BENCH', data_file, mode='fast-backtest', engine=engine, force=True)
+    return time.perf_counter() - start, summary
+
+
+def main(data_file):
+    cerebro_time, cerebro = timed_run('bench_cerebro', data_file, 'cerebro')
+    vector_time, vector = timed_run('bench_vector', data_file, 'vector')
+
+    if cerebro is None or vector is None:
+        print("Benchmark fallito: controlla i file di stato in backend/sessions/")
+        return 1
+
+    # Confronto dei trade con tolleranza sul prezzo (Backtrader arrotonda internamente i float)
+    same_trades = len(cerebro['trades']) == len(vector['trades']) and all(
+        a[0] == b[0] and a[1] == b[1] and a[3] == b[3] and abs(a[2] - b[2]) < 1e-9
+        for a, b in zip(cerebro['trades'], vector['trades'])
+    )
+    same_pnl = cerebro['final_pnl'] == vector['final_pnl']
+
+    print(f"Dataset:         {data_file}")
+    print(f"cerebro:         {cerebro_time:8.2f}s  trade={len(cerebro['trades'])}  pnl={cerebro['final_pnl']}")
+    print(f"vector:          {vector_time:8.2f}s  trade={len(vector['trades'])}  pnl={vector['final_pnl']}")
+    print(f"Speedup:         {cerebro_time / vector_time:8.2f}x")
+    print(f"Trade identici:  {'SI' if same_trades else 'NO'}")
+    print(f"PnL identico:    {'SI' if same_pnl else 'NO'}")
+    return 0 if same_trades and same_pnl else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cross-check e benchmark motore vettoriale vs bt.Cerebro')
+    parser.add_argument('--data_file', type=str, default='EURUSD_X.csv', help='File CSV in backend/data/')
+
+    args = parser.parse_args()
+    sys.exit(main(args.data_file))
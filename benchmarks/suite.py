@@ -0,0 +1,269 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Permette gli import dei moduli in backend/ (come run.py)
+sys.path.append(os.path.join(REPO_DIR, 'backend'))
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import feature_store
+from ai_agent import TradingAgent
+from trading_engine import run_engine
+from synthetic import synthetic_csv
+from bench_startup import import_time
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+CASES = (
+    'csv_load', 'bar_store_convert', 'bar_store_load', 'features', 'prepare_data',
+    'get_decision', 'batch_predict', 'backtest', 'fast_backtest', 'vector_backtest', 'train', 'import_time',
+)
+
+# Import a freddo (interprete nuovo) misurati una volta per esecuzione, indipendenti dalla dimensione
+IMPORT_MODULES = ('ai_agent', 'trading_engine')
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def measure(func, repeat, budget=2.0, min_time=0.5):
+    """
+    Tempo minimo su almeno `repeat` esecuzioni; i casi brevi vengono ripetuti fino a `min_time`
+    secondi complessivi per ridurre il rumore. Ci si ferma comunque oltre `budget` secondi.
+    """
+    best, spent, runs = None, 0.0, 0
+    while runs < max(1, repeat) or spent < min_time:
+        start = time.perf_counter()
+        quiet(func)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        spent += elapsed
+        runs += 1
+        if spent > budget:
+            break
+    return best
+
+
+def import_train_model():
+    """train_model (e, per prepare_data, pandas_ta): se mancano i casi vengono segnati come saltati."""
+    try:
+        import train_model
+        import pandas_ta # noqa: F401 - importato da prepare_data solo al primo uso
+        return train_model, None
+    except ImportError as e:
+        return (train_model if 'train_model' in locals() else None), f"modulo non disponibile ({e})"
+
+
+def run_size(path, bars, args, cases):
+    """Esegue i casi selezionati su un CSV sintetico di `bars` candele. Restituisce {caso: risultato}."""
+    results = {}
+
+    def record(case, seconds, measured_bars):
+        results[case] = {
+            'seconds': round(seconds, 6),
+            'bars': measured_bars,
+            'us_per_bar': round(seconds / measured_bars * 1e6, 4),
+        }
+
+    def skip(case, reason):
+        results[case] = {'skipped': reason}
+
+    train_model, train_error = import_train_model()
+
+    if 'csv_load' in cases:
+        record('csv_load', measure(lambda: pd.read_csv(path), args.repeat), bars)
+    if 'bar_store_convert' in cases:
+        record('bar_store_convert', measure(lambda: bar_store.convert_csv(path), args.repeat), bars)
+    loaded = bar_store.load_bars(path)
+    if 'bar_store_load' in cases:
+        record('bar_store_load', measure(lambda: np.asarray(bar_store.load_bars(path).close).sum(), args.repeat), bars)
+    if 'features' in cases:
+        record('features', measure(lambda: feature_store.compute_features(loaded.close), args.repeat), bars)
+    if 'prepare_data' in cases:
+        if train_error:
+            skip('prepare_data', train_error)
+        else:
+            record('prepare_data', measure(lambda: train_model.prepare_data(pd.read_csv(path)), args.repeat), bars)
+
+    agent = quiet(TradingAgent, safe_mode=True)
+    if 'get_decision' in cases:
+        # Candele per candela: misurate sulle prime per_bar candele, il costo per candela e' costante
+        count = min(bars, args.per_bar)
+        df = loaded.to_dataframe().iloc[:count]
+        rows = [
+            {'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for o, h, l, c, v in zip(df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
+        ]
+
+        def per_bar():
+            bar_agent = quiet(TradingAgent, safe_mode=True)
+            for row in rows:
+                bar_agent.get_decision(row)
+        record('get_decision', measure(per_bar, 1), count)
+    if 'batch_predict' in cases:
+        df = loaded.to_dataframe()
+        features = feature_store.load_features(path, bars=loaded)
+        record('batch_predict', measure(lambda: agent.get_batch_probabilities(df, features), args.repeat), bars)
+
+    for case, mode, engine in (('backtest', 'backtest', 'cerebro'), ('fast_backtest', 'fast-backtest', 'cerebro'),
+                               ('vector_backtest', 'backtest', 'vector')):
+        if case not in cases:
+            continue
+        if engine == 'cerebro' and bars > args.max_backtest_bars:
+            skip(case, f"oltre --max_backtest_bars ({args.max_backtest_bars})")
+            continue
+        summary = {}
+
+        def backtest():
+            summary['result'] = run_engine(f'bench_suite_{case}', 'BENCH', path, mode=mode, engine=engine, safe_mode=True, force=True)
+        seconds = measure(backtest, 1)
+        if summary['result'] is None:
+            skip(case, 'run_engine fallito (vedi backend/sessions)')
+        else:
+            record(case, seconds, bars)
+
+    if 'train' in cases:
+        if train_model is None:
+            skip('train', train_error)
+        elif bars > args.max_train_bars:
+            skip('train', f"oltre --max_train_bars ({args.max_train_bars})")
+        else:
+            # Il modello va nella cartella temporanea: backend/models resta intatta
+            model_path = os.path.join(os.path.dirname(path), f'bench_model_{bars}.pkl')
+            record('train', measure(lambda: train_model.train_model(path, model_path), 1), bars)
+    return results
+
+
+def environment():
+    import lightgbm
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'lightgbm': lightgbm.__version__,
+    }
+
+
+def run_suite(args):
+    os.chdir(REPO_DIR) # TradingAgent cerca il modello in backend/models (percorso relativo)
+    cases = args.cases or list(CASES)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_suite_')
+    os.makedirs(workdir, exist_ok=True)
+    report = {'environment': environment(), 'settings': {
+        'repeat': args.repeat, 'per_bar': args.per_bar,
+        'max_backtest_bars': args.max_backtest_bars, 'max_train_bars': args.max_train_bars,
+    }, 'results': {}}
+    if 'import_time' in cases:
+        for module in IMPORT_MODULES:
+            key = f"import_time/{module}"
+            seconds, _ = import_time(module, args.repeat)
+            report['results'][key] = {'seconds': round(seconds, 6)}
+            print(format_result(key, report['results'][key]))
+    try:
+        for bars in args.sizes:
+            path = os.path.join(workdir, f'synthetic_{bars}.csv')
+            if not os.path.exists(path):
+                start = time.perf_counter()
+                synthetic_csv(path, bars, seed=bars)
+                print(f"Generato {path} in {time.perf_counter() - start:.1f}s")
+            for case, result in run_size(path, bars, args, cases).items():
+                key = f"{case}/{bars}"
+                report['results'][key] = result
+                print(format_result(key, result))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRisultati salvati in {args.output}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            return compare(json.load(f), report, args.threshold)
+    return 0
+
+
+def format_result(key, result):
+    if 'skipped' in result:
+        return f"{key:<28} saltato: {result['skipped']}"
+    if 'us_per_bar' not in result:
+        return f"{key:<28} {result['seconds']:10.4f}s"
+    return f"{key:<28} {result['seconds']:10.4f}s  {result['us_per_bar']:10.3f} us/candela"
+
+
+def compare(baseline, current, threshold):
+    """
+    Confronta il costo per candela (o i secondi, per i casi senza candele come import_time)
+    di ogni caso presente in entrambi i report.
+    Restituisce 1 se almeno un caso e' piu' lento della baseline oltre `threshold` (0.2 = +20%).
+    """
+    regressions = 0
+    print(f"\n{'caso':<28} {'baseline':>12} {'attuale':>12} {'delta':>9}")
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None or 'skipped' in base or 'skipped' in result:
+            continue
+        if 'us_per_bar' in result:
+            base_value, value, unit = base['us_per_bar'], result['us_per_bar'], 'us'
+        else:
+            base_value, value, unit = base['seconds'] * 1000, result['seconds'] * 1000, 'ms'
+        delta = value / base_value - 1
+        flag = ''
+        if delta > threshold:
+            flag = '  REGRESSIONE'
+            regressions += 1
+        elif delta < -threshold:
+            flag = '  miglioramento'
+        print(f"{key:<28} {base_value:10.3f}{unit} {value:10.3f}{unit} {delta:+8.1%}{flag}")
+    print(f"\n{regressions} regressioni oltre il {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Suite di benchmark offline su serie OHLCV sintetiche')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Esegue la suite e salva i risultati in JSON')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Numero di candele delle serie sintetiche')
+    run_parser.add_argument('--cases', type=str, nargs='+', choices=CASES, default=None, help='Casi da eseguire (default: tutti)')
+    run_parser.add_argument('--output', type=str, default=None, help='File JSON dei risultati (es. benchmarks/baseline.json)')
+    run_parser.add_argument('--compare', type=str, default=None, help='Confronta subito con una baseline JSON')
+    run_parser.add_argument('--threshold', type=float, default=0.2, help='Rallentamento tollerato (0.2 = +20%%)')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Ripetizioni dei casi veloci (si tiene il minimo)')
+    run_parser.add_argument('--per_bar', type=int, default=20000, help='Candele misurate per get_decision')
+    run_parser.add_argument('--max_backtest_bars', type=int, default=100000, help='Oltre questa dimensione i backtest Backtrader vengono saltati')
+    run_parser.add_argument('--max_train_bars', type=int, default=1000000, help='Oltre questa dimensione il training viene saltato')
+    run_parser.add_argument('--workdir', type=str, default=None, help='Cartella dei CSV sintetici (riusati tra le esecuzioni)')
+
+    compare_parser = commands.add_parser('compare', help='Confronta due file di risultati')
+    compare_parser.add_argument('baseline', type=str, help='JSON di riferimento')
+    compare_parser.add_argument('current', type=str, help='JSON da verificare')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='Rallentamento tollerato (0.2 = +20%%)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        sys.exit(run_suite(args))
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r') as f:
+        current = json.load(f)
+    sys.exit(compare(baseline, current, args.threshold))
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_csv(path, bars, seed, freq='15min'):
+    """Random walk OHLCV con lo stesso formato dei CSV in backend/data."""
+    rng = np.random.default_rng(seed)
+    close = 1.0 + np.cumsum(rng.normal(0, 0.001, bars))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0005, bars))
+    dates = pd.date_range('2024-01-01', periods=bars, freq=freq)
+    fmt = '%Y-%m-%d %H:%M:%S' if freq != 'D' else '%Y-%m-%d'
+    pd.DataFrame({
+        'Date': dates.strftime(fmt),
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 1000, bars),
+    }).to_csv(path, index=False)
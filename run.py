@@ -8,6 +8,9 @@ if __name__ == "__main__":
     print("--- Avvio Agente di Trading ---")
     print("Accedi alla dashboard su: http://127.0.0.1:5000")
     
-    from backend.app import app
+    from backend.app import app, get_bot_pool
+    # Con il reloader attivo i worker vanno avviati solo nel processo che serve le richieste
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_bot_pool()
     # Esegue l'app Flask
     app.run(debug=True, port=5000)